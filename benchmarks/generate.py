@@ -0,0 +1,135 @@
+"""
+Synthetic migration projects for the benchmarks.
+
+    python benchmarks/generate.py PATH [--files 200] [--steps-per-file 5]
+                                       [--template-share 0.2] [--seed-files 2]
+                                       [--seed-rows 20000] [--seed 0] [--schema bench]
+
+The project follows the ORDERED_DIRS layout: step files are spread over the
+ordered sub-directories, a share of them are *.sql.j2 templates, and
+seed_data/ holds a few large INSERT scripts. The same arguments always
+produce the same files, so timings from different commits are comparable.
+Without a schema the project runs on the sqlite dialect as well.
+"""
+import argparse
+import random
+from pathlib import Path
+from typing import Optional
+
+from sqlstride.constants import ORDERED_DIRS
+
+AUTHOR = "bench"
+
+
+_COLUMN_TYPES = ["integer", "bigint", "varchar(100)", "text", "numeric(12,2)", "boolean", "timestamp"]
+
+
+def _table_sql(rng: random.Random, name: str, prefix: str) -> str:
+    columns = ",\n    ".join(f"c{number} {rng.choice(_COLUMN_TYPES)}" for number in range(rng.randint(3, 12)))
+    return f"CREATE TABLE IF NOT EXISTS {prefix}{name} (\n    id integer PRIMARY KEY,\n    {columns}\n);"
+
+
+def _template_sql(rng: random.Random, name: str) -> str:
+    return (
+        _table_sql(rng, name, "{{ prefix }}") + "\n"
+        "{% for tenant in tenants %}\n"
+        f"CREATE INDEX IF NOT EXISTS ix_{name}_{{{{ tenant }}}} ON {{{{ prefix }}}}{name} (id);\n"
+        "{% endfor %}\n"
+        "{% if environment == 'benchmark' %}"
+        f"CREATE INDEX IF NOT EXISTS ix_{name}_{{{{ environment }}}} ON {{{{ prefix }}}}{name} (id);"
+        "{% endif %}"
+    )
+
+
+def _seed_sql(rng: random.Random, name: str, rows: int, prefix: str, start: int) -> str:
+    values = ",\n".join(f"({number}, 'row {number}', {rng.randint(0, 10 ** 6)})"
+                        for number in range(start, start + rows))
+    return f"INSERT INTO {prefix}{name} (id, label, amount) VALUES\n{values};"
+
+
+def jinja_vars(schema: Optional[str] = "bench") -> dict:
+    """The variables the generated templates use."""
+    return {"prefix": f"{schema}." if schema else "", "environment": "benchmark", "tenants": ["alpha", "beta", "gamma"]}
+
+
+def generate_project(root: Path, files: int = 200, steps_per_file: int = 5, template_share: float = 0.2,
+                     seed_files: int = 2, seed_rows: int = 20000, seed: int = 0,
+                     schema: Optional[str] = "bench") -> dict:
+    """
+    Write a synthetic project under *root* and return a summary of what was
+    generated, including the jinja variables its templates need. Without a
+    *schema* object names are unqualified, so the project also runs on SQLite.
+    """
+    rng = random.Random(seed)
+    prefix = f"{schema}." if schema else ""
+    root = Path(root)
+    step_dirs = [name for name in ORDERED_DIRS if name != "seed_data"]
+    summary = {"files": 0, "templates": 0, "steps": 0, "seed_files": 0, "bytes": 0}
+
+    def write(path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        summary["files"] += 1
+        summary["bytes"] += len(text.encode("utf-8"))
+
+    for file_number in range(files):
+        directory = step_dirs[file_number % len(step_dirs)]
+        is_template = rng.random() < template_share
+        steps = []
+        for step_number in range(steps_per_file):
+            name = f"t{file_number:05d}_{step_number}"
+            body = _template_sql(rng, name) if is_template else _table_sql(rng, name, prefix)
+            steps.append(f"-- step {AUTHOR}:f{file_number:05d}_s{step_number}\n{body}\n")
+        suffix = ".sql.j2" if is_template else ".sql"
+        write(root / directory / f"{file_number:05d}_{directory}{suffix}", "\n".join(steps))
+        summary["templates"] += is_template
+        summary["steps"] += steps_per_file
+
+    for file_number in range(seed_files):
+        name = f"seed{file_number:03d}"
+        rows_per_step = max(1, seed_rows // steps_per_file)
+        steps = [f"-- step {AUTHOR}:{name}_table\nCREATE TABLE IF NOT EXISTS {prefix}{name} "
+                 f"(id integer PRIMARY KEY, label varchar(100), amount integer);\n"]
+        steps += [
+            f"-- step {AUTHOR}:{name}_s{step_number}\n"
+            f"{_seed_sql(rng, name, rows_per_step, prefix, start=step_number * rows_per_step)}\n"
+            for step_number in range(steps_per_file)
+        ]
+        write(root / "seed_data" / f"{file_number:03d}_seed.sql", "\n".join(steps))
+        summary["seed_files"] += 1
+        summary["steps"] += len(steps)
+
+    variables = jinja_vars(schema)
+    connection = ("host: localhost\nport: 5432\ndatabase: bench\nusername: bench\npassword: bench\n"
+                  f"sql_dialect: postgres\ndefault_schema: {schema}\n" if schema else
+                  "sql_dialect: sqlite\ndatabase: bench.db\n")
+    (root / "sqlstride.yaml").write_text(
+        connection +
+        f"jinja_vars:\n  prefix: '{variables['prefix']}'\n  environment: {variables['environment']}\n"
+        f"  tenants: [{', '.join(variables['tenants'])}]\n",
+        encoding="utf-8",
+    )
+    summary["jinja_vars"] = variables
+    return summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--steps-per-file", type=int, default=5)
+    parser.add_argument("--template-share", type=float, default=0.2)
+    parser.add_argument("--seed-files", type=int, default=2)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--schema", default="bench", help="schema qualifying every object; pass '' for SQLite")
+    args = parser.parse_args(argv)
+
+    summary = generate_project(args.path, args.files, args.steps_per_file, args.template_share,
+                               args.seed_files, args.seed_rows, args.seed, args.schema or None)
+    print(f"Generated {summary['files']} files ({summary['templates']} templates, {summary['steps']} steps, "
+          f"{summary['bytes'] / 1e6:.1f} MB) in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
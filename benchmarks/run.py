@@ -0,0 +1,315 @@
+"""
+Benchmarks for sqlstride's hot paths, run against a generated project.
+
+    python benchmarks/run.py [--repeat 5] [--output results.json] [--compare earlier.json]
+                             [--only parse render ...] [--files 200] [--steps-per-file 5]
+                             [--template-share 0.2] [--seed-files 2] [--seed-rows 20000]
+
+Database access is replaced by in-memory stubs, so only sqlstride's own work
+is measured; sync_sqlite_memory applies the whole project to an in-memory
+SQLite database to time the sync engine without any network. Results are
+printed and can be written as JSON; --compare prints each benchmark's median
+next to the one in an earlier results file.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+from unittest.mock import patch
+
+from generate import generate_project
+
+from sqlstride.config import Config
+from sqlstride.database.adapters.base import LOG_COLUMNS
+from sqlstride.file_utils.checksum import CHECKSUM_ALGORITHMS, get_provider
+from sqlstride.file_utils import templating
+from sqlstride.file_utils.parse_cache import ParseManifest
+from sqlstride.file_utils.parser import parse_directory
+from sqlstride.file_utils.pipeline import render_steps
+from sqlstride.file_utils.templating import configure_template_cache, render_sql
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[], object]  # not timed; its result is passed to run
+    run: Callable[[object], int]  # timed; returns the number of items processed
+
+
+class StubCursor:
+    """Answers each query with the rows of the first catalog entry whose marker occurs in the SQL."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self._rows = next((rows for marker, rows in self.catalog if marker in sql), [])
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+class StubConnection:
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def cursor(self):
+        return StubCursor(self.catalog)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubSyncAdapter:
+    """Stands in for a database on which every step of the project is already applied."""
+
+    def __init__(self, applied):
+        self.applied = applied
+
+    def acquire_run_lock(self, timeout=0):
+        return True
+
+    def release_run_lock(self):
+        pass
+
+    def applied_steps(self, snapshot=None):
+        return self.applied
+
+
+def _catalog(objects: int) -> list:
+    tables = [("bench", f"t{number:05d}",
+               f"create table if not exists bench.t{number:05d} (\n    id integer not null,\n"
+               f"    label varchar(100),\n    amount numeric(12,2) default 0,\n"
+               f"    constraint t{number:05d}_pkey primary key (id)\n);")
+              for number in range(objects)]
+    views = [("bench", f"v{number:05d}",
+              f" select t.id, t.label, sum(t.amount) as total from bench.t{number:05d} t "
+              f"where t.amount > 0 group by t.id, t.label")
+             for number in range(objects // 4)]
+    log_columns = [(name,) for name in ("id", *LOG_COLUMNS, "applied_at")]  # an up-to-date log table
+    return [("information_schema.columns", log_columns), ("pg_attribute", tables),
+            ("information_schema.views", views)]
+
+
+def build_benchmarks(project: Path, sqlite_project: Path, variables: dict, work_dir: Path,
+                     baseline_objects: int) -> List[Benchmark]:
+    steps = parse_directory(project)
+    for step in steps:
+        step.sql  # load every body up front, so only the measured work is timed
+    templates = [step for step in steps if step.filename.endswith(".j2")]
+    rendered = list(render_steps(steps, variables))
+    rendered_sql = [item.sql for item in rendered]
+    applied = {(item.step.author, item.step.step_id, item.step.filename): item.checksum for item in rendered}
+    config = Config(project, "localhost", 5432, "", "bench", "bench", "bench", False, "postgres", "bench",
+                    jinja_vars=variables)
+    sqlite_variables = dict(variables, prefix="")
+    sqlite_config = Config(sqlite_project, None, None, None, ":memory:", None, None, False, "sqlite", None,
+                           jinja_vars=sqlite_variables)
+
+    def parse_cold(_):
+        manifest_path = work_dir / "cold-manifest.json"
+        manifest_path.unlink(missing_ok=True)
+        return len(parse_directory(project, ParseManifest(manifest_path)))
+
+    warm_manifest = work_dir / "warm-manifest.json"
+    seed_manifest = ParseManifest(warm_manifest)
+    parse_directory(project, seed_manifest)
+    seed_manifest.save()
+
+    def parse_warm(_):
+        return len(parse_directory(project, ParseManifest(warm_manifest)))
+
+    def fresh_templates():
+        configure_template_cache(None)
+        templating._templates.clear()
+
+    def render(_):
+        for step in templates:
+            render_sql(step.sql, variables, step.filename)
+        return len(templates)
+
+    def checksum(algorithm: str):
+        provider = get_provider(algorithm)
+
+        def run(_):
+            # the checksum the render pipeline records for every step
+            for sql in rendered_sql:
+                provider.checksum(sql)
+            return len(rendered_sql)
+        return run
+
+    checksums = []
+    for algorithm in CHECKSUM_ALGORITHMS:
+        try:
+            checksums.append(Benchmark("checksum" if algorithm == "sha256" else f"checksum_{algorithm}",
+                                       lambda: None, checksum(algorithm)))
+        except ValueError:  # xxh3 without the xxhash package
+            continue
+
+    def plan(same_checksums: bool):
+        def run(_):
+            from sqlstride.commands.sync import sync_database
+
+            with patch("sqlstride.commands.sync.get_adapter", return_value=StubSyncAdapter(applied)), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                sync_database(config, same_checksums=same_checksums)
+            return len(steps)
+        return run
+
+    def sync_sqlite(_):
+        from sqlstride.commands.sync import sync_database
+
+        # every run gets a new in-memory database, so every step is applied
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_database(sqlite_config, transaction_mode="per-file")
+        return len(steps)
+
+    def baseline_setup(root: Path, keep_cache: bool):
+        def setup():
+            if root.exists():
+                for child in root.iterdir():
+                    if not (keep_cache and child.name == ".sqlstride"):
+                        shutil.rmtree(child)
+            root.mkdir(parents=True, exist_ok=True)
+            return root
+        return setup
+
+    def write_baseline(root: Path):
+        from sqlstride.database.adapters.postgres import PostgresAdapter
+
+        connection = StubConnection(_catalog(baseline_objects))
+        with patch("sqlstride.database.adapters.postgres.build_connector") as build_connector:
+            build_connector.return_value.to_user_postgres.return_value = connection
+            adapter = PostgresAdapter(config)
+        return adapter.write_baseline(root)
+
+    warm_root = work_dir / "baseline-warm"
+    baseline_setup(warm_root, keep_cache=False)()
+    write_baseline(warm_root)  # fills the format cache
+
+    return [
+        Benchmark("parse_directory_cold", lambda: None, parse_cold),
+        Benchmark("parse_directory_warm", lambda: None, parse_warm),
+        Benchmark("render_sql_cold", fresh_templates, render),
+        Benchmark("render_sql_warm", lambda: None, render),
+        *checksums,
+        Benchmark("plan_pending", lambda: None, plan(same_checksums=False)),
+        Benchmark("plan_pending_same_checksums", lambda: None, plan(same_checksums=True)),
+        Benchmark("sync_sqlite_memory", lambda: None, sync_sqlite),
+        Benchmark("write_baseline_cold", baseline_setup(work_dir / "baseline-cold", keep_cache=False), write_baseline),
+        Benchmark("write_baseline_warm", baseline_setup(warm_root, keep_cache=True), write_baseline),
+    ]
+
+
+def time_benchmark(benchmark: Benchmark, repeat: int) -> dict:
+    samples = []
+    items = 0
+    for _ in range(repeat):
+        state = benchmark.setup()
+        start = time.perf_counter()
+        items = benchmark.run(state)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "items": items,
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(repeat: int = 5, only: List[str] = (), baseline_objects: int = 500, **project_options) -> dict:
+    """Generate a project in a temporary directory, run the benchmarks and return the results."""
+    with tempfile.TemporaryDirectory(prefix="sqlstride-bench-") as temp:
+        project = Path(temp) / "project"
+        work_dir = Path(temp) / "work"
+        work_dir.mkdir()
+        summary = generate_project(project, **project_options)
+        sqlite_project = Path(temp) / "sqlite-project"
+        generate_project(sqlite_project, schema=None, **project_options)
+        results: Dict[str, dict] = {}
+        for benchmark in build_benchmarks(project, sqlite_project, summary["jinja_vars"], work_dir,
+                                          baseline_objects):
+            if only and not any(name in benchmark.name for name in only):
+                continue
+            results[benchmark.name] = time_benchmark(benchmark, repeat)
+        configure_template_cache(None)
+    return {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "project": {key: summary[key] for key in ("files", "templates", "steps", "seed_files", "bytes")},
+            "baseline_objects": baseline_objects,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, earlier: dict) -> str:
+    lines = [f"{'benchmark':<32} {'earlier ms':>12} {'now ms':>12} {'ratio':>8}"]
+    for name, result in current["results"].items():
+        before = earlier.get("results", {}).get(name)
+        if before is None:
+            lines.append(f"{name:<32} {'–':>12} {result['median_ms']:>12.3f} {'':>8}")
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        lines.append(f"{name:<32} {before['median_ms']:>12.3f} {result['median_ms']:>12.3f} {ratio:>7.2f}x")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=None, help="also write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier results file to compare against")
+    parser.add_argument("--only", nargs="*", default=[], help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--steps-per-file", type=int, default=5)
+    parser.add_argument("--template-share", type=float, default=0.2)
+    parser.add_argument("--seed-files", type=int, default=2)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    parser.add_argument("--baseline-objects", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.repeat, args.only, args.baseline_objects, files=args.files,
+                        steps_per_file=args.steps_per_file, template_share=args.template_share,
+                        seed_files=args.seed_files, seed_rows=args.seed_rows)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    if args.compare:
+        print(compare(results, json.loads(args.compare.read_text(encoding="utf-8"))))
+
+
+if __name__ == "__main__":
+    main()
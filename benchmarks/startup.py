@@ -0,0 +1,58 @@
+"""
+Startup-time benchmark: how long a fresh interpreter takes to get sqlstride
+ready to run a command.
+
+    python benchmarks/startup.py [--repeat 20] [--output startup.json]
+
+Every sample is a new process, so nothing is shared with earlier imports.
+Results are printed (and optionally written) as JSON so runs from different
+commits can be compared.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    "import_cli": "import sqlstride.cli",
+    "help": "from sqlstride.cli import cli\ntry:\n    cli(['--help'])\nexcept SystemExit:\n    pass",
+    "baseline_python": "pass",
+}
+
+
+def time_scenario(code: str, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "median_ms": round(statistics.median(samples), 2),
+        "min_ms": round(min(samples), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+def run(repeat: int = 20) -> dict:
+    return {name: time_scenario(code, repeat) for name, code in SCENARIOS.items()}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,15 @@
 import click
 from pathlib import Path
 
-from .config import load_config
+from .config import load_config, load_targets
+from .constants import SCHEDULES, TRANSACTION_MODES
 from .commands.sync import sync_database
+from .commands.fleet import sync_fleet
 from .commands.create_repo import create_repository_structure
+from .commands.baseline import register_baseline
+from .commands.deps import check_dependencies
+from .commands.history import format_duration, load_history
+from .file_utils.checksum import CHECKSUM_ALGORITHMS
 from .database.adapters import get_adapter
 
 
@@ -100,8 +106,46 @@ def cli():
     default=None,
     help="JSON string of variables to use in Jinja templates"
 )
+@click.option(
+    "--transaction-mode",
+    type=click.Choice(TRANSACTION_MODES),
+    default="per-step",
+    help="Commit after every step, after every file, or once for the whole run"
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes used to parse, render and checksum SQL files"
+)
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Seconds to wait for another running sync to release the database (default: fail immediately)"
+)
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Apply the files of each directory tier on this many connections at once"
+)
+@click.option(
+    "--schedule",
+    type=click.Choice(SCHEDULES),
+    default="tiers",
+    help="With --parallel: start a file once its tier is reached, or once the files it depends on are applied"
+)
+@click.option(
+    "--checksum-algorithm",
+    type=click.Choice(list(CHECKSUM_ALGORITHMS)),
+    default=None,
+    help="Algorithm for the checksums of newly applied steps (default: sha256); xxh3 needs the xxhash package"
+)
 def sync(project_path, host, port, instance, database, username, password, trusted_auth,
-                         sql_dialect, default_schema, log_table, lock_table, dry_run, same_checksums, jinja_vars):
+                         sql_dialect, default_schema, log_table, lock_table, dry_run, same_checksums, jinja_vars,
+                         transaction_mode, jobs, lock_timeout, parallel, schedule, checksum_algorithm):
     import json
     jinja_vars_dict = {}
     if jinja_vars:
@@ -111,8 +155,10 @@ def sync(project_path, host, port, instance, database, username, password, trust
             raise click.BadParameter("jinja-vars must be a valid JSON string")
 
     config = load_config(Path(project_path), host, port, instance, database, username, password, trusted_auth,
-                         sql_dialect, default_schema, log_table, lock_table, jinja_vars_dict)
-    sync_database(config, dry_run=dry_run, same_checksums=same_checksums)
+                         sql_dialect, default_schema, log_table, lock_table, jinja_vars_dict,
+                         lock_timeout=lock_timeout, checksum_algorithm=checksum_algorithm)
+    sync_database(config, dry_run=dry_run, same_checksums=same_checksums, transaction_mode=transaction_mode,
+                  jobs=jobs, parallel=parallel, schedule=schedule)
 
 
 @cli.command()
@@ -197,14 +243,297 @@ def create_repo(project_path):
     default=None,
     help="Name of the table to use to lock the database during sync"
 )
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes used to format and write the baseline files"
+)
+@click.option(
+    "--connections",
+    type=click.IntRange(min=1),
+    default=4,
+    help="Number of database connections used to read the catalog at the same time"
+)
+@click.option(
+    "--register",
+    is_flag=True,
+    default=False,
+    help="Record the baseline steps as applied in the log table, so sync does not run them against this database"
+)
 def baseline(project_path, host, port, instance, database, username, password, trusted_auth,
-                         sql_dialect, default_schema, log_table, lock_table):
+                         sql_dialect, default_schema, log_table, lock_table, jobs, connections, register):
     config = load_config(Path(project_path), host, port, instance, database, username, password, trusted_auth,
                          sql_dialect, default_schema, log_table, lock_table, None)
     adapter = get_adapter(config)
     click.echo(f"Introspecting {adapter.dialect.name} …")
-    written = adapter.write_baseline(Path(config.project_path))
+    written = adapter.write_baseline(Path(config.project_path), jobs=jobs, connections=connections)
     click.echo(f"✔ baseline complete – wrote {written} files")
+    if register:
+        registered = register_baseline(config, adapter, jobs=jobs)
+        click.echo(f"✔ registered {registered} baseline steps as applied")
+
+@cli.command()
+@click.option(
+    "--project",
+    "-p",
+    "project_path",
+    default=".",
+    type=click.Path(file_okay=False, dir_okay=True),
+    help="Path to schema repo containing sqlstride.yaml & schema/",
+)
+@click.option(
+    "--host",
+    default=None,
+    help="Database Port used for connecting",
+)
+@click.option(
+    "--port",
+    default=None,
+    help="Database Port to connect to",
+)
+@click.option(
+    "--instance",
+    default=None,
+    help="Instance used for connecting to MSSQL Database",
+)
+@click.option(
+    "--database",
+    "-db",
+    default=None,
+    help="Desired database to connect to on host",
+)
+@click.option(
+    "--username",
+    "-u",
+    default=None,
+    help="Username used for authenticating with the database",
+)
+@click.option(
+    "--password",
+    "-pw",
+    default=None,
+    help="Password used for authenticating with the database",
+)
+@click.option(
+    "--trusted-auth",
+    is_flag=True,
+    default=False,
+    help="Use trusted authentication for connecting to MSSQL Database",
+)
+@click.option(
+    "--sql-dialect",
+    default=None,
+    help="SQL dialect to use for connecting to database"
+)
+@click.option(
+    "--default-schema",
+    default=None,
+    help="Schema that the log and lock tables will be created in",
+)
+@click.option(
+    "--log-table",
+    default=None,
+    help="Name of the table to use to keep track of changes"
+)
+@click.option(
+    "--lock-table",
+    default=None,
+    help="Name of the table to use to lock the database during sync"
+)
+@click.option(
+    "--limit",
+    "-n",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Number of slowest steps to list"
+)
+def history(project_path, host, port, instance, database, username, password, trusted_auth,
+            sql_dialect, default_schema, log_table, lock_table, limit):
+    """List the slowest applied steps and estimate how long the pending ones will take."""
+    config = load_config(Path(project_path), host, port, instance, database, username, password, trusted_auth,
+                         sql_dialect, default_schema, log_table, lock_table, None)
+    report = load_history(config, limit=limit)
+
+    if report.slowest:
+        click.echo(f"Slowest of {report.timed_steps} timed steps:")
+        for timing in report.slowest:
+            rows = "" if timing.rows_affected is None else f"{timing.rows_affected:>10} rows"
+            click.echo(f"  {format_duration(timing.duration_ms):>12}  {rows:>15}  "
+                       f"{timing.filename} {timing.author}:{timing.step_id}")
+    else:
+        click.echo("No applied step has a recorded duration yet.")
+
+    pending = report.pending
+    if not pending.steps:
+        click.echo("✔ No pending steps.")
+        return
+    basis = ", ".join(f"{count} by {name}" for name, count in sorted(pending.basis.items()) if name != "none")
+    click.echo(f"{pending.steps} pending steps, estimated {format_duration(pending.total_ms)}"
+               + (f" ({basis})" if basis else ""))
+    if pending.basis.get("none"):
+        click.echo(f"  {pending.basis['none']} steps have no timings to compare with and are not counted")
+
+
+@cli.command()
+@click.option(
+    "--project",
+    "-p",
+    "project_path",
+    default=".",
+    type=click.Path(file_okay=False, dir_okay=True),
+    help="Path to schema repo containing sqlstride.yaml & schema/",
+)
+@click.option(
+    "--jinja-vars",
+    type=str,
+    default=None,
+    help="JSON string of variables to use in Jinja templates"
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes used to parse, render and checksum SQL files"
+)
+def deps(project_path, jinja_vars, jobs):
+    """Check that no step uses an object created in a later directory tier."""
+    import json
+    jinja_vars_dict = {}
+    if jinja_vars:
+        try:
+            jinja_vars_dict = json.loads(jinja_vars)
+        except json.JSONDecodeError:
+            raise click.BadParameter("jinja-vars must be a valid JSON string")
+
+    config = load_config(Path(project_path), None, None, None, None, None, None, False,
+                         None, None, None, None, jinja_vars_dict, require_host=False)
+    report = check_dependencies(config, jobs=jobs)
+    for found in report.misordered:
+        step, dependency = found.step.step, found.dependency.step
+        click.echo(f"  {step.filename} {step.author}:{step.step_id} uses {found.name}, "
+                   f"created later by {dependency.filename} {dependency.author}:{dependency.step_id}")
+    if report.cycle:
+        click.echo("  Some files depend on each other in a cycle; --schedule graph runs them tier by tier")
+    if report.misordered:
+        raise click.ClickException(f"{len(report.misordered)} steps depend on objects created in a later tier")
+    click.echo(f"✔ {report.steps} steps, {report.dependencies} dependencies between files, none on a later tier")
+
+
+@cli.command()
+@click.option(
+    "--project",
+    "-p",
+    "project_path",
+    default=".",
+    type=click.Path(file_okay=False, dir_okay=True),
+    help="Path to schema repo containing sqlstride.yaml & schema/",
+)
+@click.option(
+    "--targets",
+    "targets_file",
+    default=None,
+    type=click.Path(dir_okay=False, exists=True),
+    help="YAML file listing the target databases (defaults to the targets section of sqlstride.yaml)",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=4,
+    help="Number of databases synced at the same time",
+)
+@click.option(
+    "--canary",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Sync this many targets first and stop if any of them fails",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Parse & list SQL without executing anything",
+)
+@click.option(
+    "--same-checksums",
+    is_flag=True,
+    default=False,
+    help="Checks the current checksums against the existing checksums and raises an error if they are different"
+)
+@click.option(
+    "--jinja-vars",
+    type=str,
+    default=None,
+    help="JSON string of variables to use in Jinja templates"
+)
+@click.option(
+    "--transaction-mode",
+    type=click.Choice(TRANSACTION_MODES),
+    default="per-step",
+    help="Commit after every step, after every file, or once for the whole run"
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes used to parse, render and checksum SQL files"
+)
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Seconds to wait for another running sync to release the database (default: fail immediately)"
+)
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Apply the files of each directory tier on this many connections at once"
+)
+@click.option(
+    "--schedule",
+    type=click.Choice(SCHEDULES),
+    default="tiers",
+    help="With --parallel: start a file once its tier is reached, or once the files it depends on are applied"
+)
+@click.option(
+    "--checksum-algorithm",
+    type=click.Choice(list(CHECKSUM_ALGORITHMS)),
+    default=None,
+    help="Algorithm for the checksums of newly applied steps (default: sha256); xxh3 needs the xxhash package"
+)
+def fleet(project_path, targets_file, concurrency, canary, dry_run, same_checksums, jinja_vars, transaction_mode,
+          jobs, lock_timeout, parallel, schedule, checksum_algorithm):
+    """Sync the project against every target database."""
+    import json
+    jinja_vars_dict = {}
+    if jinja_vars:
+        try:
+            jinja_vars_dict = json.loads(jinja_vars)
+        except json.JSONDecodeError:
+            raise click.BadParameter("jinja-vars must be a valid JSON string")
+
+    config = load_config(Path(project_path), None, None, None, None, None, None, False,
+                         None, None, None, None, jinja_vars_dict, require_host=False,
+                         lock_timeout=lock_timeout, checksum_algorithm=checksum_algorithm)
+    try:
+        targets = load_targets(config, Path(targets_file) if targets_file else None)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    results = sync_fleet(config, targets, concurrency=concurrency, canary=canary, jobs=jobs, dry_run=dry_run,
+                         same_checksums=same_checksums, transaction_mode=transaction_mode, parallel=parallel,
+                         schedule=schedule)
+    for result in results:
+        detail = f" – {result.error}" if result.error else ""
+        click.echo(f"{result.status:>8}  {result.name}{detail}")
+    failed = [result for result in results if result.status != "applied"]
+    if failed:
+        raise click.ClickException(f"{len(failed)} of {len(results)} targets did not sync")
+    click.echo(f"✔ fleet sync complete – {len(results)} targets")
+
 
 def run_cli() -> None:
     cli()
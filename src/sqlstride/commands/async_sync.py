@@ -0,0 +1,48 @@
+# sqlstride/commands/async_sync.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from etl.logger import Logger
+
+from sqlstride.commands.sync import sync_database
+
+logger = Logger().get_logger()
+
+__all__ = ["async_sync"]
+
+
+async def async_sync(config, **sync_options) -> None:
+    """
+    Awaitable counterpart of sync_database for asyncio services.
+
+    Parsing, rendering and all database I/O run on a dedicated worker thread,
+    so the event loop keeps serving health checks and other startup
+    coroutines while migrations are applied. *sync_options* are passed to
+    sync_database unchanged.
+
+    Cancelling the awaiting task stops the run at the next batch boundary:
+    the batch in flight is committed or rolled back as usual, and
+    sync_database releases its run lock – the session-level advisory lock,
+    applock or GET_LOCK on Postgres, MSSQL and MariaDB, the lock table row
+    elsewhere – before the CancelledError propagates. A half-applied batch
+    therefore never keeps the next run locked out.
+    """
+    loop = asyncio.get_running_loop()
+    cancel_event = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlstride")
+    future = loop.run_in_executor(
+        executor, lambda: sync_database(config, cancel_event=cancel_event, **sync_options)
+    )
+    try:
+        await asyncio.shield(future)
+    except asyncio.CancelledError:
+        cancel_event.set()
+        logger.info("Cancelling sqlstride sync after the current batch")
+        try:
+            await future
+        except Exception as exc:
+            logger.error(f"sqlstride sync failed while cancelling: {exc}")
+        raise
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,42 @@
+# sqlstride/commands/baseline.py
+from pathlib import Path
+
+from etl.logger import Logger
+
+from sqlstride.config import Config
+from sqlstride.constants import BASELINE_AUTHOR, BASELINE_STEP_ID, CACHE_DIR
+from sqlstride.file_utils.parse_cache import ParseManifest
+from sqlstride.file_utils.parser import iter_steps
+from sqlstride.file_utils.pipeline import render_steps
+
+logger = Logger().get_logger()
+
+__all__ = ["register_baseline"]
+
+
+def register_baseline(config: Config, adapter, jobs: int = 1) -> int:
+    """
+    Record the project's baseline steps that are missing from the log table
+    as applied, without running them: their objects were read from this
+    database. All rows go out in one bulk insert and one commit.
+    """
+    project_path = Path(config.project_path)
+    if not adapter.acquire_run_lock(config.lock_timeout):
+        raise Exception("sqlstride is already running")
+    try:
+        applied = adapter.applied_steps()
+        manifest = ParseManifest(project_path / CACHE_DIR / "parse-manifest.json")
+        baseline_steps = [
+            step for step in iter_steps(project_path, manifest, jobs=jobs)
+            if (step.author, step.step_id) == (BASELINE_AUTHOR, BASELINE_STEP_ID)
+            and (step.author, step.step_id, step.filename) not in applied
+        ]
+        manifest.save()
+        rendered = render_steps(baseline_steps, config.jinja_vars, jobs=jobs,
+                                checksum_algorithm=config.checksum_algorithm)
+        adapter.record_steps((item.step, item.checksum) for item in rendered)
+        adapter.commit()
+        logger.info(f"Registered {len(baseline_steps)} baseline steps")
+        return len(baseline_steps)
+    finally:
+        adapter.release_run_lock()
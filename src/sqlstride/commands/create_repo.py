@@ -77,19 +77,23 @@ def create_repository_structure(project_path: str) -> None:
         os.makedirs(dir_path, exist_ok=True)
 
     gitignore_path = project_path / ".gitignore"
+    ignored_entries = ["sqlstride.yaml", ".sqlstride/"]
     if gitignore_path.exists():
         with open(gitignore_path, "r+", encoding="utf-8") as gi:
             lines = [line.rstrip("\n") for line in gi.readlines()]
-            if "sqlstride.yaml" not in lines:
+            missing = [entry for entry in ignored_entries if entry not in lines]
+            if missing:
                 # ensure the previous line ends with a newline
                 if lines and lines[-1] != "":
                     gi.write("\n")
-                gi.write("sqlstride.yaml\n")
-                click.echo("Added sqlstride.yaml to existing .gitignore")
+                for entry in missing:
+                    gi.write(f"{entry}\n")
+                click.echo(f"Added {', '.join(missing)} to existing .gitignore")
     else:
-        # Create .gitignore containing the entry
+        # Create .gitignore containing the entries
         with open(gitignore_path, "w", encoding="utf-8") as gi:
-            gi.write("sqlstride.yaml\n")
-        click.echo("Created .gitignore and added sqlstride.yaml")
+            for entry in ignored_entries:
+                gi.write(f"{entry}\n")
+        click.echo(f"Created .gitignore and added {', '.join(ignored_entries)}")
     click.echo(f"Repository structure created at {project_path}")
     return
\ No newline at end of file
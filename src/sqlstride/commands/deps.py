@@ -0,0 +1,40 @@
+# sqlstride/commands/deps.py
+from pathlib import Path
+from typing import List, NamedTuple
+
+from sqlstride.config import Config
+from sqlstride.constants import CACHE_DIR
+from sqlstride.file_utils.dependencies import DependencyCache, DependencyGraph, Misordered
+from sqlstride.file_utils.parse_cache import ParseManifest
+from sqlstride.file_utils.parser import iter_steps
+from sqlstride.file_utils.pipeline import render_steps
+from sqlstride.file_utils.templating import configure_template_cache
+
+__all__ = ["DependencyReport", "check_dependencies"]
+
+
+class DependencyReport(NamedTuple):
+    steps: int
+    dependencies: int  # (file, file it waits on) pairs
+    misordered: List[Misordered]
+    cycle: bool  # some files depend on each other, so --schedule graph falls back to tiers
+
+
+def check_dependencies(config: Config, jobs: int = 1) -> DependencyReport:
+    """Analyze every step of the project, applied or not, and report the ones that run before what they use."""
+    project_path = Path(config.project_path)
+    configure_template_cache(project_path / CACHE_DIR / "templates")
+    manifest = ParseManifest(project_path / CACHE_DIR / "parse-manifest.json")
+    rendered = list(render_steps(iter_steps(project_path, manifest, jobs=jobs), config.jinja_vars, jobs=jobs,
+                                 checksum_algorithm=config.checksum_algorithm))
+    manifest.save()
+
+    cache = DependencyCache(project_path / CACHE_DIR / "dependencies.json")
+    graph = DependencyGraph(rendered, cache)
+    cache.save(prune=True)
+    return DependencyReport(
+        steps=len(rendered),
+        dependencies=sum(len(waits) for waits in graph.file_dependencies().values()),
+        misordered=graph.misordered(),
+        cycle=graph.has_cycle(),
+    )
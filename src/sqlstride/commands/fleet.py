@@ -0,0 +1,57 @@
+# sqlstride/commands/fleet.py
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from etl.logger import Logger
+
+from sqlstride.config import Config
+from sqlstride.commands.sync import PreparedProject, sync_database
+
+logger = Logger().get_logger()
+
+__all__ = ["TargetResult", "sync_fleet"]
+
+
+class TargetResult(NamedTuple):
+    name: str
+    status: str                 # applied | failed | skipped
+    error: Optional[str] = None
+
+
+def _sync_target(project: PreparedProject, name: str, config: Config, sync_options: dict) -> TargetResult:
+    try:
+        sync_database(config, project=project, target_name=name, **sync_options)
+    except Exception as exc:
+        logger.error(f"[{name}] {exc}")
+        return TargetResult(name, "failed", str(exc))
+    return TargetResult(name, "applied")
+
+
+def _run_wave(pool: ThreadPoolExecutor, project: PreparedProject, targets: List[Tuple[str, Config]],
+              sync_options: dict) -> List[TargetResult]:
+    futures = [pool.submit(_sync_target, project, name, config, sync_options) for name, config in targets]
+    return [future.result() for future in futures]
+
+
+def sync_fleet(config: Config, targets: List[Tuple[str, Config]], *, concurrency: int = 4, canary: int = 0,
+               jobs: int = 1, **sync_options) -> List[TargetResult]:
+    """
+    Sync one project against many databases.
+
+    The project is parsed once and each step is rendered at most once; every
+    target then runs sync_database on a pool of *concurrency* threads. When
+    *canary* > 0 the first *canary* targets form a first wave that must fully
+    succeed before the remaining targets are touched; otherwise those are
+    reported as skipped. Results are returned in target order.
+    """
+    project = PreparedProject(config, jobs=jobs)
+    sync_options["jobs"] = jobs
+    results: List[TargetResult] = []
+    waves = [targets[:canary], targets[canary:]] if canary > 0 else [targets]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for wave in waves:
+            if any(result.status == "failed" for result in results):
+                results.extend(TargetResult(name, "skipped", "canary wave failed") for name, _ in wave)
+                continue
+            results.extend(_run_wave(pool, project, wave, sync_options))
+    return results
@@ -0,0 +1,114 @@
+# sqlstride/commands/history.py
+from collections import defaultdict
+from pathlib import Path
+from statistics import median
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlstride.config import Config
+from sqlstride.constants import CACHE_DIR
+from sqlstride.database.adapters import get_adapter
+from sqlstride.file_utils.parse_cache import ParseManifest
+from sqlstride.file_utils.parser import Step, iter_steps
+
+__all__ = ["StepTiming", "PendingEstimate", "HistoryReport", "slowest_steps", "estimate_pending",
+           "load_history", "format_duration"]
+
+
+class StepTiming(NamedTuple):
+    author: str
+    step_id: str
+    filename: str
+    applied_at: object
+    duration_ms: Optional[int]    # None for steps applied before timings were recorded
+    rows_affected: Optional[int]  # None when the driver could not tell (e.g. DDL)
+    run_id: Optional[str]
+
+
+class PendingEstimate(NamedTuple):
+    steps: int
+    total_ms: float
+    basis: Dict[str, int]  # file | directory | project | none → pending steps estimated that way
+
+
+class HistoryReport(NamedTuple):
+    slowest: List[StepTiming]
+    pending: PendingEstimate
+    timed_steps: int  # applied steps that carry a duration
+
+
+def _directory(filename: str) -> str:
+    return filename.split("/", 1)[0] if "/" in filename else ""
+
+
+def slowest_steps(history: Iterable[StepTiming], limit: int = 10) -> List[StepTiming]:
+    """The *limit* applied steps that took longest, slowest first."""
+    timed = [timing for timing in history if timing.duration_ms is not None]
+    return sorted(timed, key=lambda timing: timing.duration_ms, reverse=True)[:limit]
+
+
+def estimate_pending(pending: Iterable[Step], history: Iterable[StepTiming]) -> PendingEstimate:
+    """
+    Estimate the runtime of the pending steps from the applied ones. Each step
+    counts as the median duration of the steps already applied from the same
+    file, else from the same directory (tables/, seed_data/ …), else from the
+    whole project; without any timings it counts as nothing.
+    """
+    by_file: Dict[str, List[int]] = defaultdict(list)
+    by_directory: Dict[str, List[int]] = defaultdict(list)
+    durations = []
+    for timing in history:
+        if timing.duration_ms is None:
+            continue
+        by_file[timing.filename].append(timing.duration_ms)
+        by_directory[_directory(timing.filename)].append(timing.duration_ms)
+        durations.append(timing.duration_ms)
+    project_median = median(durations) if durations else None
+
+    steps = 0
+    total_ms = 0.0
+    basis: Dict[str, int] = defaultdict(int)
+    for step in pending:
+        steps += 1
+        if step.filename in by_file:
+            total_ms += median(by_file[step.filename])
+            basis["file"] += 1
+        elif _directory(step.filename) in by_directory:
+            total_ms += median(by_directory[_directory(step.filename)])
+            basis["directory"] += 1
+        elif project_median is not None:
+            total_ms += project_median
+            basis["project"] += 1
+        else:
+            basis["none"] += 1
+    return PendingEstimate(steps, total_ms, dict(basis))
+
+
+def load_history(config: Config, limit: int = 10) -> HistoryReport:
+    """Read the log table of the configured database and compare it with the project on disk."""
+    adapter = get_adapter(config)
+    history = [StepTiming(*row) for row in adapter.step_history()]
+    applied = {(timing.author, timing.step_id, timing.filename) for timing in history}
+
+    manifest = ParseManifest(Path(config.project_path) / CACHE_DIR / "parse-manifest.json")
+    pending = [step for step in iter_steps(Path(config.project_path), manifest)
+               if (step.author, step.step_id, step.filename) not in applied]
+    manifest.save()
+
+    return HistoryReport(
+        slowest=slowest_steps(history, limit),
+        pending=estimate_pending(pending, history),
+        timed_steps=sum(timing.duration_ms is not None for timing in history),
+    )
+
+
+def format_duration(milliseconds: float) -> str:
+    if milliseconds < 1000:
+        return f"{milliseconds:.0f} ms"
+    seconds = milliseconds / 1000
+    if seconds < 60:
+        return f"{seconds:.1f} s"
+    minutes, seconds = divmod(round(seconds), 60)
+    if minutes < 60:
+        return f"{minutes} min {seconds:02d} s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min"
@@ -1,58 +1,396 @@
 # sqlstride/commands/sync.py
-from hashlib import sha256
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import groupby
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from etl.logger import Logger
 
+from sqlstride.constants import CACHE_DIR, SCHEDULES, TRANSACTION_MODES
 from sqlstride.database.adapters import get_adapter
-from sqlstride.file_utils.parser import parse_directory
-from sqlstride.file_utils.templating import render_sql
+from sqlstride.database.applied_snapshot import AppliedStepsSnapshot, snapshot_path
+from sqlstride.file_utils.checksum import compute_checksum, split_checksum
+from sqlstride.file_utils.checksum_cache import ChecksumCache
+from sqlstride.file_utils.dependencies import DependencyCache, DependencyGraph
+from sqlstride.file_utils.parse_cache import ParseManifest
+from sqlstride.file_utils.parser import iter_steps, Step
+from sqlstride.file_utils.pipeline import RenderedStep, render_steps
+from sqlstride.file_utils.templating import configure_template_cache, template_variables
 
 logger = Logger().get_logger()
 
-def sync_database(config, *, dry_run: bool = False, same_checksums: bool = False) -> None:
-    adapter = get_adapter(config)
-    if adapter.is_locked():
-        raise Exception("sqlstride is already running")
-    all_steps = parse_directory(Path(config.project_path))
-    applied = adapter.applied_steps()
-    if same_checksums:
-        different_checksums = []
-        #  if applied checksums are different from new checksums raise error
-        already_applied = [step for step in all_steps if (step.author, step.step_id, step.filename) in applied]
-        for step in already_applied:
-            sql_rendered = render_sql(step.sql, config.jinja_vars, step.filename)
-            checksum = sha256(sql_rendered.encode()).hexdigest()
-            if checksum != applied[step.author, step.step_id, step.filename]:
-                different_checksums.append((step.author, step.step_id, step.filename))
-        if different_checksums:
-            different_checksum_string = "\n".join(
-                f"{filename} {author}:{step_id}" for author, step_id, filename in different_checksums)
-            raise Exception(f"Checksums for the following steps are different:\n{different_checksum_string}")
-
-    pending = [step for step in all_steps if (step.author, step.step_id, step.filename) not in applied]
-
-    if not pending:
-        print("✔ Database is already up to date.")
-        return
-    logger.info(f"Found {len(pending)} steps to apply")
-    for step in pending:
-        sql_rendered = render_sql(step.sql, config.jinja_vars, step.filename)
-        checksum = sha256(sql_rendered.encode()).hexdigest()
 
-        if dry_run:
-            print(f"\n-- WOULD APPLY {step.author}:{step.step_id} ({step.filename})")
-            print(sql_rendered)
-            continue
+class PreparedProject:
+    """
+    A project parsed once and rendered on demand, to be synced against many
+    databases. Every step is rendered and hashed at most once, however many
+    targets need it.
+    """
+
+    def __init__(self, config, jobs: int = 1):
+        self.jinja_vars = config.jinja_vars
+        self.checksum_algorithm = config.checksum_algorithm
+        self.jobs = jobs
+        configure_template_cache(Path(config.project_path) / CACHE_DIR / "templates")
+        manifest = ParseManifest(Path(config.project_path) / CACHE_DIR / "parse-manifest.json")
+        self.steps: List[Step] = list(iter_steps(Path(config.project_path), manifest, jobs=jobs))
+        manifest.save()
+        self.manifest = manifest  # content hashes of the project's files, for checksum verification
+        self.checksum_cache = ChecksumCache(Path(config.project_path) / CACHE_DIR / "checksums.json")
+        self._rendered: Dict[Tuple[str, str, str], RenderedStep] = {}
+        self._lock = threading.Lock()
+
+    def render(self, steps: List[Step]) -> List[RenderedStep]:
+        with self._lock:
+            missing = [step for step in steps if (step.author, step.step_id, step.filename) not in self._rendered]
+            for item in render_steps(missing, self.jinja_vars, jobs=self.jobs,
+                                     checksum_algorithm=self.checksum_algorithm):
+                self._rendered[item.step.author, item.step.step_id, item.step.filename] = item
+            return [self._rendered[step.author, step.step_id, step.filename] for step in steps]
+
+
+def _batch_steps(rendered: Iterable[RenderedStep], transaction_mode: str) -> Iterator[List[RenderedStep]]:
+    """Group pending steps into the units that share one commit."""
+    if transaction_mode == "per-step":
+        for item in rendered:
+            yield [item]
+    elif transaction_mode == "per-file":
+        for _, file_items in groupby(rendered, key=lambda item: item.step.filename):
+            yield list(file_items)
+    else:
+        yield list(rendered)
+
+
+def _tier(filename: str) -> str:
+    """The top-level directory a step file lives in, e.g. tables or indexes."""
+    return filename.split("/", 1)[0] if "/" in filename else ""
+
+
+def _size(file_items: List[RenderedStep]) -> int:
+    return sum(len(item.sql) for item in file_items)
+
+
+def _tiers(rendered: Iterable[RenderedStep]) -> Iterator[List[List[RenderedStep]]]:
+    """
+    Group pending steps into tiers – the top-level directories, in run order –
+    each a list of files. Within a tier the files are ordered largest first,
+    so the long ones start early and do not trail behind on their own.
+    """
+    for _, tier_items in groupby(rendered, key=lambda item: _tier(item.step.filename)):
+        files = [list(file_items) for _, file_items in groupby(tier_items, key=lambda item: item.step.filename)]
+        files.sort(key=_size, reverse=True)
+        yield files
+
+
+class _ParallelRun:
+    """
+    Worker connections for a parallel sync. Each thread applies whole files
+    on its own adapter; a file's steps stay in order and are batched as in a
+    serial run. After a failure, or once *cancel_event* is set, no further
+    batch is started.
+    """
+
+    def __init__(self, config, adapter, transaction_mode: str, prefix: str = "",
+                 cancel_event: Optional[threading.Event] = None):
+        self.config = config
+        self.adapter = adapter
+        self.transaction_mode = transaction_mode
+        self.prefix = prefix
+        self.cancel_event = cancel_event
+        self.failed = threading.Event()
+        self._local = threading.local()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+
+    @property
+    def stopped(self) -> bool:
+        return self.failed.is_set() or (self.cancel_event is not None and self.cancel_event.is_set())
+
+    def worker_adapter(self):
+        if getattr(self._local, "adapter", None) is None:
+            self._local.adapter = get_adapter(self.config)
+            self._local.adapter.run_id = self.adapter.run_id  # the log rows of all connections belong to one run
+            with self._workers_lock:
+                self._workers.append(self._local.adapter)
+        return self._local.adapter
+
+    def apply_file(self, file_items: List[RenderedStep]) -> None:
+        for batch in _batch_steps(file_items, self.transaction_mode):
+            if self.stopped:
+                return
+            try:
+                _apply_batch(self.worker_adapter(), batch, self.prefix)
+            except Exception:
+                self.failed.set()
+                raise
+
+    def raise_first(self, errors: List[BaseException]) -> None:
+        for error in errors[1:]:
+            logger.error(f"{self.prefix}{error}")
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        for worker in self._workers:
+            try:
+                worker.connection.close()
+            except Exception as exc:
+                logger.debug(f"Could not close worker connection: {exc}")
+
+
+def _apply_tiers(run: _ParallelRun, rendered: Iterable[RenderedStep], parallel: int) -> None:
+    """
+    Apply the files of each tier concurrently on *parallel* connections; every
+    file of a tier is done before the next tier starts. Files already running
+    when one fails finish their current batch, then the first error is raised.
+    """
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="sqlstride-apply") as pool:
+        for files in _tiers(rendered):
+            if run.stopped:
+                break
+            futures = [pool.submit(run.apply_file, file_items) for file_items in files]
+            errors = [future.exception() for future in futures]  # the barrier between tiers
+            run.raise_first([error for error in errors if error is not None])
 
+
+def _apply_graph(run: _ParallelRun, graph: DependencyGraph, parallel: int) -> None:
+    """
+    Apply files on *parallel* connections as soon as every file they depend
+    on is applied, largest ready file first, regardless of tier.
+    """
+    files = graph.files()
+    waiting = graph.file_dependencies()
+    running: Dict[Future, str] = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="sqlstride-apply") as pool:
+        while True:
+            if not run.stopped:
+                ready = sorted((filename for filename, waits in waiting.items() if not waits),
+                               key=lambda filename: _size(files[filename]), reverse=True)
+                for filename in ready[:parallel - len(running)]:
+                    del waiting[filename]
+                    running[pool.submit(run.apply_file, files[filename])] = filename
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                filename = running.pop(future)
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                for waits in waiting.values():
+                    waits.discard(filename)
+    run.raise_first(errors)
+
+
+def _dependency_graph(config, rendered: List[RenderedStep], prefix: str = "") -> Optional[DependencyGraph]:
+    """The dependency graph of the pending steps; None when their files depend on each other in a cycle."""
+    cache = DependencyCache(Path(config.project_path) / CACHE_DIR / "dependencies.json")
+    graph = DependencyGraph(rendered, cache)
+    cache.save()
+    for found in graph.misordered():
+        logger.warning(f"{prefix}{found.step.step.filename} {found.step.step.author}:{found.step.step.step_id} uses "
+                       f"{found.name}, created in a later tier by {found.dependency.step.filename}")
+    if graph.has_cycle():
+        logger.warning(f"{prefix}Pending files depend on each other in a cycle, applying them tier by tier")
+        return None
+    return graph
+
+
+def _apply_batch(adapter, batch: List[RenderedStep], prefix: str = "") -> None:
+    """
+    Execute every step of the batch inside one transaction. The log rows,
+    with each step's duration and the rows it affected, are queued and
+    written in bulk by the commit that closes the batch.
+
+    When the dialect supports transactional DDL each step runs behind its own
+    savepoint, so a failure only discards that step: the steps before it are
+    still committed and the error names the step that broke. Without it
+    (MariaDB) DDL commits implicitly, so each log row is written right after
+    its step and the next statement commits the two together; a failure
+    then leaves no applied step without its row.
+    """
+    use_savepoints = adapter.transactional_ddl and len(batch) > 1
+    applied: List[RenderedStep] = []
+    for index, item in enumerate(batch):
+        step = item.step
+        savepoint = f"sqlstride_step_{index}"
         try:
-            adapter.lock()
-            adapter.execute(sql_rendered)
-            adapter.record_step(step, checksum)
-            adapter.unlock()
-            adapter.commit()
-            print(f"✓ Applied {step.filename} {step.author}:{step.step_id}")
+            if use_savepoints:
+                adapter.savepoint(savepoint)
+            started = time.perf_counter()
+            rows_affected = adapter.execute(item.sql)
+            duration_ms = round((time.perf_counter() - started) * 1000)
         except Exception as exc:
-            adapter.rollback()
+            if use_savepoints and applied:
+                adapter.rollback_to_savepoint(savepoint)
+                _commit_batch(adapter, applied, prefix)
+            else:
+                adapter.rollback()
             raise RuntimeError(
                 f"Failed on {step.filename} {step.author}:{step.step_id} → {exc}"
-            ) from exc
\ No newline at end of file
+            ) from exc
+        if adapter.transactional_ddl:
+            adapter.queue_step(step, item.checksum, duration_ms, rows_affected)
+        else:
+            adapter.record_step(step, item.checksum, duration_ms, rows_affected)
+        applied.append(item)
+    _commit_batch(adapter, applied, prefix)
+
+
+def _commit_batch(adapter, applied: List[RenderedStep], prefix: str) -> None:
+    try:
+        adapter.commit()
+    except Exception as exc:
+        adapter.rollback()
+        raise RuntimeError(f"Failed to record {len(applied)} applied steps → {exc}") from exc
+    for item in applied:
+        print(f"{prefix}✓ Applied {item.step.filename} {item.step.author}:{item.step.step_id}")
+
+
+def _verify_checksums(steps: List[Step], applied: Dict[Tuple[str, str, str], str], jinja_vars: dict,
+                      render: Callable[[List[Step]], Iterable[RenderedStep]], manifest: Optional[ParseManifest],
+                      cache: ChecksumCache) -> List[Tuple[str, str, str]]:
+    """
+    Keys of the applied *steps* whose SQL no longer renders to the checksum
+    in the log, in step order. Steps the cache vouches for – same source,
+    same values of the variables their template reads – are not rendered;
+    the rest are rendered together, on several processes with --jobs.
+    """
+    different = set()
+    to_render = []
+    for step in steps:
+        key = (step.author, step.step_id, step.filename)
+        cached = cache.lookup(step, _file_hash(manifest, step), jinja_vars, split_checksum(applied[key])[0])
+        if cached is None:
+            to_render.append(step)
+        elif cached != applied[key]:
+            different.add(key)
+
+    for item in render(to_render):
+        step = item.step
+        key = (step.author, step.step_id, step.filename)
+        algorithm = split_checksum(applied[key])[0]
+        checksums = {split_checksum(item.checksum)[0]: item.checksum}
+        if algorithm not in checksums:  # recorded with another algorithm than the configured one
+            checksums[algorithm] = compute_checksum(item.sql, algorithm)
+        cache.store(step, _file_hash(manifest, step), template_variables(step.sql, step.filename), jinja_vars,
+                    checksums)
+        if checksums[algorithm] != applied[key]:
+            different.add(key)
+    return [key for key in ((step.author, step.step_id, step.filename) for step in steps) if key in different]
+
+
+def _file_hash(manifest: Optional[ParseManifest], step: Step) -> Optional[str]:
+    entry = manifest.entry(step.filename) if manifest is not None else None
+    return entry["sha256"] if entry is not None else None
+
+
+def sync_database(config, *, dry_run: bool = False, same_checksums: bool = False,
+                  transaction_mode: str = "per-step", jobs: int = 1,
+                  project: Optional[PreparedProject] = None, target_name: Optional[str] = None,
+                  cancel_event: Optional[threading.Event] = None, parallel: int = 1,
+                  schedule: str = "tiers") -> None:
+    """
+    Apply every pending step of the project to the configured database.
+
+    *project* lets several calls share one parsed and rendered project (see
+    sync_fleet); without it the project is streamed from disk and only the
+    steps this run needs are kept. *target_name* prefixes the progress output.
+    Once *cancel_event* is set the run stops before the next batch; batches
+    already committed stay applied. With *parallel* > 1 files run concurrently
+    on that many connections: tier by tier (see _apply_tiers), or with the
+    "graph" *schedule* as soon as the files they depend on are applied (see
+    _apply_graph).
+    """
+    if transaction_mode not in TRANSACTION_MODES:
+        raise ValueError(f"Unsupported transaction mode {transaction_mode}")
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unsupported schedule {schedule}")
+    if parallel > 1 and transaction_mode == "all-in-one":
+        raise ValueError("The all-in-one transaction mode cannot be spread over parallel connections")
+    prefix = f"[{target_name}] " if target_name else ""
+    if project is None:
+        configure_template_cache(Path(config.project_path) / CACHE_DIR / "templates")
+    adapter = get_adapter(config)
+    # one lock for the whole run, held by the session rather than by each step's transaction
+    if not adapter.acquire_run_lock(config.lock_timeout):
+        raise Exception("sqlstride is already running")
+    try:
+        snapshot = AppliedStepsSnapshot(snapshot_path(Path(config.project_path) / CACHE_DIR, config))
+        applied = adapter.applied_steps(snapshot)
+        # stream the project and keep only the steps this run actually needs
+        manifest = None
+        if project is None:
+            manifest = ParseManifest(Path(config.project_path) / CACHE_DIR / "parse-manifest.json")
+            all_steps = iter_steps(Path(config.project_path), manifest, jobs=jobs)
+        else:
+            all_steps = project.steps
+        pending = []
+        already_applied = []
+        for step in all_steps:
+            if (step.author, step.step_id, step.filename) not in applied:
+                pending.append(step)
+            elif same_checksums:
+                already_applied.append(step)
+        if manifest is not None:
+            manifest.save()
+
+        def render(steps: List[Step]) -> Iterable[RenderedStep]:
+            if project is None:
+                return render_steps(steps, config.jinja_vars, jobs=jobs,
+                                    checksum_algorithm=config.checksum_algorithm)
+            return project.render(steps)
+
+        if same_checksums:
+            #  if applied checksums are different from new checksums raise error
+            if project is None:
+                checksum_cache = ChecksumCache(Path(config.project_path) / CACHE_DIR / "checksums.json")
+            else:
+                manifest, checksum_cache = project.manifest, project.checksum_cache
+            different_checksums = _verify_checksums(already_applied, applied, config.jinja_vars, render,
+                                                    manifest, checksum_cache)
+            checksum_cache.save(prune=project is None)
+            if different_checksums:
+                different_checksum_string = "\n".join(
+                    f"{filename} {author}:{step_id}" for author, step_id, filename in different_checksums)
+                raise Exception(f"Checksums for the following steps are different:\n{different_checksum_string}")
+
+        if not pending:
+            print(f"{prefix}✔ Database is already up to date.")
+            return
+        logger.info(f"{prefix}Found {len(pending)} steps to apply")
+        rendered = render(pending)
+        if dry_run:
+            for item in rendered:
+                print(f"\n-- {prefix}WOULD APPLY {item.step.author}:{item.step.step_id} ({item.step.filename})")
+                print(item.sql)
+            return
+
+        if parallel > 1 and not adapter.concurrent_sessions:
+            logger.info(f"{prefix}{adapter.dialect.name} does not apply steps concurrently, running serially")
+            parallel = 1
+        if parallel > 1:
+            run = _ParallelRun(config, adapter, transaction_mode, prefix, cancel_event)
+            try:
+                graph = None
+                if schedule == "graph":
+                    rendered = list(rendered)
+                    graph = _dependency_graph(config, rendered, prefix)
+                if graph is not None:
+                    _apply_graph(run, graph, parallel)
+                else:
+                    _apply_tiers(run, rendered, parallel)
+            finally:
+                run.close()
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"{prefix}Sync cancelled, remaining steps were not applied")
+            return
+        for batch in _batch_steps(rendered, transaction_mode):
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"{prefix}Sync cancelled, remaining steps were not applied")
+                return
+            _apply_batch(adapter, batch, prefix)
+    finally:
+        adapter.release_run_lock()
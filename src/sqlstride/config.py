@@ -2,11 +2,17 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import List, Optional, Tuple
 
 import yaml
 
+from sqlstride.file_utils.checksum import DEFAULT_CHECKSUM, get_provider
+
+# dialects whose database is a local file (or in memory) rather than a server
+SERVERLESS_DIALECTS = ["sqlite"]
+
 
 @dataclass
 class Config:
@@ -23,12 +29,18 @@ class Config:
     log_table: str = "sqlstride_log"
     lock_table: str = "sqlstride_lock"
     jinja_vars: dict = None
+    lock_timeout: float = 0
+    checksum_algorithm: str = DEFAULT_CHECKSUM  # used for steps applied from now on
 
 
 def load_config(project_path: Path, host: str, port: int, instance: str, database: str, username: str, password: str,
                 trusted_auth: bool, sql_dialect: str, default_schema: str, log_table: str = "sqlstride_log",
-                lock_table: str = "sqlstride_lock", jinja_vars: dict = None) -> Config:
-    """Read sqlstride.yaml, merge env vars & CLI overrides, return a Config object."""
+                lock_table: str = "sqlstride_lock", jinja_vars: dict = None, require_host: bool = True,
+                lock_timeout: float = None, checksum_algorithm: str = None) -> Config:
+    """
+    Read sqlstride.yaml, merge env vars & CLI overrides, return a Config object.
+    require_host=False allows a host-less base config whose targets supply one.
+    """
     config_file = project_path / "sqlstride.yaml"
     if not config_file.exists():
         raise FileNotFoundError("sqlstride.yaml not found in the project path")
@@ -36,9 +48,11 @@ def load_config(project_path: Path, host: str, port: int, instance: str, databas
     data = yaml.safe_load(config_file.read_text()) or {}
     # log_table = data.get("log_table", "sqlstride_log")
     # check if value was passed in from cli, if not load from config file
+    if not sql_dialect:
+        sql_dialect = data.get("sql_dialect", "postgres")
     if not host:
         host = data.get("host", None)
-        if not host:
+        if not host and require_host and sql_dialect not in SERVERLESS_DIALECTS:
             raise ValueError("host is required in sqlstride.yaml or as a CLI argument")
     if not port:
         port = data.get("port", None)
@@ -52,8 +66,6 @@ def load_config(project_path: Path, host: str, port: int, instance: str, databas
         password = data.get("password", None)
     if not trusted_auth:
         trusted_auth = data.get("trusted_auth", False)
-    if not sql_dialect:
-        sql_dialect = data.get("sql_dialect", "postgres")
     if not default_schema:
         default_schema = data.get("default_schema", None)
     if not log_table:
@@ -62,6 +74,49 @@ def load_config(project_path: Path, host: str, port: int, instance: str, databas
         lock_table = data.get("lock_table", "sqlstride_lock")
     if not jinja_vars:
         jinja_vars = data.get("jinja_vars", {})
+    if lock_timeout is None:
+        lock_timeout = data.get("lock_timeout", 0)
+    if not checksum_algorithm:
+        checksum_algorithm = data.get("checksum_algorithm", DEFAULT_CHECKSUM)
+    get_provider(checksum_algorithm)  # unknown, or its package is not installed
 
     return Config(project_path, host, port, instance, database, username, password, trusted_auth,
-                  sql_dialect, default_schema, log_table, lock_table, jinja_vars)
+                  sql_dialect, default_schema, log_table, lock_table, jinja_vars, lock_timeout, checksum_algorithm)
+
+
+# Config fields a fleet target may override; everything else is shared by the fleet
+TARGET_FIELDS = ["host", "port", "instance", "database", "username", "password", "trusted_auth",
+                 "sql_dialect", "default_schema", "log_table", "lock_table"]
+
+
+def load_targets(config: Config, targets_file: Optional[Path] = None) -> List[Tuple[str, Config]]:
+    """
+    Build one Config per fleet target by applying each target's connection
+    overrides on top of *config*.
+
+    Targets come from *targets_file* (a YAML list, or a mapping with a
+    ``targets:`` key) or, without one, from the ``targets:`` section of
+    sqlstride.yaml. A target may carry a ``name``; otherwise it is named
+    host/database.
+    """
+    if targets_file is not None:
+        data = yaml.safe_load(Path(targets_file).read_text()) or []
+    else:
+        data = yaml.safe_load((config.project_path / "sqlstride.yaml").read_text()) or {}
+    if isinstance(data, dict):
+        data = data.get("targets") or []
+    if not data:
+        raise ValueError("no targets found in the targets file or the targets section of sqlstride.yaml")
+
+    targets = []
+    for index, overrides in enumerate(data):
+        overrides = dict(overrides)
+        name = str(overrides.pop("name", "") or "")
+        invalid = sorted(key for key in overrides if key not in TARGET_FIELDS)
+        if invalid:
+            raise ValueError(f"target #{index + 1} sets keys that cannot vary per target: {', '.join(invalid)}")
+        target = replace(config, **overrides)
+        if not target.host and target.sql_dialect not in SERVERLESS_DIALECTS:
+            raise ValueError(f"target #{index + 1} has no host and sqlstride.yaml does not define one")
+        targets.append((name or f"{target.host}/{target.database}", target))
+    return targets
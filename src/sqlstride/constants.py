@@ -2,6 +2,9 @@ import re
 
 # Detect lines like  -- step author:id
 STEP_PATTERN = re.compile(r"(?:--|#)\s*step\s+(\w+):(\w+)", re.IGNORECASE)
+# the same marker, for scanning raw (memory-mapped) file bytes without decoding them; bytes \w is ASCII-only,
+# so UTF-8 sequences are matched too and the parser checks the decoded groups against STEP_PATTERN's \w
+STEP_PATTERN_BYTES = re.compile(rb"(?:--|#)\s*step\s+([\w\x80-\xff]+):([\w\x80-\xff]+)", re.IGNORECASE)
 # execution order for sub-directories
 ORDERED_DIRS = [
     # 1. infrastructure / runtime
@@ -40,3 +43,27 @@ ORDERED_DIRS = [
     # 9. clean-up scripts
     "retire",
 ]
+
+# how pending steps are grouped into transactions during sync
+TRANSACTION_MODES = [
+    "per-step",          # one commit per step (default)
+    "per-file",          # one commit per SQL file
+    "all-in-one",        # one commit for the whole run
+]
+
+# how a parallel sync (--parallel) decides when a file may start
+SCHEDULES = [
+    "tiers",             # once every file of the previous directory tier is applied (default)
+    "graph",             # once the files creating the objects it references are applied
+]
+
+# tiers the --schedule graph scan cannot see every use of (a schema qualifier, a column type, an extension's
+# functions, a role ...), so every file of a later tier waits for all of their files, as with --schedule tiers
+GRAPH_BARRIER_DIRS = ["extensions", "roles", "schemas", "types", "sequences"]
+
+# the step marker at the top of every file baseline writes
+BASELINE_AUTHOR = "system"
+BASELINE_STEP_ID = "baseline"
+
+# project-local directory holding sqlstride's caches; safe to delete at any time
+CACHE_DIR = ".sqlstride/cache"
@@ -1,16 +1,32 @@
 # sqlstride/adapters/__init__.py
-from .postgres import PostgresAdapter
-from .mssql    import MssqlAdapter
-from .mariadb  import MariadbAdapter
+from importlib import import_module
+
 from sqlstride.config import Config
 
+# dialect -> (module, adapter class). An adapter module, and the driver stack
+# behind it, is only imported once a config asks for that dialect.
+ADAPTERS = {
+    "postgres": (".postgres", "PostgresAdapter"),
+    "mssql": (".mssql", "MssqlAdapter"),
+    "mariadb": (".mariadb", "MariadbAdapter"),
+    "sqlite": (".sqlite", "SqliteAdapter"),
+}
+
+
+def _adapter_class(module: str, class_name: str):
+    return getattr(import_module(module, __name__), class_name)
+
 
 def get_adapter(config: Config):
     name = config.sql_dialect  # e.g. "postgres"
-    if name == "postgres":
-        return PostgresAdapter(config)
-    if name == "mssql":
-        return MssqlAdapter(config)
-    if name == "mariadb":
-        return MariadbAdapter(config)
-    raise ValueError(f"Unsupported SQL dialect {name}")
+    if name not in ADAPTERS:
+        raise ValueError(f"Unsupported SQL dialect {name}")
+    return _adapter_class(*ADAPTERS[name])(config)
+
+
+def __getattr__(name: str):
+    # keeps `from sqlstride.database.adapters import PostgresAdapter` working
+    for module, class_name in ADAPTERS.values():
+        if class_name == name:
+            return _adapter_class(module, class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,20 +1,63 @@
 # sqlstride/adapters/base.py
-from abc import ABC, abstractmethod
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Tuple, Iterable
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Set, Tuple, Iterable
 
-import sqlparse
 from etl.database.sql_dialects import SqlDialect
 from etl.logger import Logger
-from sqlalchemy import PoolProxiedConnection
 
+from sqlstride.constants import CACHE_DIR
+from sqlstride.database.applied_snapshot import AppliedStepsSnapshot
 from sqlstride.database.database_object import DatabaseObject
+from sqlstride.file_utils.checksum import DEFAULT_CHECKSUM, split_checksum, stored_checksum
+
+if TYPE_CHECKING:
+    from sqlalchemy import PoolProxiedConnection
 
 logger = Logger().get_logger()
 
+LOCK_POLL_INTERVAL = 0.5  # seconds between attempts while waiting for a busy lock
+
+# Log table layouts:
+#   1 – checksum varchar(2000) holding the hex digest, no index
+#   2 – checksum as a fixed-size binary digest, run_id, unique (author, step_id, filename) index
+#   3 – duration_ms and rows_affected of every step
+#   4 – checksum_algorithm, NULL for sha256 digests
+LOG_TABLE_VERSION = 4
+
+# columns written for every applied step, in LogRecord order
+LOG_COLUMNS = ("author", "step_id", "filename", "checksum", "run_id", "duration_ms", "rows_affected",
+               "checksum_algorithm")
+# nullable columns added by each layout since 2, NULL in the rows written before it
+LOG_ADDED_COLUMNS = {
+    3: (("duration_ms", "integer"), ("rows_affected", "bigint")),
+    4: (("checksum_algorithm", "varchar(16)"),),
+}
+
+# rows per multi-row INSERT into the log table (8 parameters each, well below every driver's limit)
+LOG_INSERT_BATCH = 200
+
+# (author, step_id, filename, checksum digest, run_id, duration_ms, rows_affected, checksum algorithm)
+# – one log table row as written
+LogRecord = Tuple[str, str, str, bytes, str, Optional[int], Optional[int], Optional[str]]
+
+# (author, step_id, filename, applied_at, duration_ms, rows_affected, run_id) – one log table row as read back
+HistoryRecord = Tuple[str, str, str, object, Optional[int], Optional[int], Optional[str]]
+
 
 class BaseAdapter(ABC):
     dialect: SqlDialect = None  # override in subclasses
+    transactional_ddl: bool = False  # True when DDL can be rolled back to a savepoint
+    native_lock: bool = False  # True when the run lock is a server-side application lock, not the lock table
+    concurrent_sessions: bool = True  # False when separate connections cannot apply steps side by side
+    checksum_type: str = "BINARY(32)"  # column type holding a raw digest of up to 32 bytes
+    object_classes: Tuple[str, ...] = ()  # discover_<name>(cursor) methods, in baseline order
 
     def __init__(self, connection: PoolProxiedConnection, default_schema: str, log_table: str, lock_table: str):
         self.connection = connection
@@ -22,29 +65,103 @@ class BaseAdapter(ABC):
         self.lock_table = lock_table
         self.cursor = None
         self.default_schema = default_schema
+        self.run_id = uuid.uuid4().hex  # ties together the log rows written by one sync run
+        self._queued_steps: List[LogRecord] = []
         self.initialize_cursor()
         self.ensure_log_table()
-        self.ensure_lock_table()
+        if not self.native_lock:
+            self.ensure_lock_table()
 
     def initialize_cursor(self):
         """Initialize the cursor if it's None."""
         if self.cursor is None and self.connection is not None:
             self.cursor = self.connection.cursor()
 
+    @property
+    def log_index_name(self) -> str:
+        return f"ux_{self.log_table}_step"
+
     def ensure_log_table(self):
+        """
+        Create the log table in the current layout, or upgrade an existing
+        table written by an older sqlstride in place.
+        """
         if self.dialect is None:
             raise ValueError("Cannot create log table: dialect is None")
+        columns = self.log_table_columns()
+        if not columns:
+            self.create_log_table()
+            return
+        version = self.log_table_version(columns)
+        if version < LOG_TABLE_VERSION:
+            logger.info(f"Upgrading {self.default_schema}.{self.log_table} to log table layout {LOG_TABLE_VERSION}")
+            statements = self.log_table_upgrade_sql() if version < 2 else []
+            for added_in, added_columns in LOG_ADDED_COLUMNS.items():
+                if version < added_in:
+                    statements += self.add_log_columns_sql(added_columns)
+            for statement in statements:
+                self.execute(statement)
+            self.commit()
+
+    def log_table_columns(self) -> Set[str]:
+        """Lower-cased column names of the log table; empty when it does not exist yet."""
+        placeholder = self.dialect.placeholder
+        self.cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            f"WHERE lower(table_schema) = lower({placeholder}) AND lower(table_name) = lower({placeholder});",
+            (self.default_schema, self.log_table),
+        )
+        return {row[0].lower() for row in self.cursor.fetchall()}
+
+    @staticmethod
+    def log_table_version(columns: Set[str]) -> int:
+        if "checksum_algorithm" in columns:
+            return 4
+        if "duration_ms" in columns:
+            return 3
+        return 2 if "run_id" in columns else 1
+
+    def create_log_table(self):
         ddl = f"""
         CREATE TABLE IF NOT EXISTS {self.default_schema}.{self.log_table} (
             {self.dialect.identity_fragment_function(self.log_table)},
             author varchar(100) NOT NULL,
             step_id varchar(100) NOT NULL,
             filename varchar(100) NOT NULL,
-            checksum varchar(2000) NOT NULL,
+            checksum {self.checksum_type} NOT NULL,
+            run_id char(32),
+            duration_ms integer,
+            rows_affected bigint,
+            checksum_algorithm varchar(16),
             applied_at {self.dialect.datetime_type} DEFAULT NOW()
         );
         """
         self.execute(ddl)
+        self.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {self.log_index_name} "
+            f"ON {self.default_schema}.{self.log_table} (author, step_id, filename);"
+        )
+
+    def log_table_upgrade_sql(self) -> List[str]:
+        """
+        Statements that turn a layout 1 log table into layout 2, executed one
+        by one. Dialects spell column changes differently, so every adapter
+        provides its own.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot upgrade an old log table layout")
+
+    def add_log_columns_sql(self, columns: Iterable[Tuple[str, str]]) -> List[str]:
+        """Statements adding nullable (name, type) columns to the log table."""
+        additions = ", ".join(f"ADD COLUMN {name} {column_type}" for name, column_type in columns)
+        return [f"ALTER TABLE {self.default_schema}.{self.log_table} {additions};"]
+
+    def _delete_duplicate_log_rows_sql(self) -> str:
+        """Layout 1 had no unique index; keep the oldest row of any duplicates before adding it."""
+        table = f"{self.default_schema}.{self.log_table}"
+        return (
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT keep_id FROM "
+            f"(SELECT MIN(id) AS keep_id FROM {table} GROUP BY author, step_id, filename) AS keep);"
+        )
 
     def ensure_lock_table(self):
         if self.dialect is None:
@@ -58,37 +175,127 @@ class BaseAdapter(ABC):
         self.execute(ddl)
 
     # identical convenience wrappers the old psycopg code used:
-    def execute(self, sql: str):
+    def execute(self, sql: str) -> Optional[int]:
+        """Run *sql*; returns the rows it affected as the driver reports them, None when unknown (e.g. DDL)."""
         self.initialize_cursor()
         if self.cursor is None:
             raise ValueError("Cannot execute SQL: cursor is None")
         self.cursor.execute(sql)
+        return self._rows_affected(self.cursor)
+
+    @staticmethod
+    def _rows_affected(cursor) -> Optional[int]:
+        rowcount = getattr(cursor, "rowcount", -1)
+        return rowcount if isinstance(rowcount, int) and rowcount >= 0 else None
 
     def commit(self):
+        """Write the queued log rows, then commit them with the work they record."""
+        self.flush_steps()
         self.connection.commit()
 
     def rollback(self):
+        self._queued_steps.clear()
         self.connection.rollback()
 
-    def applied_steps(self) -> Dict[Tuple[str, str, str], str]:
+    def savepoint(self, name: str):
+        self.execute(f"SAVEPOINT {name};")
+
+    def rollback_to_savepoint(self, name: str):
+        self.execute(f"ROLLBACK TO SAVEPOINT {name};")
+
+    def applied_steps(self, snapshot: Optional[AppliedStepsSnapshot] = None) -> Dict[Tuple[str, str, str], str]:
+        """
+        Map every applied (author, step_id, filename) to its checksum string
+        (see file_utils.checksum). With a snapshot only the log rows it has
+        not seen yet are read.
+        """
         self.initialize_cursor()
         if self.cursor is None:
             return {}
+        if snapshot is not None:
+            return snapshot.refresh(self)
         self.cursor.execute(
-            f"SELECT author, step_id, filename, checksum FROM {self.default_schema}.{self.log_table};"
+            f"SELECT author, step_id, filename, checksum, checksum_algorithm "
+            f"FROM {self.default_schema}.{self.log_table};"
         )
         rows = self.cursor.fetchall()
         logger.debug(f"Found {len(rows)} applied steps")
-        return {(row[0], row[1], row[2]): row[3] for row in rows}
+        return {(row[0], row[1], row[2]): stored_checksum(row[3], row[4]) for row in rows}
+
+    def log_watermark(self) -> Tuple[int, int]:
+        """Row count and highest id of the log table."""
+        self.cursor.execute(f"SELECT COUNT(*), MAX(id) FROM {self.default_schema}.{self.log_table};")
+        count, max_id = self.cursor.fetchone()
+        return count, max_id or 0
+
+    def log_row_identity(self, row_id: int) -> Optional[str]:
+        """
+        Fingerprint of log row *row_id* – when and by which run it was written,
+        its step and checksum – or None when there is no such row.
+        """
+        self.cursor.execute(
+            f"SELECT run_id, applied_at, author, step_id, filename, checksum, checksum_algorithm "
+            f"FROM {self.default_schema}.{self.log_table} WHERE id = {self.dialect.placeholder};",
+            (row_id,),
+        )
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return "|".join(str(value) for value in (*row[:5], stored_checksum(row[5], row[6])))
 
-    def record_step(self, step, checksum: str) -> None:
-        values_placeholder = ", ".join([self.dialect.placeholder] * 4)
-        values_placeholder = f"({values_placeholder})"
+    def log_rows_after(self, last_id: int) -> List[Tuple[int, str, str, str, str]]:
+        """Log rows with an id above *last_id*, checksums as strings."""
         self.cursor.execute(
-            f"INSERT INTO {self.default_schema}.{self.log_table} "
-            f"(author, step_id, filename, checksum) VALUES {values_placeholder};",
-            (step.author, step.step_id, step.filename, checksum),
+            f"SELECT id, author, step_id, filename, checksum, checksum_algorithm "
+            f"FROM {self.default_schema}.{self.log_table} WHERE id > {self.dialect.placeholder} ORDER BY id;",
+            (last_id,),
         )
+        return [(row[0], row[1], row[2], row[3], stored_checksum(row[4], row[5])) for row in self.cursor.fetchall()]
+
+    def step_history(self) -> List[HistoryRecord]:
+        """Every log row in the order it was written, with its timing where one was recorded."""
+        self.cursor.execute(
+            f"SELECT author, step_id, filename, applied_at, duration_ms, rows_affected, run_id "
+            f"FROM {self.default_schema}.{self.log_table} ORDER BY id;"
+        )
+        return [tuple(row) for row in self.cursor.fetchall()]
+
+    def _log_record(self, step, checksum: str, duration_ms: Optional[int] = None,
+                    rows_affected: Optional[int] = None) -> LogRecord:
+        # stored as the raw digest, with the algorithm in its own column (NULL for sha256)
+        algorithm, digest = split_checksum(checksum)
+        return (step.author, step.step_id, step.filename, bytes.fromhex(digest), self.run_id,
+                duration_ms, rows_affected, None if algorithm == DEFAULT_CHECKSUM else algorithm)
+
+    def record_step(self, step, checksum: str, duration_ms: Optional[int] = None,
+                    rows_affected: Optional[int] = None) -> None:
+        """Write one log row right away."""
+        self.insert_log_rows([self._log_record(step, checksum, duration_ms, rows_affected)])
+
+    def queue_step(self, step, checksum: str, duration_ms: Optional[int] = None,
+                   rows_affected: Optional[int] = None) -> None:
+        """Queue a log row; queued rows are written in bulk by the next commit()."""
+        self._queued_steps.append(self._log_record(step, checksum, duration_ms, rows_affected))
+
+    def record_steps(self, records: Iterable[Tuple[object, str]]) -> None:
+        """Write log rows for many (step, checksum) pairs at once, e.g. to register a baseline (baseline --register)."""
+        self.insert_log_rows([self._log_record(step, checksum) for step, checksum in records])
+
+    def flush_steps(self) -> None:
+        if self._queued_steps:
+            rows, self._queued_steps = self._queued_steps, []
+            self.insert_log_rows(rows)
+
+    def insert_log_rows(self, rows: List[LogRecord]) -> None:
+        """Insert log rows as multi-row VALUES statements of up to LOG_INSERT_BATCH rows."""
+        row_placeholder = "(" + ", ".join([self.dialect.placeholder] * len(LOG_COLUMNS)) + ")"
+        for start in range(0, len(rows), LOG_INSERT_BATCH):
+            chunk = rows[start:start + LOG_INSERT_BATCH]
+            self.cursor.execute(
+                f"INSERT INTO {self.default_schema}.{self.log_table} "
+                f"({', '.join(LOG_COLUMNS)}) VALUES {', '.join([row_placeholder] * len(chunk))};",
+                [value for row in chunk for value in row],
+            )
 
     def lock(self):
         if self.dialect.name == "mssql":
@@ -99,6 +306,44 @@ class BaseAdapter(ABC):
     def unlock(self):
         self.execute(f"truncate table {self.default_schema}.{self.lock_table};")
 
+    @property
+    def lock_name(self) -> str:
+        """Name of the application lock guarding this log table's database."""
+        return f"sqlstride:{self.default_schema}.{self.lock_table}"
+
+    @staticmethod
+    def _poll_lock(try_lock: Callable[[], bool], timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not try_lock():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(LOCK_POLL_INTERVAL, remaining))
+        return True
+
+    def acquire_run_lock(self, timeout: float = 0) -> bool:
+        """
+        Take the lock that keeps two sqlstride runs apart, waiting up to
+        *timeout* seconds for a running sync to finish. Returns False when the
+        lock is still held after that.
+
+        Adapters with native_lock use a session-level application lock, which
+        the server drops if the connection dies. This fallback commits a row
+        to the lock table instead, which has to be cleared by hand if the
+        process is killed mid-run.
+        """
+        def try_lock() -> bool:
+            if self.is_locked():
+                return False
+            self.lock()
+            self.commit()
+            return True
+        return self._poll_lock(try_lock, timeout)
+
+    def release_run_lock(self) -> None:
+        self.unlock()
+        self.commit()
+
     def is_locked(self):
         self.initialize_cursor()
         if self.cursor is None:
@@ -110,24 +355,85 @@ class BaseAdapter(ABC):
         count = result[0]
         return count > 0
 
-    @abstractmethod
     def discover_objects(self) -> Iterable[DatabaseObject]:
         """
-        Yield DatabaseObject instances for every object in the live database.
-        Subclasses implement all dialect quirks here.
-        """
-        ...
-
-    def write_baseline(self, project_root: Path) -> int:
-        """Iterate over objects and write one *.sql file each."""
-        objects_written = 0
-        for db_object in self.discover_objects():
-            path = db_object.default_path(project_root)
-            path.parent.mkdir(parents=True, exist_ok=True)
-            if path.exists():
-                continue  # skip pre-existing files
-            file_text = f"-- step system:baseline\n\n{db_object.ddl.strip()}\n"
-            file_text = sqlparse.format(file_text, reindent_aligned=True, keyword_case='upper', compact=True)
-            path.write_text(file_text, encoding="utf-8")
-            objects_written += 1
-        return objects_written
+        Yield DatabaseObject instances for every object in the live database,
+        one object class after another over this adapter's cursor.
+        Subclasses implement all dialect quirks in their discover_<class>
+        methods, listed in object_classes.
+        """
+        for object_class in self.object_classes:
+            yield from getattr(self, f"discover_{object_class}")(self.cursor)
+
+    def open_connection(self) -> PoolProxiedConnection:
+        """Open another connection to the same database, for concurrent introspection."""
+        raise NotImplementedError(f"{type(self).__name__} cannot open additional connections")
+
+    def export_snapshot(self) -> Optional[str]:
+        """
+        Start a transaction on this adapter's connection whose snapshot other
+        connections can share, and return its id; None when the engine cannot
+        share snapshots between sessions.
+        """
+        return None
+
+    def import_snapshot(self, cursor, snapshot: str) -> None:
+        """Make the transaction on *cursor* see the exported *snapshot*."""
+
+    def discover_objects_concurrently(self, connections: int = 4) -> Iterator[DatabaseObject]:
+        """
+        Like discover_objects, but introspect the object classes concurrently on
+        a small pool of extra connections, all reading the same snapshot where
+        the engine supports it. Objects are yielded in the same order as
+        discover_objects, one class at a time.
+        """
+        connections = min(connections, len(self.object_classes))
+        if connections <= 1:
+            yield from self.discover_objects()
+            return
+
+        snapshot = self.export_snapshot()
+        opened: List[PoolProxiedConnection] = []
+        opened_lock = threading.Lock()
+        local = threading.local()
+
+        def worker_cursor():
+            if getattr(local, "cursor", None) is None:
+                connection = self.open_connection()
+                with opened_lock:
+                    opened.append(connection)
+                local.cursor = connection.cursor()
+                if snapshot is not None:
+                    self.import_snapshot(local.cursor, snapshot)
+            return local.cursor
+
+        def discover(object_class: str) -> List[DatabaseObject]:
+            return list(getattr(self, f"discover_{object_class}")(worker_cursor()))
+
+        try:
+            with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="sqlstride-introspect") as pool:
+                futures = [pool.submit(discover, object_class) for object_class in self.object_classes]
+                for future in futures:
+                    yield from future.result()
+        finally:
+            for connection in opened:
+                try:
+                    connection.rollback()
+                    connection.close()
+                except Exception as exc:
+                    logger.debug(f"Could not close introspection connection: {exc}")
+            if snapshot is not None:
+                self.connection.rollback()
+
+    def write_baseline(self, project_root: Path, jobs: int = 1, connections: int = 1) -> int:
+        """
+        Iterate over objects and write one *.sql file each. Formatted DDL is
+        cached under the project's .sqlstride directory, so objects that did not
+        change since the last baseline are not formatted again. With
+        connections > 1 the catalog is read over that many connections at once.
+        """
+        from sqlstride.file_utils.baseline import write_baseline_files  # sqlparse is only needed here
+
+        objects = self.discover_objects_concurrently(connections) if connections > 1 else self.discover_objects()
+        return write_baseline_files(objects, project_root, jobs=jobs,
+                                    cache_dir=project_root / CACHE_DIR / "baseline")
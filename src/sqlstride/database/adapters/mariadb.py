@@ -1,24 +1,109 @@
 # sqlstride/adapters/postgres.py
+from __future__ import annotations
+
+import math
 import re
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
 from etl.database.sql_dialects import mariadb
-from sqlalchemy import PoolProxiedConnection
+from etl.logger import Logger
 
 from .base import BaseAdapter
 from sqlstride.database.connector_proxy import build_connector
 from ..database_object import DatabaseObject
 
+if TYPE_CHECKING:
+    from sqlalchemy import PoolProxiedConnection
+
+logger = Logger().get_logger()
+
+# SHOW CREATE statements sent per round trip when the connection allows multi-statements
+SHOW_CREATE_BATCH = 100
+
 
 class MariadbAdapter(BaseAdapter):
 
     dialect = mariadb
+    native_lock = True
+    object_classes = ("tables", "views", "routines", "triggers", "sequences")
 
     def __init__(self, config):
-        connection: PoolProxiedConnection = build_connector(config).to_user_mysql()
-        super().__init__(connection, config.default_schema, config.log_table, config.lock_table)
+        self.config = config
+        super().__init__(self.open_connection(), config.default_schema, config.log_table, config.lock_table)
+        self._multi_statements: Optional[bool] = None  # unknown until the first batch is tried
+
+    def open_connection(self) -> PoolProxiedConnection:
+        return build_connector(self.config).to_user_mysql()
+
+    def _show_create(self, cur, kind: str, objects: List[Tuple[str, str]]) -> Iterator[Tuple[str, str, tuple]]:
+        """
+        Yield (schema, name, row) for SHOW CREATE <kind> of every object.
+
+        The statements are sent SHOW_CREATE_BATCH at a time as one
+        multi-statement query and read back with nextset(). Connections opened
+        without multi-statement support reject such a batch; from then on every
+        object is fetched with its own query.
+        """
+        for start in range(0, len(objects), SHOW_CREATE_BATCH):
+            chunk = objects[start:start + SHOW_CREATE_BATCH]
+            if len(chunk) > 1 and self._multi_statements is not False:
+                try:
+                    cur.execute(" ".join(f"SHOW CREATE {kind} `{schema}`.`{name}`;" for schema, name in chunk))
+                    rows = []
+                    for index, (schema, name) in enumerate(chunk):
+                        if index:
+                            cur.nextset()
+                        rows.append((schema, name, cur.fetchone()))
+                except Exception as exc:
+                    if self._multi_statements:
+                        raise
+                    logger.debug(f"Multi-statement SHOW CREATE not available, fetching one by one: {exc}")
+                    self._multi_statements = False
+                else:
+                    self._multi_statements = True
+                    yield from rows
+                    continue
+            for schema, name in chunk:
+                cur.execute(f"SHOW CREATE {kind} `{schema}`.`{name}`;")
+                yield schema, name, cur.fetchone()
 
-    def discover_objects(self):
-        cur = self.cursor
+    def _routine_parameters(self, cur) -> Dict[Tuple[str, str, str], List[tuple]]:
+        """(mode, name, data_type) of every routine parameter, keyed by (schema, routine, routine type)."""
+        cur.execute("""
+                    SELECT specific_schema, specific_name, routine_type, parameter_mode, parameter_name, data_type
+                    FROM information_schema.parameters
+                    WHERE specific_schema NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys')
+                    ORDER BY specific_schema, specific_name, ordinal_position;
+                    """)
+        parameters = defaultdict(list)
+        for schema, routine, routine_type, mode, name, data_type in cur.fetchall():
+            parameters[schema, routine, routine_type].append((mode, name, data_type))
+        return parameters
+
+    def log_table_upgrade_sql(self):
+        table = f"{self.default_schema}.{self.log_table}"
+        return [
+            self._delete_duplicate_log_rows_sql(),
+            f"ALTER TABLE {table} ADD COLUMN run_id char(32), ADD COLUMN checksum_bin {self.checksum_type};",
+            f"UPDATE {table} SET checksum_bin = UNHEX(checksum);",
+            f"ALTER TABLE {table} DROP COLUMN checksum, "
+            f"CHANGE COLUMN checksum_bin checksum {self.checksum_type} NOT NULL, "
+            f"ADD UNIQUE INDEX {self.log_index_name} (author, step_id, filename);",
+        ]
+
+    def acquire_run_lock(self, timeout: float = 0) -> bool:
+        # GET_LOCK waits on the server; the lock belongs to the session, not the transaction
+        self.cursor.execute("SELECT GET_LOCK(%s, %s);", (self.lock_name, math.ceil(timeout)))
+        result = self.cursor.fetchone()[0]
+        self.commit()
+        return result == 1
 
+    def release_run_lock(self) -> None:
+        self.cursor.execute("SELECT RELEASE_LOCK(%s);", (self.lock_name,))
+        self.commit()
+
+    def discover_tables(self, cur):
         # Tables
         cur.execute(f"""
                     SELECT table_schema, table_name
@@ -26,25 +111,20 @@ class MariadbAdapter(BaseAdapter):
                     WHERE table_type = 'BASE TABLE'
                       AND table_schema NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys');
                     """)
-        for schema, table in cur.fetchall():
-            # Get table DDL
-            cur.execute(f"SHOW CREATE TABLE `{schema}`.`{table}`;")
-            _, ddl = cur.fetchone()
+        for schema, table, (_, ddl) in self._show_create(cur, "TABLE", cur.fetchall()):
             # Add IF NOT EXISTS if not already present
             if "CREATE TABLE" in ddl and "IF NOT EXISTS" not in ddl:
                 ddl = ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1)
             yield DatabaseObject("table", schema, table, ddl)
 
+    def discover_views(self, cur):
         # Views
         cur.execute(f"""
                     SELECT table_schema, table_name
                     FROM information_schema.views
                     WHERE table_schema NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys');
                     """)
-        for schema, view in cur.fetchall():
-            # Get view DDL
-            cur.execute(f"SHOW CREATE VIEW `{schema}`.`{view}`;")
-            result = cur.fetchone()
+        for schema, view, result in self._show_create(cur, "VIEW", cur.fetchall()):
             # SHOW CREATE VIEW returns: View, Create View, character_set_client, collation_connection
             # We need the second column (index 1) which contains the CREATE VIEW statement
             original_ddl = result[1] if result and len(result) > 1 else f"CREATE VIEW `{schema}`.`{view}` AS SELECT 1 AS placeholder;"
@@ -61,6 +141,10 @@ class MariadbAdapter(BaseAdapter):
                 ddl = f"CREATE OR REPLACE VIEW `{schema}`.`{view}` AS SELECT 1 AS placeholder;"
             yield DatabaseObject("view", schema, view, ddl)
 
+    def discover_routines(self, cur):
+        # Parameters of every procedure and function, in one query
+        parameters = self._routine_parameters(cur)
+
         # Procedures
         cur.execute(f"""
                     SELECT routine_schema, routine_name, routine_definition
@@ -69,16 +153,8 @@ class MariadbAdapter(BaseAdapter):
                       AND routine_schema NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys');
                     """)
         for schema, procedure, ddl in cur.fetchall():
-            # Get procedure parameters
-            cur.execute(f"""
-                        SELECT parameter_mode, parameter_name, data_type
-                        FROM information_schema.parameters
-                        WHERE specific_schema = '{schema}'
-                          AND specific_name = '{procedure}'
-                        ORDER BY ordinal_position;
-                        """)
             params = []
-            for mode, name, data_type in cur.fetchall():
+            for mode, name, data_type in parameters.get((schema, procedure, "PROCEDURE"), []):
                 if name:
                     params.append(f"{mode} {name} {data_type}")
                 else:
@@ -96,23 +172,17 @@ class MariadbAdapter(BaseAdapter):
                       AND routine_schema NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys');
                     """)
         for schema, function, ddl, return_type in cur.fetchall():
-            # Get function parameters
-            cur.execute(f"""
-                        SELECT parameter_mode, parameter_name, data_type
-                        FROM information_schema.parameters
-                        WHERE specific_schema = '{schema}'
-                          AND specific_name = '{function}'
-                          AND parameter_name IS NOT NULL
-                        ORDER BY ordinal_position;
-                        """)
             params = []
-            for mode, name, data_type in cur.fetchall():
+            for mode, name, data_type in parameters.get((schema, function, "FUNCTION"), []):
+                if name is None:
+                    continue  # the return value
                 params.append(f"{name} {data_type}")
 
             param_str = ", ".join(params)
             full_ddl = f"CREATE FUNCTION IF NOT EXISTS `{schema}`.`{function}`({param_str}) RETURNS {return_type}\n{ddl}"
             yield DatabaseObject("function", schema, function, full_ddl)
 
+    def discover_triggers(self, cur):
         # Triggers
         cur.execute(f"""
                     SELECT trigger_schema, trigger_name, action_statement, event_manipulation, event_object_table
@@ -123,6 +193,7 @@ class MariadbAdapter(BaseAdapter):
             ddl = f"CREATE TRIGGER IF NOT EXISTS `{schema}`.`{trigger}` {event} ON `{table}` FOR EACH ROW\n{action}"
             yield DatabaseObject("trigger", schema, trigger, ddl)
 
+    def discover_sequences(self, cur):
         # Sequences (MariaDB 10.3+)
         try:
             cur.execute(f"""
@@ -131,10 +202,7 @@ class MariadbAdapter(BaseAdapter):
                         WHERE table_type = 'SEQUENCE'
                           AND table_schema NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys');
                         """)
-            for schema, sequence in cur.fetchall():
-                # Get sequence DDL
-                cur.execute(f"SHOW CREATE TABLE `{schema}`.`{sequence}`;")
-                _, ddl = cur.fetchone()
+            for schema, sequence, (_, ddl) in self._show_create(cur, "TABLE", cur.fetchall()):
                 # Add IF NOT EXISTS if not already present
                 if "CREATE SEQUENCE" in ddl and "IF NOT EXISTS" not in ddl:
                     ddl = ddl.replace("CREATE SEQUENCE", "CREATE SEQUENCE IF NOT EXISTS", 1)
@@ -1,26 +1,36 @@
 # sqlstride/adapters/mssql.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from etl.database.sql_dialects import mssql
-from sqlalchemy import PoolProxiedConnection
 
 from sqlstride.config import Config
 from sqlstride.database.connector_proxy import build_connector
-from .base import BaseAdapter
+from .base import LOG_COLUMNS, BaseAdapter
 from ..database_object import DatabaseObject
 import re
 
+if TYPE_CHECKING:
+    from sqlalchemy import PoolProxiedConnection
+
 
 class MssqlAdapter(BaseAdapter):
     dialect = mssql
+    transactional_ddl = True
+    native_lock = True
+    object_classes = ("tables", "views", "procedures", "functions", "triggers", "sequences", "types")
 
     def __init__(self, config: Config):
-        if config.trusted_auth:
-            connection: PoolProxiedConnection = build_connector(config).to_trusted_msql()
-        else:
-            connection: PoolProxiedConnection = build_connector(config).to_user_msql()
+        self.config = config
+        super().__init__(self.open_connection(), config.default_schema, config.log_table, config.lock_table)
 
-        super().__init__(connection, config.default_schema, config.log_table, config.lock_table)
+    def open_connection(self) -> PoolProxiedConnection:
+        if self.config.trusted_auth:
+            return build_connector(self.config).to_trusted_msql()
+        return build_connector(self.config).to_user_msql()
 
-    def ensure_log_table(self):
+    def create_log_table(self):
         ddl = f"""
         IF NOT EXISTS (
             SELECT 1
@@ -35,14 +45,36 @@ class MssqlAdapter(BaseAdapter):
                 author       VARCHAR(100)  NOT NULL,
                 step_id      VARCHAR(100)  NOT NULL,
                 filename     VARCHAR(100)  NOT NULL,
-                checksum     VARCHAR(2000) NOT NULL,
-                applied_at   DATETIME2      DEFAULT (SYSUTCDATETIME())
+                checksum     BINARY(32)    NOT NULL,
+                run_id       CHAR(32)      NULL,
+                duration_ms  INT           NULL,
+                rows_affected BIGINT       NULL,
+                checksum_algorithm VARCHAR(16) NULL,
+                applied_at   DATETIME2      DEFAULT (SYSUTCDATETIME()),
+                CONSTRAINT {self.log_index_name} UNIQUE (author, step_id, filename)
             );
         END;
         """
 
         self.execute(ddl)
 
+    def log_table_upgrade_sql(self):
+        table = f"[{self.default_schema}].[{self.log_table}]"
+        return [
+            f"WITH ranked AS (SELECT ROW_NUMBER() OVER (PARTITION BY author, step_id, filename ORDER BY id) AS rn "
+            f"FROM {table}) DELETE FROM ranked WHERE rn > 1;",
+            f"ALTER TABLE {table} ADD run_id CHAR(32) NULL, checksum_bin BINARY(32) NULL;",
+            f"UPDATE {table} SET checksum_bin = CONVERT(BINARY(32), checksum, 2);",
+            f"ALTER TABLE {table} DROP COLUMN checksum;",
+            f"EXEC sp_rename '{self.default_schema}.{self.log_table}.checksum_bin', 'checksum', 'COLUMN';",
+            f"ALTER TABLE {table} ALTER COLUMN checksum BINARY(32) NOT NULL;",
+            f"ALTER TABLE {table} ADD CONSTRAINT {self.log_index_name} UNIQUE (author, step_id, filename);",
+        ]
+
+    def add_log_columns_sql(self, columns):
+        additions = ", ".join(f"{name} {column_type} NULL" for name, column_type in columns)
+        return [f"ALTER TABLE [{self.default_schema}].[{self.log_table}] ADD {additions};"]
+
     def ensure_lock_table(self):
 
         ddl = f"""
@@ -66,25 +98,58 @@ class MssqlAdapter(BaseAdapter):
     def lock(self):
         self.execute(f"INSERT INTO {self.default_schema}.{self.lock_table} DEFAULT VALUES;")
 
-    def discover_objects(self):
-        cur = self.cursor
+    def insert_log_rows(self, rows):
+        """pyodbc sends executemany batches as one parameter array with fast_executemany."""
+        if not rows:
+            return
+        self.cursor.fast_executemany = True
+        self.cursor.executemany(
+            f"INSERT INTO [{self.default_schema}].[{self.log_table}] "
+            f"({', '.join(LOG_COLUMNS)}) VALUES ({', '.join(['?'] * len(LOG_COLUMNS))});",
+            rows,
+        )
 
-        # Tables
-        cur.execute(f"""
-                    SELECT 
-                        s.name AS schema_name,
-                        t.name AS table_name
-                    FROM sys.tables t
-                    JOIN sys.schemas s ON t.schema_id = s.schema_id
-                    WHERE s.name NOT IN ('sys', 'INFORMATION_SCHEMA');
-                    """)
-        for schema, table in cur.fetchall():
-            # Get table DDL
-            cur.execute(f"""
-                        WITH cols AS (
+    def acquire_run_lock(self, timeout: float = 0) -> bool:
+        # NOCOUNT keeps row counts out of the way of the result; it lasts for the session, so it is switched
+        # back off, or every step on this connection would report rowcount -1
+        self.cursor.execute(
+            """
+            SET NOCOUNT ON;
+            DECLARE @result INT;
+            EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive',
+                                         @LockOwner = 'Session', @LockTimeout = ?;
+            SELECT @result;
+            SET NOCOUNT OFF;
+            """,
+            (self.lock_name, int(timeout * 1000)),
+        )
+        result = self.cursor.fetchone()[0]
+        self.commit()
+        return result >= 0  # 0 granted, 1 granted after waiting, < 0 timeout / deadlock / error
+
+    def release_run_lock(self) -> None:
+        self.cursor.execute("EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session';", (self.lock_name,))
+        self.commit()
+
+    def savepoint(self, name: str):
+        self.execute(f"SAVE TRANSACTION {name};")
+
+    def rollback_to_savepoint(self, name: str):
+        self.execute(f"ROLLBACK TRANSACTION {name};")
+
+    # CREATE TABLE text for every table at once, grouped by object_id
+    TABLES_DDL_QUERY = """
+                        WITH tables AS (
+                            SELECT t.object_id, s.name AS schema_name, t.name AS table_name
+                            FROM  sys.tables  AS t
+                            JOIN  sys.schemas AS s ON s.schema_id = t.schema_id
+                            WHERE s.name NOT IN ('sys', 'INFORMATION_SCHEMA')
+                        ),
+                        cols AS (
                             SELECT
+                                c.object_id,
                                 c.column_id,
-                        
+
                                 CONCAT(
                                     QUOTENAME(c.name), ' ',
                                     /* type + length / precision -------------------------------- */
@@ -97,7 +162,7 @@ class MssqlAdapter(BaseAdapter):
                                                  THEN 'MAX'
                                                  ELSE CAST(c.max_length AS varchar(10)) END,
                                             ')')
-                        
+
                             WHEN tp.name IN ('nvarchar','nchar')
                                 -- nvarchar length is in bytes; divide by 2 for characters
                                 THEN CONCAT(tp.name,
@@ -106,7 +171,7 @@ class MssqlAdapter(BaseAdapter):
                                                  THEN 'MAX'
                                                  ELSE CAST(c.max_length / 2 AS varchar(10)) END,
                                             ')')
-                        
+
                             /* varbinary -------------------------------------------------------- */
                             WHEN tp.name = 'varbinary'
                                 THEN CONCAT(tp.name,
@@ -115,14 +180,14 @@ class MssqlAdapter(BaseAdapter):
                                                  THEN 'MAX'
                                                  ELSE CAST(c.max_length AS varchar(10)) END,
                                             ')')
-                        
+
                             /* numeric types ---------------------------------------------------- */
                             WHEN tp.name IN ('decimal','numeric')
                                 THEN CONCAT(tp.name,
                                             '(',
                                             CAST(c.precision AS varchar(10)), ',',
                                             CAST(c.scale     AS varchar(10)), ')')
-                        
+
                             /* everything else -------------------------------------------------- */
                             ELSE tp.name
                         END,
@@ -138,8 +203,7 @@ class MssqlAdapter(BaseAdapter):
                                     /* nullability ----------------------------------------------- */
                                     IIF(c.is_nullable = 0, ' NOT NULL', ' NULL')
                                 ) AS col_ddl
-                            FROM  sys.tables  AS t
-                            JOIN  sys.schemas AS s  ON s.schema_id = t.schema_id
+                            FROM  tables      AS t
                             JOIN  sys.columns AS c  ON c.object_id = t.object_id
                             JOIN  sys.types   AS tp ON tp.user_type_id = c.user_type_id
                             LEFT  JOIN sys.identity_columns  AS ic
@@ -147,50 +211,89 @@ class MssqlAdapter(BaseAdapter):
                             LEFT  JOIN sys.default_constraints AS dc
                                    ON dc.parent_object_id = c.object_id
                                   AND dc.parent_column_id = c.column_id
-                            WHERE s.name = '{schema}'
-                              AND t.name = '{table}'
                         ),
                         pk AS (
-                            /* 2.  Primary-key column list ------------------------------------- */
-                            SELECT STRING_AGG(QUOTENAME(c.name), ', ')
+                            /* Primary-key column list per table --------------------------------- */
+                            SELECT i.object_id,
+                                   STRING_AGG(QUOTENAME(c.name), ', ')
                                    WITHIN GROUP (ORDER BY ic.key_ordinal) AS pk_cols
-                            FROM   sys.tables        t
-                            JOIN   sys.schemas       s  ON s.schema_id = t.schema_id
+                            FROM   tables            t
                             JOIN   sys.indexes       i  ON i.object_id = t.object_id
                             JOIN   sys.index_columns ic ON ic.object_id = i.object_id
                                                        AND ic.index_id  = i.index_id
                             JOIN   sys.columns       c  ON c.object_id  = ic.object_id
                                                        AND c.column_id  = ic.column_id
-                            WHERE  s.name = '{schema}'
-                              AND  t.name = '{table}'
-                              AND  i.is_primary_key = 1
+                            WHERE  i.is_primary_key = 1
+                            GROUP BY i.object_id
                         ),
                         col_list AS (
-                            /* 3.  Aggregate columns once, so we can reference it later -------- */
-                            SELECT STRING_AGG(col_ddl, ', ')
+                            /* Column list per table ------------------------------------------- */
+                            SELECT object_id,
+                                   STRING_AGG(CAST(col_ddl AS nvarchar(MAX)), ', ')
                                    WITHIN GROUP (ORDER BY column_id) AS columns_ddl
                             FROM   cols
+                            GROUP BY object_id
                         )
-                        
-                        SELECT CONCAT(
+
+                        SELECT t.schema_name,
+                               t.table_name,
+                               CONCAT(
                                    'CREATE TABLE ',
-                                   QUOTENAME('{schema}'), '.', QUOTENAME('{table}'),
+                                   QUOTENAME(t.schema_name), '.', QUOTENAME(t.table_name),
                                    ' (',
-                                   (SELECT columns_ddl FROM col_list),               -- columns
-                                   IIF((SELECT pk_cols FROM pk) IS NOT NULL,          -- PK block
-                                       CONCAT(', CONSTRAINT PK_', '{table}',
-                                              ' PRIMARY KEY (', (SELECT pk_cols FROM pk), ')'),
+                                   cl.columns_ddl,                                    -- columns
+                                   IIF(pk.pk_cols IS NOT NULL,                        -- PK block
+                                       CONCAT(', CONSTRAINT PK_', t.table_name,
+                                              ' PRIMARY KEY (', pk.pk_cols, ')'),
                                        ''),
                                    ');'
-                               ) AS create_table_sql;
+                               ) AS create_table_sql
+                        FROM tables t
+                        LEFT JOIN col_list cl ON cl.object_id = t.object_id
+                        LEFT JOIN pk          ON pk.object_id = t.object_id
+                        ORDER BY t.schema_name, t.table_name;
                         """
-                        )
-            ddl_row = cur.fetchone()
-            if ddl_row:
-                create_table_ddl = ddl_row[0]
-                # Wrap the CREATE TABLE statement in an IF NOT EXISTS check
-                ddl = \
-                    f"""
+
+    # CREATE TYPE ... AS TABLE text for every user-defined table type at once
+    TABLE_TYPES_DDL_QUERY = """
+                            SELECT
+                                s.name AS schema_name,
+                                tt.name AS type_name,
+                                'CREATE TYPE [' + s.name + '].[' + tt.name + '] AS TABLE (' +
+                                STRING_AGG(
+                                    CAST(
+                                        '[' + c.name + '] ' +
+                                        CASE
+                                            WHEN t.name = 'sysname' THEN 'sysname'
+                                            ELSE
+                                                t.name +
+                                                CASE
+                                                    WHEN t.name IN ('varchar', 'nvarchar', 'char', 'nchar')
+                                                        THEN '(' + CASE WHEN c.max_length = -1 THEN 'MAX' ELSE CAST(c.max_length AS VARCHAR) END + ')'
+                                                    WHEN t.name IN ('decimal', 'numeric')
+                                                        THEN '(' + CAST(c.precision AS VARCHAR) + ',' + CAST(c.scale AS VARCHAR) + ')'
+                                                    ELSE ''
+                                                END
+                                        END +
+                                        CASE WHEN c.is_nullable = 0 THEN ' NOT NULL' ELSE ' NULL' END
+                                    AS NVARCHAR(MAX)),
+                                    ',' + CHAR(13) + CHAR(10) + '    '
+                                ) WITHIN GROUP (ORDER BY c.column_id) +
+                                ')' AS type_ddl
+                            FROM sys.table_types tt
+                            JOIN sys.schemas s ON tt.schema_id = s.schema_id
+                            JOIN sys.columns c ON tt.type_table_object_id = c.object_id
+                            JOIN sys.types t ON c.user_type_id = t.user_type_id
+                            GROUP BY s.name, tt.name;
+                            """
+
+    def discover_tables(self, cur):
+        # Tables: one catalog query, however many tables there are
+        cur.execute(self.TABLES_DDL_QUERY)
+        for schema, table, create_table_ddl in cur.fetchall():
+            # Wrap the CREATE TABLE statement in an IF NOT EXISTS check
+            ddl = \
+                f"""
                     IF NOT EXISTS (
                         SELECT 1
                         FROM INFORMATION_SCHEMA.TABLES
@@ -201,8 +304,9 @@ class MssqlAdapter(BaseAdapter):
                         {create_table_ddl}
                     END;
                     """
-                yield DatabaseObject("table", schema, table, ddl)
+            yield DatabaseObject("table", schema, table, ddl)
 
+    def discover_views(self, cur):
         # Views
         cur.execute(f"""
                     SELECT 
@@ -220,6 +324,7 @@ class MssqlAdapter(BaseAdapter):
                 definition = re.sub("CREATE", "CREATE OR ALTER", definition, count=1, flags=re.IGNORECASE)
             yield DatabaseObject("view", schema, view, definition)
 
+    def discover_procedures(self, cur):
         # Stored Procedures
         cur.execute(f"""
                     SELECT 
@@ -237,6 +342,7 @@ class MssqlAdapter(BaseAdapter):
                 definition = re.sub("CREATE", "CREATE OR ALTER", definition, count=1, flags=re.IGNORECASE)
             yield DatabaseObject("procedure", schema, procedure, definition)
 
+    def discover_functions(self, cur):
         # Functions
         cur.execute(f"""
                     SELECT 
@@ -261,6 +367,7 @@ class MssqlAdapter(BaseAdapter):
                 definition = re.sub("CREATE", "CREATE OR ALTER", definition, count=1, flags=re.IGNORECASE)
             yield DatabaseObject("function", schema, function, definition)
 
+    def discover_triggers(self, cur):
         # Triggers
         cur.execute(f"""
                     SELECT
@@ -278,6 +385,7 @@ class MssqlAdapter(BaseAdapter):
                 definition = re.sub("CREATE", "CREATE OR ALTER", definition, count=1, flags=re.IGNORECASE)
             yield DatabaseObject("trigger", schema, trigger, definition)
 
+    def discover_sequences(self, cur):
         # Sequences
         cur.execute(f"""
                     SELECT 
@@ -324,6 +432,7 @@ END;
 """
             yield DatabaseObject("sequence", schema, sequence, ddl)
 
+    def discover_types(self, cur):
         # Types (User-Defined Types)
         cur.execute(f"""
                     SELECT 
@@ -343,42 +452,16 @@ END;
                     WHERE t.is_user_defined = 1
                     AND s.name NOT IN ('sys', 'INFORMATION_SCHEMA');
                     """)
-        for schema, type_name, type_kind, base_type, max_length, precision, scale in cur.fetchall():
+        user_types = cur.fetchall()
+        # definitions of all table types in one query, keyed by (schema, type name)
+        table_type_ddl = {}
+        if any(type_kind == 'TABLE' for _, _, type_kind, *_ in user_types):
+            cur.execute(self.TABLE_TYPES_DDL_QUERY)
+            table_type_ddl = {(schema, type_name): type_ddl for schema, type_name, type_ddl in cur.fetchall()}
+        for schema, type_name, type_kind, base_type, max_length, precision, scale in user_types:
             if type_kind == 'TABLE':
-                # Get table type definition
-                cur.execute(f"""
-                            SELECT 
-                                'CREATE TYPE [{schema}].[{type_name}] AS TABLE (' +
-                                STRING_AGG(
-                                    CAST(
-                                        '[' + c.name + '] ' + 
-                                        CASE 
-                                            WHEN t.name = 'sysname' THEN 'sysname'
-                                            ELSE 
-                                                t.name + 
-                                                CASE 
-                                                    WHEN t.name IN ('varchar', 'nvarchar', 'char', 'nchar') 
-                                                        THEN '(' + CASE WHEN c.max_length = -1 THEN 'MAX' ELSE CAST(c.max_length AS VARCHAR) END + ')'
-                                                    WHEN t.name IN ('decimal', 'numeric') 
-                                                        THEN '(' + CAST(c.precision AS VARCHAR) + ',' + CAST(c.scale AS VARCHAR) + ')'
-                                                    ELSE ''
-                                                END
-                                        END +
-                                        CASE WHEN c.is_nullable = 0 THEN ' NOT NULL' ELSE ' NULL' END
-                                    AS NVARCHAR(MAX)), 
-                                    ',' + CHAR(13) + CHAR(10) + '    '
-                                ) +
-                                ')' AS type_ddl
-                            FROM sys.table_types tt
-                            JOIN sys.columns c ON tt.type_table_object_id = c.object_id
-                            JOIN sys.types t ON c.user_type_id = t.user_type_id
-                            WHERE tt.schema_id = SCHEMA_ID('{schema}')
-                            AND tt.name = '{type_name}'
-                            GROUP BY tt.name;
-                            """)
-                ddl_row = cur.fetchone()
-                if ddl_row:
-                    type_ddl = ddl_row[0]
+                type_ddl = table_type_ddl.get((schema, type_name))
+                if type_ddl:
                     # Wrap the CREATE TYPE statement in an IF NOT EXISTS check
                     ddl = f"""
                             IF NOT EXISTS (
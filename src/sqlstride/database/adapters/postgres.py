@@ -1,111 +1,173 @@
 # sqlstride/adapters/postgres.py
+from __future__ import annotations
+
+import csv
+import io
 import subprocess
+from typing import TYPE_CHECKING
 
 from etl.database.sql_dialects import postgres
-from sqlalchemy import PoolProxiedConnection
 from sqlstride.database.connector_proxy import build_connector
 
-from .base import BaseAdapter
+from .base import LOG_COLUMNS, BaseAdapter
 from ..database_object import DatabaseObject
 
+if TYPE_CHECKING:
+    from sqlalchemy import PoolProxiedConnection
+
 
 class PostgresAdapter(BaseAdapter):
     dialect = postgres
+    transactional_ddl = True
+    native_lock = True
+    object_classes = ("tables", "views", "functions", "procedures", "triggers", "materialized_views")
+    checksum_type = "bytea"
 
     def __init__(self, config):
-        connection: PoolProxiedConnection = build_connector(config).to_user_postgres()
-        super().__init__(connection, config.default_schema, config.log_table, config.lock_table)
+        self.config = config
+        super().__init__(self.open_connection(), config.default_schema, config.log_table, config.lock_table)
 
-    def discover_objects(self):
-        cur = self.cursor
-        # Tables via pg_dump
-        cur.execute("""
-                    SELECT table_schema, table_name
-                    FROM information_schema.tables
-                    WHERE table_type = 'BASE TABLE'
-                      AND table_schema NOT IN ('pg_catalog', 'information_schema');
-                    """)
-        for schema, table in cur.fetchall():
-            ddl_query = f"""
-WITH cols AS (SELECT c.table_schema,
-                     c.table_name,
-                     c.ordinal_position,
+    def open_connection(self) -> PoolProxiedConnection:
+        return build_connector(self.config).to_user_postgres()
+
+    def export_snapshot(self):
+        self.commit()
+        self.cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+        self.cursor.execute("SELECT pg_export_snapshot();")
+        return self.cursor.fetchone()[0]
+
+    def import_snapshot(self, cursor, snapshot):
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+        cursor.execute("SET TRANSACTION SNAPSHOT %s;", (snapshot,))
+
+    def log_table_upgrade_sql(self):
+        table = f"{self.default_schema}.{self.log_table}"
+        return [
+            self._delete_duplicate_log_rows_sql(),
+            f"ALTER TABLE {table} ADD COLUMN run_id char(32), "
+            f"ALTER COLUMN checksum TYPE bytea USING decode(checksum, 'hex');",
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {self.log_index_name} ON {table} (author, step_id, filename);",
+        ]
+
+    COPY_THRESHOLD = 50  # below this a multi-row INSERT is cheaper than starting a COPY
+
+    def insert_log_rows(self, rows):
+        """Stream larger batches of log rows with COPY when the driver supports it (psycopg2)."""
+        if len(rows) < self.COPY_THRESHOLD or not hasattr(self.cursor, "copy_expert"):
+            return super().insert_log_rows(rows)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for author, step_id, filename, checksum, run_id, duration_ms, rows_affected, algorithm in rows:
+            # None becomes an unquoted empty field, which COPY reads as NULL
+            writer.writerow((author, step_id, filename, "\\x" + checksum.hex(), run_id, duration_ms, rows_affected,
+                             algorithm))
+        buffer.seek(0)
+        self.cursor.copy_expert(
+            f"COPY {self.default_schema}.{self.log_table} ({', '.join(LOG_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+    def acquire_run_lock(self, timeout: float = 0) -> bool:
+        def try_lock() -> bool:
+            self.cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s));", (self.lock_name,))
+            acquired = self.cursor.fetchone()[0]
+            self.commit()  # session-level lock: it survives the commit
+            return bool(acquired)
+        return self._poll_lock(try_lock, timeout)
+
+    def release_run_lock(self) -> None:
+        self.cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", (self.lock_name,))
+        self.commit()
+
+    # DDL for every table in one pass over the catalog; the column and primary
+    # key clauses follow the layout the per-table information_schema query used
+    TABLES_DDL_QUERY = r"""
+WITH tables AS (SELECT c.oid, n.nspname AS table_schema, c.relname AS table_name
+                FROM pg_class AS c
+                         JOIN pg_namespace AS n ON n.oid = c.relnamespace
+                WHERE c.relkind IN ('r', 'p')
+                  AND n.nspname NOT IN ('pg_catalog', 'information_schema')),
+
+     cols AS (SELECT t.oid,
+                     a.attnum,
 
                   /* complete column-definition text */
                      FORMAT(
                              '%I %s%s%s%s',
-                             c.column_name, -- column name
+                             a.attname, -- column name
                      /* data type */
                              CASE
-                                 WHEN c.data_type IN ('character', 'character varying')
-                                     THEN 'varchar(' || c.character_maximum_length || ')'
-                                 WHEN c.data_type IN ('numeric', 'decimal')
-                                     THEN c.data_type || '(' || c.numeric_precision || ',' || c.numeric_scale || ')'
-                                 ELSE c.data_type
+                                 WHEN a.atttypid IN ('bpchar'::regtype, 'varchar'::regtype) AND a.atttypmod > 0
+                                     THEN 'varchar(' || (a.atttypmod - 4) || ')'
+                                 WHEN a.atttypid = 'numeric'::regtype AND a.atttypmod > 0
+                                     THEN 'numeric(' || ((a.atttypmod - 4) >> 16) || ','
+                                              || ((a.atttypmod - 4) & 65535) || ')'
+                                 ELSE format_type(a.atttypid, NULL)
                                  END,
                          /* identity / serial */
                              CASE
                                  WHEN pg_get_serial_sequence(
-                                         FORMAT('%I.%I', c.table_schema, c.table_name), -- qualified table
-                                         c.column_name
+                                         FORMAT('%I.%I', t.table_schema, t.table_name), -- qualified table
+                                         a.attname
                                       ) IS NOT NULL
                                      THEN ' GENERATED BY DEFAULT AS IDENTITY'
                                  ELSE ''
                                  END,
                          /* default value */
-                             CASE
-                                 WHEN c.column_default IS NOT NULL
-                                     THEN ' DEFAULT ' || c.column_default
-                                 ELSE ''
-                                 END,
+                             COALESCE(' DEFAULT ' || pg_get_expr(d.adbin, d.adrelid), ''),
                          /* nullability */
-                             CASE
-                                 WHEN c.is_nullable = 'NO'
-                                     THEN ' NOT NULL'
-                                 ELSE ''
-                                 END
+                             CASE WHEN a.attnotnull THEN ' NOT NULL' ELSE '' END
                      ) AS col_ddl
-              FROM information_schema.columns AS c
-              WHERE c.table_schema = '{schema}'
-                AND c.table_name = '{table}'),
+              FROM tables AS t
+                       JOIN pg_attribute AS a
+                            ON a.attrelid = t.oid
+                                AND a.attnum > 0
+                                AND NOT a.attisdropped
+                       LEFT JOIN pg_attrdef AS d
+                                 ON d.adrelid = a.attrelid
+                                     AND d.adnum = a.attnum),
 
-     pk AS (SELECT tc.table_schema,
-                   tc.table_name,
+     pk AS (SELECT con.conrelid AS oid,
                    FORMAT(
                            'CONSTRAINT %I PRIMARY KEY (%s)',
-                           tc.constraint_name,
-                           STRING_AGG(kcu.column_name, ', ' ORDER BY kcu.ordinal_position)
+                           con.conname,
+                           STRING_AGG(a.attname, ', ' ORDER BY k.ordinality)
                    ) AS pk_ddl
-            FROM information_schema.table_constraints AS tc
-                     JOIN information_schema.key_column_usage AS kcu
-                          ON tc.constraint_name = kcu.constraint_name
-                              AND tc.table_schema = kcu.table_schema
-                              AND tc.table_name = kcu.table_name
-            WHERE tc.constraint_type = 'PRIMARY KEY'
-              AND tc.table_schema = '{schema}'
-              AND tc.table_name = '{table}'
-            GROUP BY tc.table_schema, tc.table_name, tc.constraint_name)
-
-SELECT FORMAT(
-               'CREATE TABLE IF NOT EXISTS %I.%I (\n    %s%s\n);',
-               c.table_schema,
-               c.table_name,
+            FROM pg_constraint AS con
+                     JOIN tables AS t ON t.oid = con.conrelid
+                     CROSS JOIN LATERAL UNNEST(con.conkey) WITH ORDINALITY AS k(attnum, ordinality)
+                     JOIN pg_attribute AS a
+                          ON a.attrelid = con.conrelid
+                              AND a.attnum = k.attnum
+            WHERE con.contype = 'p'
+            GROUP BY con.conrelid, con.conname)
+
+SELECT t.table_schema,
+       t.table_name,
+       FORMAT(
+               E'CREATE TABLE IF NOT EXISTS %I.%I (\n    %s%s\n);',
+               t.table_schema,
+               t.table_name,
            /* columns */
-               STRING_AGG(c.col_ddl, ',\n    ' ORDER BY c.ordinal_position),
+               STRING_AGG(c.col_ddl, E',\n    ' ORDER BY c.attnum),
            /* primary key clause, if any */
                COALESCE(E',\n    ' || pk.pk_ddl, '')
        ) AS ddl
-FROM cols AS c
-         LEFT JOIN pk
-                   ON pk.table_schema = c.table_schema
-                       AND pk.table_name = c.table_name
-GROUP BY c.table_schema, c.table_name, pk.pk_ddl;
-                   """
-            cur.execute(ddl_query)
-
-            ddl, = cur.fetchone()          # returns the generated DDL string
+FROM tables AS t
+         JOIN cols AS c ON c.oid = t.oid
+         LEFT JOIN pk ON pk.oid = t.oid
+GROUP BY t.table_schema, t.table_name, pk.pk_ddl
+ORDER BY t.table_schema, t.table_name;
+"""
+
+    def discover_tables(self, cur):
+        # Tables: one catalog query, however many tables there are
+        cur.execute(self.TABLES_DDL_QUERY)
+        for schema, table, ddl in cur.fetchall():
             yield DatabaseObject("table", schema, table, ddl)
 
+    def discover_views(self, cur):
         # Views
         cur.execute("""
                     SELECT table_schema,
@@ -118,6 +180,7 @@ GROUP BY c.table_schema, c.table_name, pk.pk_ddl;
             yield DatabaseObject("view", schema, view,
                                  f"CREATE OR REPLACE VIEW {schema}.{view} AS\n{ddl};")
 
+    def discover_functions(self, cur):
         # Functions
         cur.execute("""
                     SELECT n.nspname AS schema_name,
@@ -134,6 +197,7 @@ GROUP BY c.table_schema, c.table_name, pk.pk_ddl;
                 ddl = ddl.replace("CREATE FUNCTION", "CREATE OR REPLACE FUNCTION", 1)
             yield DatabaseObject("function", schema, function_name, ddl)
 
+    def discover_procedures(self, cur):
         # Procedures
         cur.execute("""
                     SELECT n.nspname           AS schema_name,
@@ -148,12 +212,13 @@ WHERE  p.prokind = 'p'                         -- procedures only
   -- optional language / visibility / extension filters here
 ORDER  BY n.nspname, p.proname, arg_signature;
                     """)
-        for schema, procedure_name, ddl in cur.fetchall():
+        for schema, procedure_name, _, ddl in cur.fetchall():
             # Replace CREATE PROCEDURE with CREATE OR REPLACE PROCEDURE for idempotent creation
             if ddl.startswith("CREATE PROCEDURE"):
                 ddl = ddl.replace("CREATE PROCEDURE", "CREATE OR REPLACE PROCEDURE", 1)
             yield DatabaseObject("procedure", schema, procedure_name, ddl)
 
+    def discover_triggers(self, cur):
         # Triggers
         cur.execute("""
                     SELECT 
@@ -175,6 +240,7 @@ ORDER  BY n.nspname, p.proname, arg_signature;
                 ddl = f"DROP TRIGGER IF EXISTS {trigger_name} ON {table_name};\n{ddl}"
             yield DatabaseObject("trigger", schema, trigger_name, ddl)
 
+    def discover_materialized_views(self, cur):
         # Materialized Views
         cur.execute("""
                     SELECT 
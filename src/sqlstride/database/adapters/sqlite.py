@@ -0,0 +1,198 @@
+# sqlstride/adapters/sqlite.py
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Iterator
+
+from etl.database.sql_dialects import SqlDialect
+
+from sqlstride.config import Config
+from .base import BaseAdapter
+from ..database_object import DatabaseObject
+
+sqlite = SqlDialect(
+    name="sqlite",
+    opening_escape='"',
+    closing_escape='"',
+    datetime_type="timestamp",
+    boolean_type="integer",
+    maximum_varchar_length=None,  # sqlite does not enforce varchar lengths
+    identity_fragment_function=lambda table: (
+        f"id integer constraint pk_{table}_id primary key autoincrement"
+    ),
+    primary_key_fragment_function=lambda table, column: (
+        f" constraint pk_{table}_{column} primary key"
+    ),
+    unique_key_fragment_function=lambda table, column: (
+        f" constraint ak_{table}_{column} unique"
+    ),
+    placeholder="?",
+    comment="--"
+)
+
+IN_MEMORY = ":memory:"
+
+
+class SqliteAdapter(BaseAdapter):
+    """
+    Adapter for a local SQLite file, or an in-memory database when the
+    config's database is empty or ":memory:". Needs no server, so dry runs,
+    tests and benchmarks can run the whole pipeline on an isolated machine.
+    """
+    dialect = sqlite
+    transactional_ddl = True
+    checksum_type = "BLOB"
+    object_classes = ("tables", "views", "triggers")
+    # one writer per database file, and every in-memory connection is a database of its own
+    concurrent_sessions = False
+
+    def __init__(self, config: Config):
+        self.config = config
+        super().__init__(self.open_connection(), config.default_schema or "main", config.log_table, config.lock_table)
+        self.commit()  # the log and lock tables must exist before another connection looks for them
+
+    @property
+    def database_path(self) -> str:
+        database = self.config.database or IN_MEMORY
+        if database == IN_MEMORY or database.startswith("file:"):
+            return database
+        return str(Path(self.config.project_path) / database)
+
+    def open_connection(self) -> sqlite3.Connection:
+        # isolation_level=None: the driver never opens or commits transactions
+        # on its own, so DDL inside a step is rolled back with the rest of it
+        return sqlite3.connect(self.database_path, isolation_level=None, check_same_thread=False,
+                               uri=self.database_path.startswith("file:"))
+
+    def _begin(self) -> None:
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN;")
+
+    @staticmethod
+    def split_statements(sql: str) -> Iterator[str]:
+        """Split a script into statements; semicolons inside literals and trigger bodies stay put."""
+        buffer = ""
+        for part in sql.split(";"):
+            buffer += part + ";"
+            if sqlite3.complete_statement(buffer):
+                if buffer.strip(" \t\r\n;"):
+                    yield buffer
+                buffer = ""
+        if buffer.strip(" \t\r\n;"):
+            yield buffer
+
+    def execute(self, sql: str):
+        self.initialize_cursor()
+        self._begin()
+        # a step may hold several statements, but the driver runs one per call;
+        # executescript would commit the open transaction first
+        rows_affected = None
+        for statement in self.split_statements(sql):
+            self.cursor.execute(statement)
+            rows = self._rows_affected(self.cursor)
+            if rows is not None:
+                rows_affected = (rows_affected or 0) + rows
+        return rows_affected
+
+    def create_log_table(self):
+        self.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.default_schema}.{self.log_table} (
+            {self.dialect.identity_fragment_function(self.log_table)},
+            author varchar(100) NOT NULL,
+            step_id varchar(100) NOT NULL,
+            filename varchar(100) NOT NULL,
+            checksum {self.checksum_type} NOT NULL,
+            run_id char(32),
+            duration_ms integer,
+            rows_affected bigint,
+            checksum_algorithm varchar(16),
+            applied_at {self.dialect.datetime_type} DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS {self.default_schema}.{self.log_index_name}
+        ON {self.log_table} (author, step_id, filename);
+        """)
+
+    def add_log_columns_sql(self, columns):
+        # sqlite adds one column per ALTER TABLE
+        return [f"ALTER TABLE {self.default_schema}.{self.log_table} ADD COLUMN {name} {column_type};"
+                for name, column_type in columns]
+
+    def log_table_columns(self):
+        self.cursor.execute(f"PRAGMA {self.default_schema}.table_info({self.log_table});")
+        return {row[1].lower() for row in self.cursor.fetchall()}
+
+    def ensure_lock_table(self):
+        self.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.default_schema}.{self.lock_table} (
+        {self.dialect.identity_fragment_function(self.lock_table)},
+        locked_at {self.dialect.datetime_type} DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+
+    def insert_log_rows(self, rows):
+        self._begin()
+        super().insert_log_rows(rows)
+
+    def lock(self):
+        self.execute(f"INSERT INTO {self.default_schema}.{self.lock_table} DEFAULT VALUES;")
+
+    def unlock(self):
+        self.execute(f"DELETE FROM {self.default_schema}.{self.lock_table};")
+
+    def acquire_run_lock(self, timeout: float = 0) -> bool:
+        # BEGIN IMMEDIATE takes the database's write lock, so checking and
+        # taking the lock row cannot interleave with another sqlstride process
+        def try_lock() -> bool:
+            self.commit()
+            try:
+                self.cursor.execute("BEGIN IMMEDIATE;")
+            except sqlite3.OperationalError:  # another connection is writing
+                return False
+            if self.is_locked():
+                self.rollback()
+                return False
+            self.lock()
+            self.commit()
+            return True
+        return self._poll_lock(try_lock, timeout)
+
+    def discover_objects_concurrently(self, connections: int = 4):
+        # the catalog is a local file read in microseconds; extra connections gain nothing
+        return self.discover_objects()
+
+    def _master_rows(self, cur, kind: str):
+        cur.execute(
+            f"SELECT name, tbl_name, sql FROM {self.default_schema}.sqlite_master "
+            f"WHERE type = ? AND name NOT LIKE 'sqlite_%' AND sql IS NOT NULL ORDER BY name;",
+            (kind,),
+        )
+        return cur.fetchall()
+
+    def discover_tables(self, cur):
+        # Tables, each with the indexes declared on it
+        indexes = {}
+        for name, table, ddl in self._master_rows(cur, "index"):
+            indexes.setdefault(table, []).append(
+                ddl.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX IF NOT EXISTS", 1)
+                   .replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1)
+            )
+        for name, _, ddl in self._master_rows(cur, "table"):
+            if "IF NOT EXISTS" not in ddl:
+                ddl = ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1)
+            statements = [f"{ddl};"] + [f"{index};" for index in indexes.get(name, [])]
+            yield DatabaseObject("table", self.default_schema, name, "\n".join(statements))
+
+    def discover_views(self, cur):
+        # Views
+        for name, _, ddl in self._master_rows(cur, "view"):
+            if "IF NOT EXISTS" not in ddl:
+                ddl = ddl.replace("CREATE VIEW", "CREATE VIEW IF NOT EXISTS", 1)
+            yield DatabaseObject("view", self.default_schema, name, f"{ddl};")
+
+    def discover_triggers(self, cur):
+        # Triggers
+        for name, _, ddl in self._master_rows(cur, "trigger"):
+            if "IF NOT EXISTS" not in ddl:
+                ddl = ddl.replace("CREATE TRIGGER", "CREATE TRIGGER IF NOT EXISTS", 1)
+            yield DatabaseObject("trigger", self.default_schema, name, f"{ddl};")
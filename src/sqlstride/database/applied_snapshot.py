@@ -0,0 +1,95 @@
+# sqlstride/database/applied_snapshot.py
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from etl.logger import Logger
+
+from sqlstride.file_utils.json_cache import load_versioned_json, write_versioned_json
+
+logger = Logger().get_logger()
+
+__all__ = ["AppliedStepsSnapshot", "snapshot_path"]
+
+# (id, author, step_id, filename, checksum) – one log table row, checksum as a string (see file_utils.checksum)
+LogRow = Tuple[int, str, str, str, str]
+
+
+def snapshot_path(cache_dir: Path, config) -> Path:
+    """One snapshot file per database and log table the project is synced against."""
+    target = "|".join(str(value) for value in (
+        config.sql_dialect, config.host, config.port, config.instance, config.database,
+        config.default_schema, config.log_table,
+    ))
+    return cache_dir / "applied" / f"{sha256(target.encode()).hexdigest()[:16]}.json"
+
+
+class AppliedStepsSnapshot:
+    """
+    Local copy of a database's log table, refreshed incrementally.
+
+    The snapshot remembers the highest log id and the row count it has seen,
+    and a fingerprint of the row with that id. A refresh asks the server for
+    its current count and max id, then fetches only the rows above the
+    remembered id. If the remembered row changed (the database was
+    re-provisioned, even to the same count and max id) or the server's
+    numbers do not line up with the snapshot plus the new rows (rows were
+    deleted, ...), the snapshot is thrown away and the full log is read.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.max_id = 0
+        self.count = 0
+        self.anchor: Optional[str] = None  # log_row_identity of the row with max_id
+        self._steps: Dict[Tuple[str, str, str], str] = {}
+        self.load()
+
+    def load(self) -> None:
+        data = load_versioned_json(self.path, self.VERSION)
+        if data is None:
+            return
+        self.max_id, self.count, self.anchor = data["max_id"], data["count"], data["anchor"]
+        self._steps = {(author, step_id, filename): checksum
+                       for author, step_id, filename, checksum in data["steps"]}
+
+    def refresh(self, adapter) -> Dict[Tuple[str, str, str], str]:
+        """Bring the snapshot up to date with the adapter's log table and return its steps."""
+        count, max_id = adapter.log_watermark()
+        if self.count and adapter.log_row_identity(self.max_id) != self.anchor:
+            logger.debug("The last log row of the applied steps snapshot has changed, reloading it")
+        elif (count, max_id) == (self.count, self.max_id):
+            logger.debug(f"Applied steps snapshot is current ({count} steps)")
+            return dict(self._steps)
+        elif self.count and max_id >= self.max_id:
+            new_rows = adapter.log_rows_after(self.max_id)
+            if self.count + len(new_rows) == count:
+                logger.debug(f"Fetched {len(new_rows)} new applied steps")
+                self._merge(adapter, new_rows)
+                self.save()
+                return dict(self._steps)
+            logger.debug("Log table no longer matches the applied steps snapshot, reloading it")
+
+        self._steps = {}
+        self.count = self.max_id = 0
+        self._merge(adapter, adapter.log_rows_after(0))
+        self.save()
+        return dict(self._steps)
+
+    def _merge(self, adapter, rows: List[LogRow]) -> None:
+        for row_id, author, step_id, filename, checksum in rows:
+            self._steps[author, step_id, filename] = checksum
+            self.max_id = max(self.max_id, row_id)
+        self.count += len(rows)
+        if rows:
+            self.anchor = adapter.log_row_identity(self.max_id)
+
+    def save(self) -> None:
+        write_versioned_json(self.path, self.VERSION, {
+            "max_id": self.max_id,
+            "count": self.count,
+            "anchor": self.anchor,
+            "steps": [[*key, checksum] for key, checksum in self._steps.items()],
+        }, "applied steps snapshot")
@@ -1,10 +1,17 @@
 # sqlstride/connector_proxy.py
-from etl.database.connector import Connector
+from typing import TYPE_CHECKING
+
 from sqlstride.config import Config
 
+if TYPE_CHECKING:
+    from etl.database.connector import Connector
+
 
-def build_connector(config: Config) -> Connector:
+def build_connector(config: Config) -> "Connector":
     """Instantiate Connector from the db-easy config section."""
+    # sqlalchemy (and through it the drivers) is only imported once a connection is needed
+    from etl.database.connector import Connector
+
     # split cfg.db_url or use discrete fields; illustration only:
     return Connector(
         host     = config.host,
@@ -0,0 +1,146 @@
+# sqlstride/file_utils/baseline.py
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from hashlib import sha256
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+import sqlparse
+from etl.logger import Logger
+
+from sqlstride.constants import BASELINE_AUTHOR, BASELINE_STEP_ID
+from sqlstride.database.database_object import DatabaseObject
+
+logger = Logger().get_logger()
+
+__all__ = ["FormatCache", "format_baseline_ddl", "write_baseline_files"]
+
+
+class FormatCache:
+    """
+    Formatted baseline files keyed by the hash of their unformatted text (and
+    the sqlparse version), one small file per entry so that worker processes
+    can share the cache without coordinating. Without a directory nothing is
+    cached. The keys looked up or stored are collected in *used*, so that a
+    baseline run can prune() the entries it no longer needs.
+    """
+
+    def __init__(self, directory: Optional[Path]):
+        self.directory = directory
+        self.used: Set[str] = set()
+
+    @staticmethod
+    def key(file_text: str) -> str:
+        return sha256(f"{sqlparse.__version__}\0{file_text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.sql"
+
+    def get(self, key: str) -> Optional[str]:
+        if self.directory is None:
+            return None
+        self.used.add(key)
+        try:
+            return self._path(key).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def put(self, key: str, formatted: str) -> None:
+        if self.directory is None:
+            return
+        self.used.add(key)
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_text(formatted, encoding="utf-8")
+            os.replace(temp_path, path)
+        except OSError as exc:
+            logger.debug(f"Could not write format cache entry: {exc}")
+
+    def prune(self, keep: Set[str]) -> int:
+        """Delete the entries not in *keep* and temp files left by interrupted writes; returns the files removed."""
+        if self.directory is None or not self.directory.is_dir():
+            return 0
+        removed = 0
+        for path in [*self.directory.glob("*/*.sql"), *self.directory.glob("*/*.tmp")]:
+            if path.suffix == ".sql" and path.stem in keep:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except OSError as exc:
+                logger.debug(f"Could not remove format cache entry: {exc}")
+        for subdirectory in self.directory.iterdir():
+            try:
+                subdirectory.rmdir()  # only succeeds once it is empty
+            except OSError:
+                pass
+        return removed
+
+
+def format_baseline_ddl(ddl: str, cache: FormatCache) -> str:
+    """Turn an object's DDL into the text of its baseline file, reusing earlier formatting when possible."""
+    file_text = f"-- step {BASELINE_AUTHOR}:{BASELINE_STEP_ID}\n\n{ddl.strip()}\n"
+    key = cache.key(file_text)
+    formatted = cache.get(key)
+    if formatted is None:
+        formatted = sqlparse.format(file_text, reindent_aligned=True, keyword_case='upper', compact=True)
+        cache.put(key, formatted)
+    return formatted
+
+
+def _write_object_job(path: Path, ddl: str, cache_dir: Optional[Path]) -> Set[str]:
+    cache = FormatCache(cache_dir)
+    path.write_text(format_baseline_ddl(ddl, cache), encoding="utf-8")
+    return cache.used
+
+
+def write_baseline_files(objects: Iterable[DatabaseObject], project_root: Path, jobs: int = 1,
+                         cache_dir: Optional[Path] = None) -> int:
+    """
+    Write one baseline *.sql file per object, skipping files that already exist.
+
+    *objects* is consumed as it is produced, so catalog queries and
+    formatting overlap. With jobs > 1 formatting and writing happen in a pool
+    of worker processes, with a bounded number of objects in flight. Format
+    cache entries not used by the run are pruned once it completes.
+    """
+    claimed: Set[Path] = set()
+    used_keys: Set[str] = set()
+
+    def claim(db_object: DatabaseObject) -> Optional[Path]:
+        path = db_object.default_path(project_root)
+        if path in claimed or path.exists():
+            return None  # skip pre-existing files
+        claimed.add(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    objects_written = 0
+    if jobs <= 1:
+        for db_object in objects:
+            path = claim(db_object)
+            if path is not None:
+                used_keys |= _write_object_job(path, db_object.ddl, cache_dir)
+                objects_written += 1
+        FormatCache(cache_dir).prune(used_keys)
+        return objects_written
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        in_flight = set()
+        for db_object in objects:
+            path = claim(db_object)
+            if path is None:
+                continue
+            in_flight.add(pool.submit(_write_object_job, path, db_object.ddl, cache_dir))
+            if len(in_flight) >= jobs * 4:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    used_keys |= future.result()
+                    objects_written += 1
+        for future in in_flight:
+            used_keys |= future.result()
+            objects_written += 1
+    FormatCache(cache_dir).prune(used_keys)
+    return objects_written
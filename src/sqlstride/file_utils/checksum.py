@@ -0,0 +1,81 @@
+# sqlstride/file_utils/checksum.py
+import hashlib
+from functools import partial
+from importlib.util import find_spec
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+__all__ = ["ChecksumProvider", "CHECKSUM_ALGORITHMS", "DEFAULT_CHECKSUM", "get_provider", "compute_checksum",
+           "format_checksum", "split_checksum", "stored_checksum"]
+
+# the algorithm of every checksum written before algorithms could be chosen; its checksums carry no prefix
+DEFAULT_CHECKSUM = "sha256"
+
+ENCODE_CHUNK = 1 << 20  # characters encoded and hashed at a time, so large seed files are never copied whole
+
+
+def _xxh3():
+    import xxhash  # optional dependency, only needed for xxh3 checksums
+    return xxhash.xxh3_128()
+
+
+class ChecksumProvider(NamedTuple):
+    name: str
+    digest_size: int  # bytes; at most 32, the width of the log table's checksum column
+    new: Callable[[], object]  # returns a hashlib-style object with update() and digest()
+    module: Optional[str] = None  # optional package the algorithm needs, installed by the extra named after it
+
+    def checksum(self, sql: str) -> str:
+        """Hash *sql* as UTF-8, encoding it chunk by chunk."""
+        hasher = self.new()
+        for start in range(0, len(sql), ENCODE_CHUNK):
+            hasher.update(sql[start:start + ENCODE_CHUNK].encode())
+        return format_checksum(self.name, hasher.digest())
+
+
+CHECKSUM_ALGORITHMS: Dict[str, ChecksumProvider] = {
+    "sha256": ChecksumProvider("sha256", 32, hashlib.sha256),
+    "blake2b": ChecksumProvider("blake2b", 32, partial(hashlib.blake2b, digest_size=32)),
+    "xxh3": ChecksumProvider("xxh3", 16, _xxh3, module="xxhash"),
+}
+
+
+def get_provider(name: str) -> ChecksumProvider:
+    provider = CHECKSUM_ALGORITHMS.get(name)
+    if provider is None:
+        raise ValueError(f"Unsupported checksum algorithm {name}")
+    if provider.module is not None and find_spec(provider.module) is None:
+        raise ValueError(f"The {name} checksum algorithm needs the {provider.module} package "
+                         f"(pip install sqlstride[{name}])")
+    return provider
+
+
+def compute_checksum(sql: str, algorithm: str = DEFAULT_CHECKSUM) -> str:
+    return get_provider(algorithm).checksum(sql)
+
+
+def format_checksum(algorithm: str, digest: bytes) -> str:
+    """Checksums are handed around as hex, prefixed with their algorithm unless it is sha256."""
+    return digest.hex() if algorithm == DEFAULT_CHECKSUM else f"{algorithm}:{digest.hex()}"
+
+
+def split_checksum(checksum: str) -> Tuple[str, str]:
+    """(algorithm, hex digest) of a checksum string."""
+    algorithm, _, digest = checksum.rpartition(":")
+    return algorithm or DEFAULT_CHECKSUM, digest
+
+
+def stored_checksum(value: Union[bytes, memoryview, str], algorithm: Optional[str]) -> str:
+    """
+    The checksum string of a log table row: its raw digest and its algorithm
+    column, which is NULL for sha256. Fixed-width binary columns pad shorter
+    digests with zero bytes, so the digest is cut back to its algorithm's size.
+    """
+    if isinstance(value, str):  # layout 1 stored the hex digest itself
+        return value
+    algorithm = algorithm or DEFAULT_CHECKSUM
+    digest = bytes(value)
+    provider = CHECKSUM_ALGORITHMS.get(algorithm)
+    if provider is not None:
+        digest = digest[:provider.digest_size]
+    return format_checksum(algorithm, digest)
+
@@ -0,0 +1,96 @@
+# sqlstride/file_utils/checksum_cache.py
+import json
+import threading
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlstride.file_utils.json_cache import JsonCache
+from sqlstride.file_utils.parser import Step
+
+__all__ = ["ChecksumCache", "step_source_hash", "variables_fingerprint"]
+
+
+def step_source_hash(step: Step) -> str:
+    """sha256 of the step's raw (unrendered) SQL."""
+    return sha256(step.sql.encode()).hexdigest()
+
+
+def variables_fingerprint(variables: List[str], jinja_vars: dict) -> str:
+    """Fingerprint of the values of just the variables a template reads, and of which of them are undefined."""
+    values = {name: jinja_vars[name] for name in variables if name in jinja_vars}
+    missing = [name for name in variables if name not in jinja_vars]
+    return sha256(json.dumps([values, missing], sort_keys=True, default=repr).encode()).hexdigest()
+
+
+class ChecksumCache(JsonCache):
+    """
+    Persistent record of what every applied step rendered to, so that
+    --same-checksums only renders the steps whose source or relevant Jinja
+    variables changed.
+
+    Each entry is keyed by the step and holds the content hash of its file
+    (from the parse manifest), the hash of the step's own SQL, the variables
+    its template reads, a fingerprint of their values and the checksum of the
+    rendered SQL per algorithm. An unchanged file is not even read; in a
+    changed file, steps whose own SQL is unchanged still skip rendering.
+    """
+
+    VERSION = 1
+    ENTRIES = "steps"
+    DESCRIPTION = "checksum cache"
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._lock = threading.Lock()  # fleet targets share one cache
+
+    @staticmethod
+    def _key(step: Step) -> str:
+        return f"{step.filename} {step.author}:{step.step_id}"
+
+    def lookup(self, step: Step, file_hash: Optional[str], jinja_vars: dict, algorithm: str) -> Optional[str]:
+        """
+        The checksum (with *algorithm*) the step renders to with *jinja_vars*,
+        or None when it has to be rendered again. *file_hash* is the content
+        hash of the step's file, None when unknown.
+        """
+        key = self._key(step)
+        with self._lock:
+            self._seen.add(key)
+            entry = self._entries.get(key)
+        if entry is None or algorithm not in entry["checksums"]:
+            return None
+        if file_hash is None or entry["file"] != file_hash:
+            if entry["step"] != step_source_hash(step):
+                return None
+            with self._lock:
+                entry["file"] = file_hash
+                self._dirty = True
+        if entry["fingerprint"] != variables_fingerprint(entry["variables"], jinja_vars):
+            return None
+        return entry["checksums"][algorithm]
+
+    def store(self, step: Step, file_hash: Optional[str], variables: List[str], jinja_vars: dict,
+              checksums: Dict[str, str]) -> None:
+        """Remember the checksums (algorithm → checksum) of the step rendered with *jinja_vars*."""
+        key = self._key(step)
+        entry = {
+            "file": file_hash,
+            "step": step_source_hash(step),
+            "variables": variables,
+            "fingerprint": variables_fingerprint(variables, jinja_vars),
+            "checksums": checksums,
+        }
+        with self._lock:
+            self._seen.add(key)
+            self._entries[key] = entry
+            self._dirty = True
+
+    def save(self, prune: bool = True) -> None:
+        """
+        Write the cache back, dropping (*prune*) steps that were not verified
+        during this run. Fleet targets share one cache and each has applied
+        different steps, so they keep every entry.
+        """
+        with self._lock:
+            super().save(prune)
@@ -0,0 +1,238 @@
+# sqlstride/file_utils/dependencies.py
+import re
+from collections import defaultdict
+from itertools import groupby
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from sqlstride.constants import GRAPH_BARRIER_DIRS, ORDERED_DIRS
+from sqlstride.file_utils.json_cache import JsonCache
+from sqlstride.file_utils.pipeline import RenderedStep
+
+__all__ = ["StepObjects", "Misordered", "analyze_sql", "tier_rank", "DependencyCache", "DependencyGraph"]
+
+# an identifier, bare or quoted the postgres, mssql or mariadb way, optionally schema-qualified
+_NAME = r'(?:"[^"]+"|\[[^\]]+\]|`[^`]+`|[A-Za-z_][\w$#]*)'
+_QUALIFIED_NAME = rf"{_NAME}(?:\s*\.\s*{_NAME}){{0,2}}"
+
+_COMMENTS_AND_LITERALS = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'", re.DOTALL)
+_CREATE = re.compile(
+    r"\bCREATE\s+(?:OR\s+(?:REPLACE|ALTER)\s+)?"
+    r"(?:(?:GLOBAL|LOCAL|TEMP|TEMPORARY|UNLOGGED|UNIQUE|CLUSTERED|NONCLUSTERED|MATERIALIZED|RECURSIVE)\s+)*"
+    r"(?:TABLE|VIEW|FUNCTION|PROCEDURE|PROC|TRIGGER|INDEX|SEQUENCE|TYPE|DOMAIN|SYNONYM|SCHEMA|EXTENSION|ROLE|USER)"
+    rf"\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({_QUALIFIED_NAME})",
+    re.IGNORECASE,
+)
+_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN|REFERENCES|INTO|UPDATE|TABLE|CALL|EXEC|EXECUTE(?:\s+(?:FUNCTION|PROCEDURE))?|"
+    r"ON(?:\s+(?:TABLE|VIEW|SEQUENCE|FUNCTION|PROCEDURE))?)\s+(?:ONLY\s+)?"
+    rf"({_QUALIFIED_NAME})",
+    re.IGNORECASE,
+)
+_MODIFY = re.compile(
+    r"\b(?:ALTER|DROP)\s+(?:MATERIALIZED\s+)?"
+    r"(?:TABLE|VIEW|FUNCTION|PROCEDURE|PROC|TRIGGER|INDEX|SEQUENCE|TYPE|DOMAIN|SYNONYM|SCHEMA|EXTENSION|ROLE|USER)"
+    rf"\s+(?:CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({_QUALIFIED_NAME})",
+    re.IGNORECASE,
+)
+_CALL = re.compile(rf"({_QUALIFIED_NAME})\s*\(")
+# the type of a column, parameter or cast: (id int, m app.mood) / ADD COLUMN m mood / x::mood
+_TYPE = re.compile(rf"(?:[(,]|\bADD(?:\s+COLUMN)?)\s*{_NAME}\s+({_QUALIFIED_NAME})|::\s*({_QUALIFIED_NAME})",
+                   re.IGNORECASE)
+# roles granted to or owning something: GRANT ... TO reader, writer / OWNER TO app / AUTHORIZATION app
+_GRANTEES = re.compile(rf"\b(?:TO|AUTHORIZATION)\s+((?:{_NAME}\s*,\s*)*{_NAME})", re.IGNORECASE)
+# sequences are referenced by name inside a literal: nextval('orders_id_seq')
+_SEQUENCE_CALL = re.compile(rf"\b(?:nextval|currval|setval)\s*\(\s*'({_QUALIFIED_NAME})'", re.IGNORECASE)
+
+
+class StepObjects(NamedTuple):
+    creates: FrozenSet[str]
+    references: FrozenSet[str]
+    modifies: FrozenSet[str] = frozenset()  # objects the step alters or drops
+
+
+class Misordered(NamedTuple):
+    step: RenderedStep
+    dependency: RenderedStep
+    name: str  # the object the step uses and the dependency creates
+
+
+def _parts(qualified_name: str) -> List[str]:
+    return [part.strip().strip('"[]`').lower() for part in re.split(r"\s*\.\s*", qualified_name)]
+
+
+def _object_name(qualified_name: str) -> str:
+    """Objects are matched by their lower-cased name; the schema is ignored."""
+    return _parts(qualified_name)[-1]
+
+
+def _qualifiers(qualified_names) -> Set[str]:
+    """The schemas (and databases) the names are qualified with; using app.t references the schema app."""
+    return {part for name in qualified_names for part in _parts(name)[:-1]}
+
+
+def analyze_sql(sql: str) -> StepObjects:
+    """
+    Find the objects a step creates, alters or drops and the names it may
+    reference.
+
+    This is a scan for the statements migrations are made of, not a SQL
+    parser: references are names in FROM, JOIN, REFERENCES, INTO, UPDATE,
+    ON ..., CALL/EXEC positions, anything that looks like a function call or
+    a column type, roles things are granted to and the schemas names are
+    qualified with. Most of them are keywords or built-ins; DependencyGraph
+    only keeps the ones another step creates or modifies.
+    """
+    sequence_names = _SEQUENCE_CALL.findall(sql)
+    code = _COMMENTS_AND_LITERALS.sub(" ", sql)
+    created_names = _CREATE.findall(code)
+    modified_names = _MODIFY.findall(code)
+    referenced_names = _REFERENCE.findall(code) + _CALL.findall(code) + sequence_names
+    referenced_names += [name for match in _TYPE.findall(code) for name in match if name]
+    creates = {_object_name(name) for name in created_names}
+    references = {_object_name(name) for name in referenced_names}
+    references.update(_object_name(name) for match in _GRANTEES.findall(code) for name in match.split(","))
+    references.update(_qualifiers(created_names + modified_names + referenced_names))
+    modifies = {_object_name(name) for name in modified_names} - creates
+    return StepObjects(frozenset(creates), frozenset(references - creates), frozenset(modifies))
+
+
+def tier_rank(filename: str) -> Tuple[int, str]:
+    """Sort key of the tier (top-level directory) a step file runs in, matching the parser's order."""
+    directory = filename.split("/", 1)[0] if "/" in filename else ""
+    if directory in ORDERED_DIRS:
+        return ORDERED_DIRS.index(directory), ""
+    return len(ORDERED_DIRS), directory
+
+
+class DependencyCache(JsonCache):
+    """
+    Persistent analyze_sql results keyed by the rendered step's checksum, so
+    a step is only scanned again after its SQL changed.
+    """
+
+    VERSION = 3  # bump when analyze_sql finds different names for the same SQL
+    ENTRIES = "steps"
+    DESCRIPTION = "dependency cache"
+
+    def analyze(self, item: RenderedStep) -> StepObjects:
+        self._seen.add(item.checksum)
+        entry = self._entries.get(item.checksum)
+        if entry is not None:
+            return StepObjects(*(frozenset(names) for names in entry))
+        objects = analyze_sql(item.sql)
+        self._entries[item.checksum] = [sorted(names) for names in objects]
+        self._dirty = True
+        return objects
+
+    def save(self, prune: bool = False) -> None:
+        """
+        Write the cache back. A sync only analyzes its pending steps, so
+        entries are only dropped (*prune*) after a pass over the whole project.
+        """
+        super().save(prune)
+
+
+class DependencyGraph:
+    """
+    Which of the given steps (in run order) depend on which others.
+
+    A step depends on the steps before it that create or modify an object
+    it creates, references or modifies: the latest one that creates it and
+    every one that alters or drops it since – or all of them when the
+    object already exists, e.g. an ALTER TABLE of an incremental deploy.
+    When a referenced object is only created later in the run the step
+    depends on the first creator after it, which misordered() reports.
+    Names no step creates or modifies (keywords, built-ins, objects that are
+    only read) are ignored.
+    """
+
+    def __init__(self, rendered: List[RenderedStep], cache: Optional[DependencyCache] = None):
+        self.steps = rendered
+        self.objects = [cache.analyze(item) if cache is not None else analyze_sql(item.sql) for item in rendered]
+        objects = self.objects
+        creators: Dict[str, List[int]] = defaultdict(list)
+        writers: Dict[str, List[int]] = defaultdict(list)  # steps creating or modifying the object, in run order
+        readers: Dict[str, List[int]] = defaultdict(list)
+        for index, step_objects in enumerate(objects):
+            for name in step_objects.creates:
+                creators[name].append(index)
+            for name in step_objects.creates | step_objects.modifies:
+                writers[name].append(index)
+            for name in step_objects.references:
+                readers[name].append(index)
+        # step index -> {index of a step it depends on: object linking them}
+        self.dependencies: List[Dict[int, str]] = [{} for _ in rendered]
+        for index, step_objects in enumerate(objects):
+            for name in sorted(step_objects.creates | step_objects.references | step_objects.modifies):
+                earlier = [writer for writer in writers.get(name, ()) if writer < index]
+                created = [writer for writer in earlier if writer in creators.get(name, ())]
+                if created:
+                    earlier = earlier[earlier.index(created[-1]):]
+                for writer in earlier:
+                    self.dependencies[index].setdefault(writer, name)
+                if not earlier and name not in step_objects.creates and creators.get(name):
+                    self.dependencies[index].setdefault(creators[name][0], name)
+                if name in step_objects.modifies:
+                    # altering or dropping an object waits for the steps still using it as it was
+                    since = earlier[-1] if earlier else -1
+                    for reader in readers.get(name, ()):
+                        if since < reader < index:
+                            self.dependencies[index].setdefault(reader, name)
+
+    def misordered(self) -> List[Misordered]:
+        """Steps that use an object created by a step in a later tier."""
+        found = []
+        for index, dependencies in enumerate(self.dependencies):
+            step = self.steps[index]
+            for dependency, name in dependencies.items():
+                if tier_rank(self.steps[dependency].step.filename) > tier_rank(step.step.filename):
+                    found.append(Misordered(step, self.steps[dependency], name))
+        return found
+
+    def files(self) -> Dict[str, List[RenderedStep]]:
+        """The steps of every file, files in run order."""
+        return {filename: list(items) for filename, items in groupby(self.steps, key=lambda item: item.step.filename)}
+
+    def file_dependencies(self) -> Dict[str, Set[str]]:
+        """
+        Every file mapped to the other files that must be applied before it.
+
+        Besides the dependencies the scan found, tier order still holds
+        wherever the scan cannot vouch for a file: every file waits for the
+        files of earlier GRAPH_BARRIER_DIRS tiers (extensions, schemas, types
+        ... are used in more ways than it recognizes) and for earlier-tier
+        files none of whose steps create or alter an object it recognizes
+        (seed data, DO blocks, grants ...).
+        """
+        waits: Dict[str, Set[str]] = {item.step.filename: set() for item in self.steps}
+        for index, dependencies in enumerate(self.dependencies):
+            filename = self.steps[index].step.filename
+            for dependency in dependencies:
+                if self.steps[dependency].step.filename != filename:
+                    waits[filename].add(self.steps[dependency].step.filename)
+
+        understood: Dict[str, bool] = defaultdict(lambda: True)
+        for item, step_objects in zip(self.steps, self.objects):
+            if not (step_objects.creates or step_objects.modifies):
+                understood[item.step.filename] = False
+        barriers: List[str] = []  # files of the tiers before the current one that every later file waits for
+        for _, tier_files in groupby(waits, key=tier_rank):
+            tier_files = list(tier_files)
+            for filename in tier_files:
+                waits[filename].update(barriers)
+            barriers.extend(filename for filename in tier_files
+                            if filename.split("/", 1)[0] in GRAPH_BARRIER_DIRS or not understood[filename])
+        return waits
+
+    def has_cycle(self) -> bool:
+        """True when some files wait on each other, so no order satisfies every dependency."""
+        remaining = {filename: set(waits) for filename, waits in self.file_dependencies().items()}
+        while remaining:
+            ready = [filename for filename, waits in remaining.items() if not waits]
+            if not ready:
+                return True
+            for filename in ready:
+                del remaining[filename]
+            for waits in remaining.values():
+                waits.difference_update(ready)
+        return False
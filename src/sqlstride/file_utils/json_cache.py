@@ -0,0 +1,80 @@
+# sqlstride/file_utils/json_cache.py
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from etl.logger import Logger
+
+logger = Logger().get_logger()
+
+__all__ = ["load_versioned_json", "write_versioned_json", "JsonCache"]
+
+
+def load_versioned_json(path: Path, version: int) -> Optional[dict]:
+    """The JSON document at *path*, or None when it is missing, unreadable or written by another version."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+def write_versioned_json(path: Path, version: int, data: dict, description: str) -> bool:
+    """
+    Atomically replace *path* with *data* tagged with *version*. Everything
+    written under .sqlstride/ is only an optimisation, so a read-only project
+    must not fail the run: errors are logged and reported as False.
+    """
+    # unique per process and thread, so concurrent writers never share a half-written file
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path.write_text(json.dumps({"version": version, **data}, separators=(",", ":")), encoding="utf-8")
+        os.replace(temp_path, path)
+    except OSError as exc:
+        logger.debug(f"Could not write {description}: {exc}")
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+        return False
+    return True
+
+
+class JsonCache:
+    """
+    Base of the caches kept as one versioned JSON file of keyed entries.
+
+    Entries looked up or stored during a run are marked as seen; save()
+    writes the file back when something changed and, with *prune*, drops
+    the entries that were not seen.
+    """
+
+    VERSION = 1
+    ENTRIES = "entries"  # key of the entries in the JSON document
+    DESCRIPTION = "cache"  # how the debug log names the cache when it cannot be written
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Dict[str, Any] = {}
+        self._seen: Set[str] = set()
+        self._dirty = False
+        self.load()
+
+    def load(self) -> None:
+        data = load_versioned_json(self.path, self.VERSION)
+        if data is not None:
+            self._entries = data.get(self.ENTRIES, {})
+
+    def save(self, prune: bool = True) -> None:
+        stale = set(self._entries) - self._seen if prune else set()
+        for key in stale:
+            del self._entries[key]
+        if not (self._dirty or stale):
+            return
+        if write_versioned_json(self.path, self.VERSION, {self.ENTRIES: self._entries}, self.DESCRIPTION):
+            self._dirty = False
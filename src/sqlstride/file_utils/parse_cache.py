@@ -0,0 +1,67 @@
+# sqlstride/file_utils/parse_cache.py
+import os
+from hashlib import sha256
+from typing import List, Optional, Tuple
+
+from sqlstride.file_utils.json_cache import JsonCache
+
+__all__ = ["StepBoundary", "ParseManifest"]
+
+# (author, step_id, start, end) – the step's SQL is the file's bytes[start:end]
+StepBoundary = Tuple[str, str, int, int]
+
+
+class ParseManifest(JsonCache):
+    """
+    Persistent record of the step boundaries found in every SQL file.
+
+    Each entry is keyed by the file's project-relative name and stores its
+    size, mtime and content hash next to the boundaries. A file whose stat
+    signature is unchanged is trusted as-is; a file whose stat changed but
+    whose content hash did not (e.g. after a fresh checkout) keeps its
+    boundaries too. Only new or edited files are scanned again.
+    """
+
+    VERSION = 4  # bump when the parser finds different boundaries in the same bytes
+    ENTRIES = "files"
+    DESCRIPTION = "parse manifest"
+
+    def lookup(self, relative_name: str, stat: os.stat_result,
+               content=None) -> Optional[List[StepBoundary]]:
+        """
+        Return the cached boundaries for the file, or None if it has to be parsed.
+        Without *content* only the stat signature is compared, so the caller can
+        skip reading the file; with it (any bytes-like object, e.g. an mmap), a
+        changed stat is forgiven when the content hash still matches.
+        """
+        self._seen.add(relative_name)
+        entry = self._entries.get(relative_name)
+        if entry is None:
+            return None
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return [tuple(boundary) for boundary in entry["steps"]]
+        if content is not None and entry["sha256"] == sha256(content).hexdigest():
+            entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            self._dirty = True
+            return [tuple(boundary) for boundary in entry["steps"]]
+        return None
+
+    def store(self, relative_name: str, stat: os.stat_result, content, steps: List[StepBoundary]) -> None:
+        self._seen.add(relative_name)
+        self._entries[relative_name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256(content).hexdigest(),
+            "steps": [list(boundary) for boundary in steps],
+        }
+        self._dirty = True
+
+    def entry(self, relative_name: str) -> Optional[dict]:
+        return self._entries.get(relative_name)
+
+    def adopt(self, relative_name: str, entry: Optional[dict]) -> None:
+        """Take over the entry a worker process produced for *relative_name*."""
+        self._seen.add(relative_name)
+        if entry is not None and self._entries.get(relative_name) != entry:
+            self._entries[relative_name] = entry
+            self._dirty = True
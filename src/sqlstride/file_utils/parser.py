@@ -1,37 +1,176 @@
 # sqlstride/parser.py
+import mmap
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import List, NamedTuple
-from sqlstride.constants import STEP_PATTERN, ORDERED_DIRS
+from typing import Iterator, List, Optional, Tuple
+from sqlstride.constants import STEP_PATTERN_BYTES, ORDERED_DIRS
+from sqlstride.file_utils.parse_cache import ParseManifest, StepBoundary
 from etl.logger import Logger
 
 logger = Logger().get_logger()
 
-__all__ = ["Step", "parse_sql_file", "parse_directory"]
+__all__ = ["Step", "parse_sql_file", "iter_steps", "parse_directory"]
 
 
-class Step(NamedTuple):
-    author: str
-    step_id: str
-    sql: str
-    filename: str
+class Step:
+    """
+    One migration step.
+
+    Only the location of the step's SQL is kept – the file it lives in and
+    the byte offsets of its (stripped) body – so a project's steps take a few
+    dozen bytes each. The SQL is read from disk each time .sql is accessed,
+    i.e. only when a step is actually rendered or executed. Steps built with
+    an explicit sql text simply return it.
+    """
+
+    __slots__ = ("author", "step_id", "filename", "path", "start", "end", "_sql")
+
+    def __init__(self, author: str, step_id: str, sql: Optional[str] = None, filename: str = "",
+                 path: Optional[Path] = None, start: int = 0, end: int = 0):
+        self.author = sys.intern(author)
+        self.step_id = step_id
+        self.filename = sys.intern(filename)
+        self.path = path
+        self.start = start
+        self.end = end
+        self._sql = sql
+
+    @property
+    def sql(self) -> str:
+        if self._sql is not None:
+            return self._sql
+        with open(self.path, "rb") as file:
+            file.seek(self.start)
+            return file.read(self.end - self.start).decode("utf-8")
+
+    def _key(self) -> tuple:
+        return self.author, self.step_id, self.filename, self.path, self.start, self.end, self._sql
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Step):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"Step(author={self.author!r}, step_id={self.step_id!r}, filename={self.filename!r})"
+
+
+# the ASCII characters str.strip() removes; bytes.strip() would keep \x1c-\x1f
+_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f")
 
 
-def parse_sql_file(file_path: Path, base_dir: Path) -> List[Step]:
-    steps: List[Step] = []
-    content = file_path.read_text(encoding="utf-8")
+def _utf8_length(lead: int) -> int:
+    return 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
 
-    matches = list(STEP_PATTERN.finditer(content))
-    logger.debug(f"Found {len(matches)} steps in {file_path}")
-    for i, match in enumerate(matches):
-        author, step_id = match.groups()
-        start = match.end()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
-        sql_block = content[start:end].strip()
-        relative_name = file_path.relative_to(base_dir).as_posix()
-        steps.append(
-            Step(author=author, step_id=step_id, sql=sql_block, filename=relative_name)
-        )
-    return steps
+
+def _is_space(data, start: int, end: int) -> bool:
+    """Whether data[start:end] is one whitespace character in UTF-8 (\xa0, \u2028 ...)."""
+    try:
+        return bytes(data[start:end]).decode("utf-8").isspace()
+    except UnicodeDecodeError:
+        return False
+
+
+def _strip_span(data, start: int, end: int) -> Tuple[int, int]:
+    """
+    Narrow data[start:end] to what str.strip() leaves of its decoded text,
+    without copying it: only the characters at the edges are decoded.
+    """
+    while start < end:
+        if data[start] in _WHITESPACE:
+            start += 1
+        elif data[start] >= 0xC0 and _is_space(data, start, start + _utf8_length(data[start])):
+            start += _utf8_length(data[start])
+        else:
+            break
+    while end > start:
+        if data[end - 1] in _WHITESPACE:
+            end -= 1
+            continue
+        lead = end - 1
+        while lead > start and end - lead < 4 and 0x80 <= data[lead] < 0xC0:
+            lead -= 1
+        if data[end - 1] >= 0x80 and _is_space(data, lead, end):
+            end = lead
+        else:
+            break
+    return start, end
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _marker(match) -> Optional[Tuple[str, str, int]]:
+    """
+    Author, step id and end offset of a STEP_PATTERN_BYTES match, read the
+    way STEP_PATTERN reads the decoded text: the author must be word
+    characters throughout and the step id ends at the first non-word one.
+    None when the text is not a marker at all.
+    """
+    author = match.group(1).decode("utf-8")
+    step_id = _WORD.match(match.group(2).decode("utf-8"))
+    if step_id is None or not _WORD.fullmatch(author):
+        return None
+    return author, step_id.group(), match.start(2) + len(step_id.group().encode("utf-8"))
+
+
+def _find_steps(data) -> List[StepBoundary]:
+    """
+    Locate every step marker in the raw file bytes (bytes or an mmap) and
+    the byte span of the stripped SQL that follows it. Nothing is decoded
+    except the author and step id.
+    """
+    boundaries: List[StepBoundary] = []
+    previous = None
+    for match in STEP_PATTERN_BYTES.finditer(data):
+        marker = _marker(match)
+        if marker is None:
+            continue
+        if previous is not None:
+            boundaries.append((*previous[:2], *_strip_span(data, previous[2], match.start())))
+        previous = marker
+    if previous is not None:
+        boundaries.append((*previous[:2], *_strip_span(data, previous[2], len(data))))
+    return boundaries
+
+
+def parse_sql_file(file_path: Path, base_dir: Path, manifest: Optional[ParseManifest] = None) -> List[Step]:
+    """
+    Parse one SQL file into lazy steps.
+
+    The file is memory-mapped and scanned as bytes, so even a very large
+    seed script costs little beyond the page cache; step bodies are only
+    decoded later, when a step's .sql is accessed.
+    """
+    relative_name = file_path.relative_to(base_dir).as_posix()
+    stat = file_path.stat()
+
+    boundaries = None if manifest is None else manifest.lookup(relative_name, stat)
+    if boundaries is None:
+        if stat.st_size == 0:
+            boundaries = []
+            if manifest is not None:
+                manifest.store(relative_name, stat, b"", boundaries)
+        else:
+            with open(file_path, "rb") as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if manifest is not None:
+                    boundaries = manifest.lookup(relative_name, stat, data)
+                if boundaries is None:
+                    boundaries = _find_steps(data)
+                    if manifest is not None:
+                        manifest.store(relative_name, stat, data, boundaries)
+    logger.debug(f"Found {len(boundaries)} steps in {file_path}")
+    return [
+        Step(author=author, step_id=step_id, filename=relative_name, path=file_path, start=start, end=end)
+        for author, step_id, start, end in boundaries
+    ]
 
 
 def _sql_files_in(dir_: Path) -> List[Path]:
@@ -42,30 +181,76 @@ def _sql_files_in(dir_: Path) -> List[Path]:
     return sorted(dir_.rglob("*.sql*"))
 
 
-def parse_directory(directory: Path) -> List[Step]:
+def _project_files(directory: Path) -> Iterator[Path]:
     """
-    Walk the directory and its immediate sub-directories in a
-    deterministic order so SQL runs safely in dependency order.
+    Yield the project's SQL files in a deterministic order so SQL runs
+    safely in dependency order.
 
     1. Pre-defined folders in ORDERED_DIRS (if they exist)
-    2. Any remaining folders, alphabetically
+    2. Any remaining folders, alphabetically (hidden folders such as
+       .git or the .sqlstride cache are skipped)
     """
-    all_steps: List[Step] = []
-
     handled = set()
     for name in ORDERED_DIRS:
         subdir = directory / name
         if subdir.is_dir():
             handled.add(subdir.name)
-            for file_path in _sql_files_in(subdir):
-                all_steps.extend(parse_sql_file(file_path, directory))
+            yield from _sql_files_in(subdir)
 
     # 2. any other subdirectories, in alphabetical order
     for subdir in sorted(
-        path for path in directory.iterdir() if path.is_dir() and path.name not in handled
+        path for path in directory.iterdir()
+        if path.is_dir() and path.name not in handled and not path.name.startswith(".")
     ):
-        for file_path in _sql_files_in(subdir):
-            all_steps.extend(parse_sql_file(file_path, directory))
-    logger.debug(f"Found {len(all_steps)} steps in project directory")
-    return all_steps
+        yield from _sql_files_in(subdir)
+
+
+# read-only copy of the parse manifest inside each worker process
+_worker_manifest: Optional[ParseManifest] = None
+
+
+def _init_parse_worker(manifest: Optional[ParseManifest]) -> None:
+    global _worker_manifest
+    _worker_manifest = manifest
+
+
+def _parse_file_job(file_path: Path, base_dir: Path) -> Tuple[str, List[Step], Optional[dict]]:
+    relative_name = file_path.relative_to(base_dir).as_posix()
+    steps = parse_sql_file(file_path, base_dir, _worker_manifest)
+    entry = _worker_manifest.entry(relative_name) if _worker_manifest is not None else None
+    return relative_name, steps, entry
+
+
+def iter_steps(directory: Path, manifest: Optional[ParseManifest] = None, jobs: int = 1) -> Iterator[Step]:
+    """
+    Yield every step of the project, in the order given by _project_files.
+
+    When a ParseManifest is given, files it already knows are not scanned
+    (or even read) again; it is up to the caller to save() the manifest once
+    the generator is exhausted.
+    With jobs > 1 the files are parsed by a pool of worker processes; the
+    steps keep the same order as a serial run.
+    """
+    count = 0
+    files = list(_project_files(directory))
+
+    if jobs > 1 and len(files) > 1:
+        chunksize = max(1, len(files) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_parse_worker, initargs=(manifest,)) as pool:
+            for relative_name, steps, entry in pool.map(_parse_file_job, files, repeat(directory),
+                                                        chunksize=chunksize):
+                if manifest is not None:
+                    manifest.adopt(relative_name, entry)
+                count += len(steps)
+                yield from steps
+    else:
+        for file_path in files:
+            steps = parse_sql_file(file_path, directory, manifest)
+            count += len(steps)
+            yield from steps
+    logger.debug(f"Found {count} steps in project directory")
+
 
+def parse_directory(directory: Path, manifest: Optional[ParseManifest] = None, jobs: int = 1) -> List[Step]:
+    """List every step of the project; see iter_steps."""
+    return list(iter_steps(directory, manifest, jobs))
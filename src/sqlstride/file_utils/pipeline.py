@@ -0,0 +1,59 @@
+# sqlstride/file_utils/pipeline.py
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, repeat
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlstride.file_utils.checksum import DEFAULT_CHECKSUM, ChecksumProvider, get_provider
+from sqlstride.file_utils.parser import Step
+from sqlstride.file_utils.templating import configure_template_cache, render_sql, template_cache_dir
+
+__all__ = ["RenderedStep", "render_steps"]
+
+
+class RenderedStep(NamedTuple):
+    step: Step
+    sql: str
+    checksum: str
+
+
+def _render_step(step: Step, jinja_vars: dict, provider: ChecksumProvider) -> RenderedStep:
+    try:
+        sql_rendered = render_sql(step.sql, jinja_vars, step.filename)
+    except Exception as exc:
+        raise RuntimeError(f"Failed to render {step.filename} {step.author}:{step.step_id} → {exc}") from exc
+    return RenderedStep(step, sql_rendered, provider.checksum(sql_rendered))
+
+
+def _render_file_job(steps: List[Step], jinja_vars: dict, checksum_algorithm: str) -> List[RenderedStep]:
+    provider = get_provider(checksum_algorithm)
+    return [_render_step(step, jinja_vars, provider) for step in steps]
+
+
+def _init_render_worker(cache_dir: Optional[Path]) -> None:
+    configure_template_cache(cache_dir)
+
+
+def render_steps(steps: Iterable[Step], jinja_vars: dict, jobs: int = 1,
+                 checksum_algorithm: str = DEFAULT_CHECKSUM) -> Iterator[RenderedStep]:
+    """
+    Render every step and compute its checksum with *checksum_algorithm*,
+    yielding results in input order.
+
+    With jobs > 1 the steps of each file are rendered and hashed together in a
+    pool of worker processes, which share the on-disk template cache; results
+    are still yielded in the order the steps were given.
+    """
+    provider = get_provider(checksum_algorithm)
+    if jobs <= 1:
+        for step in steps:
+            yield _render_step(step, jinja_vars, provider)
+        return
+
+    files = [list(file_steps) for _, file_steps in groupby(steps, key=lambda step: step.filename)]
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_render_worker,
+                             initargs=(template_cache_dir(),)) as pool:
+        for rendered in pool.map(_render_file_job, files, repeat(jinja_vars), repeat(checksum_algorithm),
+                                 chunksize=chunksize):
+            yield from rendered
@@ -1,12 +1,116 @@
 # sqlstride/templating.py
-from jinja2 import Environment, BaseLoader, StrictUndefined, UndefinedError
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
 
-# Raise an exception whenever an undefined variable is encountered
-_env = Environment(
-    loader=BaseLoader(),
-    autoescape=False,
-    undefined=StrictUndefined,       # <- key line
-)
+from etl.logger import Logger
+
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
+    from jinja2.bccache import FileSystemBytecodeCache
+
+logger = Logger().get_logger()
+
+# jinja2 is imported when the first template is rendered, so projects without
+# *.sql.j2 files never load it; see _environment()
+_jinja_env: "Optional[Environment]" = None
+_env_lock = threading.Lock()
+
+# compiled templates keyed by the sha256 of their source, least recently used first
+_templates: "OrderedDict[str, Template]" = OrderedDict()
+_templates_lock = threading.Lock()
+_max_templates = 512
+# optional on-disk cache of compiled template bytecode, shared between runs
+_bytecode_cache: "Optional[FileSystemBytecodeCache]" = None
+_bytecode_cache_dir: Optional[Path] = None
+
+
+def _environment() -> "Environment":
+    global _jinja_env
+    if _jinja_env is None:
+        with _env_lock:
+            if _jinja_env is None:
+                from jinja2 import BaseLoader, Environment, StrictUndefined
+
+                # Raise an exception whenever an undefined variable is encountered
+                _jinja_env = Environment(
+                    loader=BaseLoader(),
+                    autoescape=False,
+                    undefined=StrictUndefined,       # <- key line
+                )
+    return _jinja_env
+
+
+def __getattr__(name: str):
+    # `_env` used to be created at import time; keep it reachable as an attribute
+    if name == "_env":
+        return _environment()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _get_bytecode_cache() -> "Optional[FileSystemBytecodeCache]":
+    global _bytecode_cache
+    if _bytecode_cache is None and _bytecode_cache_dir is not None:
+        from jinja2.bccache import FileSystemBytecodeCache
+
+        _bytecode_cache = FileSystemBytecodeCache(str(_bytecode_cache_dir))
+    return _bytecode_cache
+
+
+def configure_template_cache(cache_dir: Optional[Path], max_templates: int = 512) -> None:
+    """
+    Persist compiled template bytecode under *cache_dir* so later runs skip
+    Jinja compilation (pass None to keep the cache in memory only), and keep
+    at most *max_templates* compiled templates in memory.
+    """
+    global _bytecode_cache, _bytecode_cache_dir, _max_templates
+    _bytecode_cache = None
+    _bytecode_cache_dir = None if cache_dir is None else Path(cache_dir)
+    with _templates_lock:
+        _max_templates = max_templates
+        while len(_templates) > _max_templates:
+            _templates.popitem(last=False)
+
+
+def template_cache_dir() -> Optional[Path]:
+    """Directory of the on-disk bytecode cache, or None when it is disabled."""
+    return _bytecode_cache_dir
+
+
+def _compile(sql_text: str, key: str):
+    """Compile the template source, going through the bytecode cache when configured."""
+    env = _environment()
+    bytecode_cache = _get_bytecode_cache()
+    if bytecode_cache is None:
+        return env.compile(sql_text)
+    bucket = bytecode_cache.get_bucket(env, key, None, sql_text)
+    if bucket.code is None:
+        bucket.code = env.compile(sql_text)
+        try:
+            Path(bytecode_cache.directory).mkdir(parents=True, exist_ok=True)
+            bytecode_cache.set_bucket(bucket)
+        except OSError as exc:
+            # a read-only project must not break rendering; the cache is only an optimisation
+            logger.debug(f"Could not write template cache: {exc}")
+    return bucket.code
+
+
+def _get_template(sql_text: str) -> "Template":
+    key = sha256(sql_text.encode()).hexdigest()
+    with _templates_lock:
+        template = _templates.get(key)
+        if template is not None:
+            _templates.move_to_end(key)
+            return template
+    env = _environment()
+    template = env.template_class.from_code(env, _compile(sql_text, key), env.make_globals(None))
+    with _templates_lock:
+        _templates[key] = template
+        while len(_templates) > _max_templates:
+            _templates.popitem(last=False)
+    return template
 
 
 def render_sql(sql_text: str, vars_: dict, filename: str) -> str:
@@ -18,11 +122,23 @@ def render_sql(sql_text: str, vars_: dict, filename: str) -> str:
     if not filename.endswith(".j2"):
         return sql_text
 
+    from jinja2 import UndefinedError
+
     try:
-        template = _env.from_string(sql_text)
+        template = _get_template(sql_text)
         return template.render(**vars_)
     except UndefinedError as exc:
         # Provide a clearer, domain-specific error message
         raise ValueError(
             f"Template '{filename}' failed to render: missing Jinja variable – {exc}"
         ) from exc
+
+
+def template_variables(sql_text: str, filename: str) -> List[str]:
+    """Names of the variables a *.sql.j2 step reads from jinja_vars, sorted; empty for plain SQL."""
+    if not filename.endswith(".j2"):
+        return []
+
+    from jinja2 import meta
+
+    return sorted(meta.find_undeclared_variables(_environment().parse(sql_text)))
@@ -4,6 +4,14 @@ from pathlib import Path
 import pytest
 import yaml
 from sqlstride.config import Config
+from sqlstride.file_utils.templating import configure_template_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_template_cache():
+    """Keep the module-level template cache from leaking between tests."""
+    yield
+    configure_template_cache(None)
 
 
 @pytest.fixture
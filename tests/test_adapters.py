@@ -1,8 +1,11 @@
+import re
+
 import pytest
 from unittest.mock import MagicMock, patch
 from pathlib import Path
 from sqlstride.database.adapters import get_adapter
-from sqlstride.database.adapters import BaseAdapter
+from sqlstride.database.adapters.base import BaseAdapter
+from sqlstride.database.database_object import DatabaseObject
 from sqlstride.config import Config
 from sqlstride.file_utils.parser import Step
 from etl.database.sql_dialects import postgres
@@ -12,6 +15,9 @@ class TestAdapter(BaseAdapter):
     """Test adapter with postgres dialect for testing."""
     dialect = postgres
 
+    def discover_objects(self):
+        return iter(())
+
 
 @pytest.fixture
 def mock_connection():
@@ -82,15 +88,15 @@ class TestBaseAdapter:
 
         # Mock the cursor to return some applied steps
         cursor.fetchall.return_value = [
-            ("author1", "step1", "file1.sql", "checksum1"),
-            ("author2", "step2", "file2.sql", "checksum2")
+            ("author1", "step1", "file1.sql", "checksum1", None),
+            ("author2", "step2", "file2.sql", "checksum2", None)
         ]
 
         applied = adapter.applied_steps()
 
         # Check that the query was executed
         cursor.execute.assert_called_with(
-            "SELECT author, step_id, filename, checksum FROM public.sqlstride_log;"
+            "SELECT author, step_id, filename, checksum, checksum_algorithm FROM public.sqlstride_log;"
         )
 
         # Check that the applied steps were returned correctly
@@ -106,11 +112,148 @@ class TestBaseAdapter:
         step = Step(author="author1", step_id="step1", sql="SELECT 1", filename="file1.sql")
 
         # Record the step
-        adapter.record_step(step, "checksum1")
+        adapter.record_step(step, "ab" * 32)
 
-        # Check that the insert was executed
-        cursor.execute.assert_called()
-        # The exact query depends on the dialect, so we just check that it was called
+        # Check that the insert was executed with the raw digest and the run id
+        sql, params = cursor.execute.call_args.args
+        assert "INSERT INTO public.sqlstride_log" in sql
+        assert params == ["author1", "step1", "file1.sql", bytes.fromhex("ab" * 32), adapter.run_id, None, None, None]
+
+    def test_record_step_with_timing(self, mock_connection):
+        """Test that a step's duration and row count are written with its log row."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        adapter.record_step(Step(author="author1", step_id="step1", sql="", filename="file1.sql"), "ab" * 32,
+                            duration_ms=1250, rows_affected=40)
+
+        sql, params = cursor.execute.call_args.args
+        assert "duration_ms, rows_affected" in sql
+        assert params[-3:-1] == [1250, 40]
+
+    def test_execute_reports_rows_affected(self, mock_connection):
+        """Test that execute() returns the driver's row count, and None when the driver does not know it."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        cursor.rowcount = 12
+        assert adapter.execute("UPDATE t SET x = 1;") == 12
+        cursor.rowcount = -1
+        assert adapter.execute("CREATE TABLE t (x int);") is None
+
+    def test_queued_steps_are_flushed_on_commit(self, mock_connection):
+        """Test that queued log rows are written as one multi-row insert by commit()."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+        cursor.execute.reset_mock()
+
+        for number in range(3):
+            adapter.queue_step(Step(author="author1", step_id=f"step{number}", sql="", filename="file1.sql"),
+                               f"{number:064x}")
+        cursor.execute.assert_not_called()
+
+        adapter.commit()
+
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args.args
+        assert sql.count("(%s, %s, %s, %s, %s, %s, %s, %s)") == 3
+        assert params[8:10] == ["author1", "step1"]
+        connection.commit.assert_called_once()
+
+    def test_queued_steps_are_dropped_on_rollback(self, mock_connection):
+        """Test that a rollback discards log rows that were never written."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+        adapter.queue_step(Step(author="author1", step_id="step1", sql="", filename="file1.sql"), "ab" * 32)
+        cursor.execute.reset_mock()
+
+        adapter.rollback()
+        adapter.commit()
+
+        cursor.execute.assert_not_called()
+
+    def test_record_steps_in_chunks(self, mock_connection):
+        """Test that a large backfill is split into bounded multi-row inserts."""
+        from sqlstride.database.adapters.base import LOG_INSERT_BATCH
+
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+        cursor.execute.reset_mock()
+
+        steps = [(Step(author="system", step_id=f"s{number}", sql="", filename="baseline.sql"), "ab" * 32)
+                 for number in range(LOG_INSERT_BATCH * 2 + 1)]
+        adapter.record_steps(steps)
+
+        assert cursor.execute.call_count == 3
+
+    def test_applied_steps_returns_hex_checksums(self, mock_connection):
+        """Test that binary checksums are handed back as hex strings."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        cursor.fetchall.return_value = [("author1", "step1", "file1.sql", memoryview(bytes.fromhex("cd" * 32)), None)]
+
+        assert adapter.applied_steps() == {("author1", "step1", "file1.sql"): "cd" * 32}
+
+    def test_checksum_algorithm_round_trip(self, mock_connection):
+        """Test that non-sha256 checksums keep their algorithm in its own column and come back prefixed."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        adapter.record_step(Step(author="author1", step_id="step1", sql="", filename="file1.sql"), "xxh3:" + "ef" * 16)
+
+        params = cursor.execute.call_args.args[1]
+        assert params[3] == bytes.fromhex("ef" * 16) and params[-1] == "xxh3"
+        # a BINARY(32) column hands the 16-byte digest back padded with zeros
+        cursor.fetchall.return_value = [("author1", "step1", "file1.sql", bytes.fromhex("ef" * 16) + bytes(16), "xxh3")]
+        assert adapter.applied_steps() == {("author1", "step1", "file1.sql"): "xxh3:" + "ef" * 16}
+
+    def test_ensure_log_table_creates_current_layout(self, mock_connection):
+        """Test that a missing log table is created with a binary checksum, run id and unique index."""
+        connection, cursor = mock_connection
+        cursor.fetchall.return_value = []
+        TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        assert any("checksum BINARY(32) NOT NULL" in sql and "run_id char(32)" in sql and "duration_ms integer" in sql
+                   and "checksum_algorithm varchar(16)" in sql for sql in statements)
+        assert any("CREATE UNIQUE INDEX IF NOT EXISTS ux_sqlstride_log_step" in sql for sql in statements)
+
+    def test_ensure_log_table_upgrades_old_layout(self, mock_connection):
+        """Test that a layout 1 log table is upgraded in place."""
+        connection, cursor = mock_connection
+        cursor.fetchall.return_value = [("id",), ("author",), ("step_id",), ("filename",), ("checksum",),
+                                        ("applied_at",)]
+
+        class UpgradingAdapter(TestAdapter):
+            def log_table_upgrade_sql(self):
+                return ["UPGRADE 1;", "UPGRADE 2;"]
+
+        UpgradingAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        upgrade_at = statements.index("UPGRADE 1;")
+        assert statements[upgrade_at:upgrade_at + 4] == [
+            "UPGRADE 1;", "UPGRADE 2;",
+            "ALTER TABLE public.sqlstride_log ADD COLUMN duration_ms integer, ADD COLUMN rows_affected bigint;",
+            "ALTER TABLE public.sqlstride_log ADD COLUMN checksum_algorithm varchar(16);",
+        ]
+        assert not any("CREATE TABLE IF NOT EXISTS public.sqlstride_log" in sql for sql in statements)
+        connection.commit.assert_called_once()
+
+    def test_ensure_log_table_adds_missing_columns(self, mock_connection):
+        """Test that a layout 2 log table only gains the columns added since."""
+        connection, cursor = mock_connection
+        cursor.fetchall.return_value = [("id",), ("author",), ("step_id",), ("filename",), ("checksum",),
+                                        ("run_id",), ("applied_at",)]
+
+        TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        alters = [sql for sql in statements if "ALTER TABLE" in sql]
+        assert len(alters) == 2
+        assert "ADD COLUMN duration_ms integer, ADD COLUMN rows_affected bigint" in alters[0]
+        assert "ADD COLUMN checksum_algorithm varchar(16)" in alters[1]
 
     def test_lock_unlock(self, mock_connection):
         """Test locking and unlocking."""
@@ -153,6 +296,34 @@ class TestBaseAdapter:
         # Check that the query was executed
         cursor.execute.assert_called_with("SELECT COUNT(*) FROM public.sqlstride_lock;")
 
+    def test_savepoints(self, mock_connection):
+        """Test creating and rolling back to a savepoint."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        adapter.savepoint("sqlstride_step_0")
+        cursor.execute.assert_called_with("SAVEPOINT sqlstride_step_0;")
+
+        adapter.rollback_to_savepoint("sqlstride_step_0")
+        cursor.execute.assert_called_with("ROLLBACK TO SAVEPOINT sqlstride_step_0;")
+
+    def test_run_lock_falls_back_to_lock_table(self, mock_connection):
+        """Test that the base run lock commits a lock table row and gives up after the timeout."""
+        connection, cursor = mock_connection
+        adapter = TestAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
+
+        cursor.fetchone.return_value = (0,)
+        assert adapter.acquire_run_lock() is True
+        connection.commit.assert_called_once()
+
+        adapter.release_run_lock()
+        cursor.execute.assert_called_with("truncate table public.sqlstride_lock;")
+
+        cursor.fetchone.return_value = (1,)
+        with patch("sqlstride.database.adapters.base.time.sleep") as mock_sleep:
+            assert adapter.acquire_run_lock(timeout=0.01) is False
+        mock_sleep.assert_called()
+
     def test_null_dialect_raises(self, mock_connection):
         """Test ensure_log_table with null dialect."""
         connection, cursor = mock_connection
@@ -161,13 +332,16 @@ class TestBaseAdapter:
         class NullAdapter(BaseAdapter):
             dialect = None
 
+            def discover_objects(self):
+                return iter(())
+
 
         # Call ensure_log_table and check that it raises a ValueError
         with pytest.raises(ValueError, match="Cannot create log table: dialect is None"):
             NullAdapter(connection, "public", "sqlstride_log", "sqlstride_lock")
 
 
-@patch("sqlstride.adapters.postgres.build_connector")
+@patch("sqlstride.database.adapters.postgres.build_connector")
 def test_get_adapter_postgres(mock_build_connector, mock_connector):
     """Test getting a Postgres adapter."""
     connector, connection, cursor = mock_connector
@@ -203,7 +377,7 @@ def test_get_adapter_postgres(mock_build_connector, mock_connector):
     assert adapter.lock_table == "sqlstride_lock"
 
 
-@patch("sqlstride.adapters.mariadb.build_connector")
+@patch("sqlstride.database.adapters.mariadb.build_connector")
 def test_get_adapter_mariadb(mock_build_connector, mock_connector):
     """Test getting a MariaDB adapter."""
     connector, connection, cursor = mock_connector
@@ -239,7 +413,7 @@ def test_get_adapter_mariadb(mock_build_connector, mock_connector):
     assert adapter.lock_table == "sqlstride_lock"
 
 
-@patch("sqlstride.adapters.mssql.build_connector")
+@patch("sqlstride.database.adapters.mssql.build_connector")
 def test_get_adapter_mssql(mock_build_connector, mock_connector):
     """Test getting a MSSQL adapter."""
     connector, connection, cursor = mock_connector
@@ -275,7 +449,220 @@ def test_get_adapter_mssql(mock_build_connector, mock_connector):
     assert adapter.lock_table == "sqlstride_lock"
 
 
-@patch("sqlstride.connector_proxy.build_connector")
+@pytest.mark.parametrize("dialect, module, query, granted", [
+    ("postgres", "postgres", "pg_try_advisory_lock", (True,)),
+    ("mssql", "mssql", "sp_getapplock", (0,)),
+    ("mariadb", "mariadb", "GET_LOCK", (1,)),
+])
+def test_native_run_locks(dialect, module, query, granted, mock_connector):
+    """Test that each adapter takes a session-level application lock instead of using the lock table."""
+    connector, connection, cursor = mock_connector
+    config = Config(
+        project_path=Path("/fake/path"),
+        host="localhost",
+        port=5432,
+        instance="",
+        database="test_db",
+        username="test_user",
+        password="test_password",
+        trusted_auth=True,
+        sql_dialect=dialect,
+        default_schema="public",
+        log_table="sqlstride_log",
+        lock_table="sqlstride_lock",
+        jinja_vars={}
+    )
+    with patch(f"sqlstride.database.adapters.{module}.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+
+    # no lock table is created for a native lock
+    assert not any("sqlstride_lock" in str(call) for call in cursor.execute.call_args_list)
+
+    cursor.fetchone.return_value = granted
+    assert adapter.acquire_run_lock(timeout=5) is True
+    sql, params = cursor.execute.call_args.args
+    assert query in sql
+    assert params[0] == "sqlstride:public.sqlstride_lock"
+
+    adapter.release_run_lock()
+    assert cursor.execute.call_args.args[1] == ("sqlstride:public.sqlstride_lock",)
+
+
+def test_postgres_records_large_batches_with_copy(mock_connector):
+    """Test that the Postgres adapter streams big batches of log rows with COPY."""
+    connector, connection, cursor = mock_connector
+    config = Config(Path("/fake/path"), "localhost", 5432, "", "test_db", "test_user", "test_password", False,
+                    "postgres", "public")
+    with patch("sqlstride.database.adapters.postgres.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+
+    steps = [(Step(author="system", step_id=f"s{number}", sql="", filename="baseline.sql"), "ab" * 32)
+             for number in range(100)]
+    adapter.record_steps(steps)
+
+    sql, buffer = cursor.copy_expert.call_args.args
+    assert sql.startswith("COPY public.sqlstride_log")
+    lines = buffer.getvalue().splitlines()
+    assert len(lines) == 100
+    assert lines[0] == f"system,s0,baseline.sql,\\x{'ab' * 32},{adapter.run_id},,,"
+
+
+def test_mssql_run_lock_keeps_row_counts(mock_connector):
+    """Test that taking the MSSQL run lock does not leave NOCOUNT on for the steps that follow."""
+    connector, connection, cursor = mock_connector
+    config = Config(Path("/fake/path"), "localhost", 1433, "", "test_db", "test_user", "test_password", True,
+                    "mssql", "dbo")
+    with patch("sqlstride.database.adapters.mssql.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+
+    class SessionCursor:
+        """Tracks SET NOCOUNT like a server session: row counts are -1 while it is on."""
+        nocount = False
+        rowcount = -1
+
+        def execute(self, sql, params=()):
+            for setting in re.findall(r"SET NOCOUNT (ON|OFF)", sql):
+                self.nocount = setting == "ON"
+            self.rowcount = -1 if self.nocount else 3
+
+        def fetchone(self):
+            return (0,)
+
+    adapter.cursor = SessionCursor()
+    assert adapter.acquire_run_lock(timeout=5) is True
+    assert adapter.execute("UPDATE dbo.users SET active = 1;") == 3
+
+
+def test_mssql_records_steps_with_fast_executemany(mock_connector):
+    """Test that the MSSQL adapter sends log rows as one fast_executemany call."""
+    connector, connection, cursor = mock_connector
+    config = Config(Path("/fake/path"), "localhost", 1433, "", "test_db", "test_user", "test_password", True,
+                    "mssql", "dbo")
+    with patch("sqlstride.database.adapters.mssql.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+
+    adapter.record_steps([(Step(author="system", step_id=f"s{number}", sql="", filename="baseline.sql"), "ab" * 32)
+                          for number in range(10)])
+
+    assert cursor.fast_executemany is True
+    sql, rows = cursor.executemany.call_args.args
+    assert len(rows) == 10
+
+
+@pytest.mark.parametrize("table_count", [1, 500])
+def test_postgres_discover_tables_in_one_query(table_count, mock_connector):
+    """Test that Postgres table DDL comes from one catalog query, however many tables exist."""
+    connector, connection, cursor = mock_connector
+    config = Config(Path("/fake/path"), "localhost", 5432, "", "test_db", "test_user", "test_password", False,
+                    "postgres", "public")
+    with patch("sqlstride.database.adapters.postgres.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+    cursor.execute.reset_mock()
+    tables = [("public", f"t{number}", f"CREATE TABLE IF NOT EXISTS public.t{number} (\n    id integer\n);")
+              for number in range(table_count)]
+    cursor.fetchall.side_effect = [tables, [], [], [], [], []]
+
+    objects = list(adapter.discover_objects())
+
+    assert [obj.name for obj in objects] == [f"t{number}" for number in range(table_count)]
+    assert cursor.execute.call_count == 6
+    assert "pg_attribute" in cursor.execute.call_args_list[0].args[0]
+
+
+@pytest.mark.parametrize("object_count", [1, 300])
+def test_mssql_discover_tables_and_types_in_fixed_queries(object_count, mock_connector):
+    """Test that MSSQL tables and table types come from one catalog query each."""
+    connector, connection, cursor = mock_connector
+    config = Config(Path("/fake/path"), "localhost", 1433, "", "test_db", "test_user", "test_password", True,
+                    "mssql", "dbo")
+    with patch("sqlstride.database.adapters.mssql.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+    cursor.execute.reset_mock()
+    tables = [("dbo", f"t{number}", f"CREATE TABLE [dbo].[t{number}] ([id] int NOT NULL);")
+              for number in range(object_count)]
+    user_types = [("dbo", f"tt{number}", "TABLE", "sysname", 256, 0, 0) for number in range(object_count)]
+    table_types = [("dbo", f"tt{number}", f"CREATE TYPE [dbo].[tt{number}] AS TABLE ([id] int NOT NULL)")
+                   for number in range(object_count)]
+    cursor.fetchall.side_effect = [tables, [], [], [], [], [], user_types, table_types]
+
+    objects = list(adapter.discover_objects())
+
+    assert cursor.execute.call_count == 8
+    assert len([obj for obj in objects if obj.kind == "table"]) == object_count
+    types = [obj for obj in objects if obj.kind == "type"]
+    assert len(types) == object_count
+    assert "CREATE TYPE [dbo].[tt0] AS TABLE" in types[0].ddl
+    assert "IF NOT EXISTS" in objects[0].ddl and "CREATE TABLE [dbo].[t0]" in objects[0].ddl
+
+
+def _mariadb_adapter(mock_connector):
+    connector, connection, cursor = mock_connector
+    config = Config(Path("/fake/path"), "localhost", 3306, "", "test_db", "test_user", "test_password", False,
+                    "mariadb", "app")
+    with patch("sqlstride.database.adapters.mariadb.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+    cursor.execute.reset_mock()
+    return adapter, cursor
+
+
+def test_mariadb_show_create_is_batched(mock_connector):
+    """Test that SHOW CREATE TABLE statements are sent as multi-statement batches."""
+    adapter, cursor = _mariadb_adapter(mock_connector)
+    tables = [("app", f"t{number}") for number in range(250)]
+    cursor.fetchone.side_effect = [(name, f"CREATE TABLE `{name}` (id int)") for _, name in tables]
+
+    rows = list(adapter._show_create(cursor, "TABLE", tables))
+
+    assert cursor.execute.call_count == 3
+    assert cursor.execute.call_args_list[0].args[0].count("SHOW CREATE TABLE") == 100
+    assert [name for _, name, _ in rows] == [name for _, name in tables]
+    assert rows[-1][2][1] == "CREATE TABLE `t249` (id int)"
+
+
+def test_mariadb_show_create_falls_back_without_multi_statements(mock_connector):
+    """Test that SHOW CREATE falls back to one query per object when multi-statements are rejected."""
+    adapter, cursor = _mariadb_adapter(mock_connector)
+    tables = [("app", f"t{number}") for number in range(150)]
+
+    def execute(sql, *args):
+        if sql.count(";") > 1:
+            raise Exception("You have an error in your SQL syntax")
+
+    cursor.execute.side_effect = execute
+    cursor.fetchone.side_effect = [(name, f"CREATE TABLE `{name}` (id int)") for _, name in tables]
+
+    rows = list(adapter._show_create(cursor, "TABLE", tables))
+
+    assert len(rows) == 150
+    assert cursor.execute.call_count == 1 + 150  # one rejected batch, then never again
+
+
+def test_mariadb_routine_parameters_in_one_query(mock_connector):
+    """Test that routine parameters are fetched once and grouped per routine."""
+    adapter, cursor = _mariadb_adapter(mock_connector)
+    cursor.fetchall.side_effect = [
+        [],  # tables
+        [],  # views
+        [  # parameters
+            ("app", "add_user", "PROCEDURE", "IN", "p_name", "varchar"),
+            ("app", "add_user", "PROCEDURE", "OUT", "p_id", "int"),
+            ("app", "double_it", "FUNCTION", None, None, "int"),
+            ("app", "double_it", "FUNCTION", "IN", "x", "int"),
+        ],
+        [("app", "add_user", "BEGIN END")],  # procedures
+        [("app", "double_it", "RETURN x * 2", "int")],  # functions
+        [],  # triggers
+        [],  # sequences
+    ]
+
+    objects = {obj.name: obj.ddl for obj in adapter.discover_objects()}
+
+    assert cursor.execute.call_count == 7
+    assert objects["add_user"].startswith("CREATE PROCEDURE IF NOT EXISTS `app`.`add_user`(IN p_name varchar, OUT p_id int)")
+    assert objects["double_it"].startswith("CREATE FUNCTION IF NOT EXISTS `app`.`double_it`(x int) RETURNS int")
+
+
+@patch("sqlstride.database.connector_proxy.build_connector")
 def test_get_adapter_invalid_dialect(mock_build_connector):
     """Test getting an adapter with an invalid dialect."""
     config = Config(
@@ -296,3 +683,147 @@ def test_get_adapter_invalid_dialect(mock_build_connector):
 
     with pytest.raises(ValueError, match="Unsupported SQL dialect"):
         get_adapter(config)
+
+
+class ClassedAdapter(TestAdapter):
+    """Adapter whose object classes are discovered through per-class methods."""
+    object_classes = ("tables", "views", "functions")
+    discover_objects = BaseAdapter.discover_objects
+
+    def __init__(self, connection, extra_connections):
+        super().__init__(connection, "public", "sqlstride_log", "sqlstride_lock")
+        self.extra_connections = list(extra_connections)
+
+    def open_connection(self):
+        return self.extra_connections.pop()
+
+    def _objects(self, kind):
+        return [DatabaseObject(kind, "public", f"{kind}{number}", f"-- {kind}{number}") for number in range(3)]
+
+    def discover_tables(self, cur):
+        yield from self._objects("table")
+
+    def discover_views(self, cur):
+        yield from self._objects("view")
+
+    def discover_functions(self, cur):
+        yield from self._objects("function")
+
+
+def test_concurrent_discovery_matches_serial_order(mock_connection):
+    """Test that concurrent introspection yields objects in the serial order and closes its connections."""
+    connection, _ = mock_connection
+    extra = [MagicMock() for _ in range(2)]
+    adapter = ClassedAdapter(connection, extra)
+
+    serial = [(obj.kind, obj.name) for obj in adapter.discover_objects()]
+    concurrent = [(obj.kind, obj.name) for obj in adapter.discover_objects_concurrently(connections=2)]
+
+    assert concurrent == serial
+    assert serial[0] == ("table", "table0") and serial[-1] == ("function", "function2")
+    for extra_connection in extra:
+        if extra_connection.cursor.called:
+            extra_connection.close.assert_called_once()
+
+
+def test_postgres_workers_import_exported_snapshot(mock_connector):
+    """Test that Postgres introspection connections read the snapshot exported by the main connection."""
+    connector, connection, cursor = mock_connector
+    config = Config(Path("/fake/path"), "localhost", 5432, "", "test_db", "test_user", "test_password", False,
+                    "postgres", "public")
+    with patch("sqlstride.database.adapters.postgres.build_connector", return_value=connector):
+        adapter = get_adapter(config)
+    cursor.execute.reset_mock()
+    cursor.fetchone.return_value = ("00000003-0000001B-1",)
+
+    assert adapter.export_snapshot() == "00000003-0000001B-1"
+    assert "pg_export_snapshot" in cursor.execute.call_args.args[0]
+
+    worker = MagicMock()
+    adapter.import_snapshot(worker, "00000003-0000001B-1")
+    assert "REPEATABLE READ" in worker.execute.call_args_list[0].args[0]
+    assert worker.execute.call_args_list[1].args == ("SET TRANSACTION SNAPSHOT %s;", ("00000003-0000001B-1",))
+
+
+def _sqlite_config(project_path, database=""):
+    return Config(Path(project_path), None, None, None, database, None, None, False, "sqlite", None)
+
+
+def test_sqlite_log_table_and_applied_steps():
+    """Test that an in-memory SQLite adapter creates its log table and records steps."""
+    adapter = get_adapter(_sqlite_config("."))
+    step = Step(author="alice", step_id="1", sql="", filename="tables/users.sql")
+
+    assert type(adapter).__name__ == "SqliteAdapter"
+    assert adapter.log_table_columns() >= {"id", "checksum", "run_id", "applied_at"}
+    adapter.queue_step(step, "ab" * 32)
+    adapter.commit()
+
+    adapter.queue_step(Step(author="alice", step_id="2", sql="", filename="tables/users.sql"), "xxh3:" + "cd" * 16)
+    adapter.commit()
+
+    assert adapter.applied_steps() == {("alice", "1", "tables/users.sql"): "ab" * 32,
+                                       ("alice", "2", "tables/users.sql"): "xxh3:" + "cd" * 16}
+    assert adapter.log_watermark() == (2, 2)
+    assert adapter.run_id in adapter.log_row_identity(2) and "xxh3:" + "cd" * 16 in adapter.log_row_identity(2)
+    assert adapter.log_row_identity(3) is None
+
+
+def test_sqlite_rolls_back_ddl_to_savepoint():
+    """Test that DDL is transactional on SQLite, including savepoints."""
+    adapter = get_adapter(_sqlite_config("."))
+    adapter.execute("CREATE TABLE kept (id integer);")
+    adapter.savepoint("step_2")
+    adapter.execute("CREATE TABLE dropped (id integer); CREATE INDEX ix_dropped ON dropped (id);")
+    adapter.rollback_to_savepoint("step_2")
+    adapter.commit()
+
+    tables = {obj.name for obj in adapter.discover_objects() if obj.kind == "table"}
+    assert "kept" in tables and "dropped" not in tables
+
+
+def test_sqlite_run_lock_excludes_second_process(temp_dir):
+    """Test that the run lock on a SQLite file keeps a second adapter out until it is released."""
+    config = _sqlite_config(temp_dir, "app.db")
+    first, second = get_adapter(config), get_adapter(config)
+
+    assert first.acquire_run_lock() is True
+    assert second.acquire_run_lock() is False
+    first.release_run_lock()
+    assert second.acquire_run_lock() is True
+
+
+def test_sqlite_discover_objects():
+    """Test that SQLite objects are discovered with idempotent DDL."""
+    adapter = get_adapter(_sqlite_config("."))
+    adapter.execute("""
+        CREATE TABLE users (id integer primary key, name text);
+        CREATE UNIQUE INDEX ux_users_name ON users (name);
+        CREATE VIEW named AS SELECT name FROM users;
+        CREATE TRIGGER users_ai AFTER INSERT ON users BEGIN SELECT 1; END;
+    """)
+    adapter.commit()
+
+    objects = {(obj.kind, obj.name): obj.ddl for obj in adapter.discover_objects()}
+
+    assert objects["table", "users"].startswith("CREATE TABLE IF NOT EXISTS users")
+    assert "CREATE UNIQUE INDEX IF NOT EXISTS ux_users_name" in objects["table", "users"]
+    assert objects["view", "named"].startswith("CREATE VIEW IF NOT EXISTS named")
+    assert objects["trigger", "users_ai"].startswith("CREATE TRIGGER IF NOT EXISTS users_ai")
+
+
+def test_sqlite_upgrades_log_table_and_records_timing():
+    """Test that SQLite adds the timing columns to a layout 2 log table and reports row counts."""
+    adapter = get_adapter(_sqlite_config("."))
+    adapter.execute("DROP TABLE sqlstride_log; CREATE TABLE sqlstride_log (id integer primary key, author text, "
+                    "step_id text, filename text, checksum blob, run_id text, applied_at timestamp);")
+    adapter.commit()
+    adapter.ensure_log_table()
+
+    assert {"duration_ms", "rows_affected"} <= adapter.log_table_columns()
+    adapter.execute("CREATE TABLE t (x integer);")
+    assert adapter.execute("INSERT INTO t VALUES (1); INSERT INTO t VALUES (2), (3);") == 3
+    adapter.queue_step(Step(author="a", step_id="1", sql="", filename="t.sql"), "ab" * 32, 15, 3)
+    adapter.commit()
+    assert adapter.step_history()[0][:3] == ("a", "1", "t.sql")
+    assert adapter.step_history()[0][4:6] == (15, 3)
@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import MagicMock
+from sqlstride.database.applied_snapshot import AppliedStepsSnapshot, snapshot_path
+
+
+class FakeLog:
+    """An in-memory log table exposing the adapter calls the snapshot uses."""
+
+    def __init__(self):
+        self.rows = []
+        self.fetched = 0
+
+    def add(self, author, step_id, filename, checksum):
+        row_id = (self.rows[-1][0] + 1) if self.rows else 1
+        self.rows.append((row_id, author, step_id, filename, checksum))
+
+    def log_watermark(self):
+        return len(self.rows), max((row[0] for row in self.rows), default=0)
+
+    def log_row_identity(self, row_id):
+        return next((repr(row) for row in self.rows if row[0] == row_id), None)
+
+    def log_rows_after(self, last_id):
+        rows = [row for row in self.rows if row[0] > last_id]
+        self.fetched += len(rows)
+        return rows
+
+
+@pytest.fixture
+def snapshot_file(temp_dir):
+    return temp_dir / ".sqlstride" / "cache" / "applied" / "target.json"
+
+
+def test_snapshot_fetches_only_new_rows(snapshot_file):
+    """Test that a saved snapshot only pulls the rows added since it was taken."""
+    log = FakeLog()
+    for number in range(5):
+        log.add("author1", f"step{number}", "file1.sql", f"{number:064x}")
+
+    assert len(AppliedStepsSnapshot(snapshot_file).refresh(log)) == 5
+    assert log.fetched == 5
+
+    log.add("author2", "step9", "file2.sql", "ff" * 32)
+    log.fetched = 0
+    applied = AppliedStepsSnapshot(snapshot_file).refresh(log)
+
+    assert log.fetched == 1
+    assert applied[("author2", "step9", "file2.sql")] == "ff" * 32
+    assert applied[("author1", "step0", "file1.sql")] == "0" * 64
+
+
+def test_snapshot_unchanged_log_reads_nothing(snapshot_file):
+    """Test that an up-to-date snapshot only costs the watermark query."""
+    log = FakeLog()
+    log.add("author1", "step1", "file1.sql", "aa" * 32)
+    AppliedStepsSnapshot(snapshot_file).refresh(log)
+
+    log.log_rows_after = MagicMock()
+    applied = AppliedStepsSnapshot(snapshot_file).refresh(log)
+
+    log.log_rows_after.assert_not_called()
+    assert applied == {("author1", "step1", "file1.sql"): "aa" * 32}
+
+
+def test_snapshot_discontinuity_reloads_everything(snapshot_file):
+    """Test that deleted log rows invalidate the snapshot."""
+    log = FakeLog()
+    for number in range(3):
+        log.add("author1", f"step{number}", "file1.sql", "aa" * 32)
+    AppliedStepsSnapshot(snapshot_file).refresh(log)
+
+    del log.rows[0]
+    log.add("author1", "step3", "file1.sql", "bb" * 32)
+    log.fetched = 0
+    applied = AppliedStepsSnapshot(snapshot_file).refresh(log)
+
+    assert log.fetched == 1 + 3  # the new row, then the whole log once the counts disagree
+    assert ("author1", "step0", "file1.sql") not in applied
+    assert len(applied) == 3
+
+
+def test_snapshot_reprovisioned_log_reloads_everything(snapshot_file):
+    """Test that a log rebuilt to the same row count and max id is read again instead of trusting the snapshot."""
+    log = FakeLog()
+    for number in range(3):
+        log.add("author1", f"step{number}", "file1.sql", "aa" * 32)
+    AppliedStepsSnapshot(snapshot_file).refresh(log)
+
+    log.rows = []
+    for number in range(3):
+        log.add("author2", f"other{number}", "file2.sql", "bb" * 32)
+    log.fetched = 0
+    applied = AppliedStepsSnapshot(snapshot_file).refresh(log)
+
+    assert log.fetched == 3
+    assert set(applied) == {("author2", f"other{number}", "file2.sql") for number in range(3)}
+
+
+def test_snapshot_path_differs_per_target(mock_config, temp_dir):
+    """Test that every database gets its own snapshot file."""
+    from dataclasses import replace
+
+    assert snapshot_path(temp_dir, mock_config) == snapshot_path(temp_dir, replace(mock_config))
+    assert snapshot_path(temp_dir, mock_config) != snapshot_path(temp_dir, replace(mock_config, host="db2"))
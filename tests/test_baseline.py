@@ -0,0 +1,103 @@
+import pytest
+import sqlparse
+from unittest.mock import patch
+from sqlstride.database.database_object import DatabaseObject
+from sqlstride.file_utils.baseline import FormatCache, format_baseline_ddl, write_baseline_files
+
+
+@pytest.fixture
+def db_objects():
+    """Create a handful of database objects of different kinds."""
+    return [
+        DatabaseObject("table", "public", f"table{number}",
+                       f"create table public.table{number} (id int primary key, name varchar(100));")
+        for number in range(6)
+    ] + [DatabaseObject("view", "public", "names", "create view public.names as select name from public.table0;")]
+
+
+def expected_text(ddl):
+    return sqlparse.format(f"-- step system:baseline\n\n{ddl.strip()}\n",
+                           reindent_aligned=True, keyword_case='upper', compact=True)
+
+
+def test_write_baseline_files(db_objects, temp_dir):
+    """Test writing one formatted file per object."""
+    written = write_baseline_files(db_objects, temp_dir)
+
+    assert written == len(db_objects)
+    view_file = temp_dir / "views" / "public" / "names.sql"
+    assert view_file.read_text(encoding="utf-8") == expected_text(db_objects[-1].ddl)
+
+
+def test_write_baseline_files_skips_existing(db_objects, temp_dir):
+    """Test that existing files are left alone."""
+    existing = temp_dir / "tables" / "public" / "table0.sql"
+    existing.parent.mkdir(parents=True)
+    existing.write_text("-- hand edited", encoding="utf-8")
+
+    written = write_baseline_files(db_objects, temp_dir)
+
+    assert written == len(db_objects) - 1
+    assert existing.read_text(encoding="utf-8") == "-- hand edited"
+
+
+def test_format_cache_skips_sqlparse(temp_dir):
+    """Test that unchanged DDL is served from the format cache."""
+    cache = FormatCache(temp_dir / "cache")
+    ddl = "create table t (id int);"
+    first = format_baseline_ddl(ddl, cache)
+
+    with patch("sqlstride.file_utils.baseline.sqlparse.format") as mock_format:
+        second = format_baseline_ddl(ddl, FormatCache(temp_dir / "cache"))
+
+    mock_format.assert_not_called()
+    assert first == second == expected_text(ddl)
+
+
+def test_baseline_run_prunes_unused_format_cache_entries(db_objects, temp_dir):
+    """Test that entries for DDL no longer in the database are deleted after a run."""
+    cache_dir = temp_dir / "cache"
+    write_baseline_files(db_objects, temp_dir / "first", cache_dir=cache_dir)
+    assert len(list(cache_dir.rglob("*.sql"))) == len(db_objects)
+
+    write_baseline_files(db_objects[:2], temp_dir / "second", jobs=2, cache_dir=cache_dir)
+
+    expected = {FormatCache.key(f"-- step system:baseline\n\n{db_object.ddl.strip()}\n")
+                for db_object in db_objects[:2]}
+    assert {path.stem for path in cache_dir.rglob("*.sql")} == expected
+    assert all(any(subdirectory.iterdir()) for subdirectory in cache_dir.iterdir())
+
+
+def test_parallel_baseline_matches_serial(db_objects, temp_dir):
+    """Test that the process pool writes exactly what a serial run writes."""
+    serial_root, parallel_root = temp_dir / "serial", temp_dir / "parallel"
+
+    assert write_baseline_files(db_objects, serial_root) == len(db_objects)
+    assert write_baseline_files(iter(db_objects), parallel_root, jobs=2,
+                                cache_dir=temp_dir / "cache") == len(db_objects)
+
+    for serial_file in serial_root.rglob("*.sql"):
+        parallel_file = parallel_root / serial_file.relative_to(serial_root)
+        assert parallel_file.read_text(encoding="utf-8") == serial_file.read_text(encoding="utf-8")
+
+
+def test_register_baseline_records_missing_baseline_steps(temp_dir):
+    """Test that only baseline steps missing from the log are recorded, with the checksum sync would compute."""
+    from sqlstride.commands.baseline import register_baseline
+    from sqlstride.config import Config
+    from sqlstride.database.adapters import get_adapter
+    from sqlstride.file_utils.checksum import compute_checksum
+
+    (temp_dir / "tables").mkdir()
+    (temp_dir / "tables" / "users.sql").write_text("-- step system:baseline\n\nCREATE TABLE users (id integer);\n")
+    (temp_dir / "tables" / "orders.sql").write_text("-- step system:baseline\n\nCREATE TABLE orders (id integer);\n")
+    (temp_dir / "tables" / "extra.sql").write_text("-- step alice:1\nCREATE TABLE extra (id integer);\n")
+    config = Config(temp_dir, None, None, None, "app.db", None, None, False, "sqlite", None)
+
+    assert register_baseline(config, get_adapter(config)) == 2
+    applied = get_adapter(config).applied_steps()
+    assert applied == {
+        ("system", "baseline", "tables/orders.sql"): compute_checksum("CREATE TABLE orders (id integer);"),
+        ("system", "baseline", "tables/users.sql"): compute_checksum("CREATE TABLE users (id integer);"),
+    }
+    assert register_baseline(config, get_adapter(config)) == 0
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from generate import generate_project  # noqa: E402
+from run import compare, run_suite  # noqa: E402
+from sqlstride.file_utils.parser import parse_directory  # noqa: E402
+
+
+def test_generate_project_is_repeatable(temp_dir):
+    """Test that the generator writes the requested layout, the same way every time."""
+    first = generate_project(temp_dir / "a", files=20, steps_per_file=3, template_share=0.5, seed_files=1,
+                             seed_rows=30)
+    second = generate_project(temp_dir / "b", files=20, steps_per_file=3, template_share=0.5, seed_files=1,
+                              seed_rows=30)
+
+    assert first == second
+    assert first["files"] == 21 and first["steps"] == 64  # 20 files of 3 steps, a seed table and 3 seed steps
+    assert (temp_dir / "a" / "seed_data" / "000_seed.sql").read_text() == \
+        (temp_dir / "b" / "seed_data" / "000_seed.sql").read_text()
+    steps = parse_directory(temp_dir / "a")
+    assert len(steps) == 64
+    assert steps[0].filename.startswith("extensions/")
+    assert sum(step.filename.endswith(".j2") for step in steps) == first["templates"] * 3
+
+
+def test_run_suite_smoke():
+    """Test that every benchmark runs on a tiny project and reports comparable results."""
+    results = run_suite(repeat=1, baseline_objects=8, files=10, steps_per_file=2, seed_files=1, seed_rows=10)
+
+    assert set(results["results"]) >= {"parse_directory_cold", "render_sql_cold", "checksum", "plan_pending",
+                                       "sync_sqlite_memory", "write_baseline_cold", "write_baseline_warm"}
+    assert results["results"]["write_baseline_cold"]["items"] == 10  # 8 tables and 2 views
+    assert "1.00x" in compare(results, results)
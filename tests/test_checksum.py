@@ -0,0 +1,47 @@
+import hashlib
+from unittest.mock import patch
+
+import pytest
+
+from sqlstride.file_utils import checksum
+from sqlstride.file_utils.checksum import compute_checksum, get_provider, split_checksum, stored_checksum
+
+
+def test_sha256_checksums_keep_the_legacy_format():
+    """Test that sha256 checksums are plain hex, as every checksum recorded so far."""
+    assert compute_checksum("SELECT 1;") == hashlib.sha256(b"SELECT 1;").hexdigest()
+
+
+def test_other_algorithms_are_prefixed():
+    """Test that other algorithms carry their name and fit the 32-byte checksum column."""
+    value = compute_checksum("SELECT 1;", "blake2b")
+
+    assert value == "blake2b:" + hashlib.blake2b(b"SELECT 1;", digest_size=32).hexdigest()
+    assert split_checksum(value) == ("blake2b", value.split(":")[1])
+    assert split_checksum("ab" * 32) == ("sha256", "ab" * 32)
+
+
+def test_checksum_is_hashed_in_chunks():
+    """Test that encoding chunk by chunk gives the digest of the whole text."""
+    sql = "INSERT INTO t VALUES ('ünïcödé ✓');\n" * 1000
+
+    with patch.object(checksum, "ENCODE_CHUNK", 7):
+        chunked = compute_checksum(sql, "blake2b")
+
+    assert chunked == "blake2b:" + hashlib.blake2b(sql.encode(), digest_size=32).hexdigest()
+
+
+def test_unknown_or_missing_algorithms_are_rejected():
+    """Test that an unknown algorithm, or one whose package is missing, fails early."""
+    with pytest.raises(ValueError, match="Unsupported checksum algorithm md5"):
+        get_provider("md5")
+    with patch.object(checksum, "find_spec", return_value=None):
+        with pytest.raises(ValueError, match="needs the xxhash package"):
+            get_provider("xxh3")
+
+
+def test_stored_checksum_trims_padded_digests():
+    """Test that zero padding from fixed-width binary columns is cut off again."""
+    assert stored_checksum(bytes.fromhex("ef" * 16) + bytes(16), "xxh3") == "xxh3:" + "ef" * 16
+    assert stored_checksum(memoryview(bytes.fromhex("cd" * 32)), None) == "cd" * 32
+    assert stored_checksum("ab" * 32, None) == "ab" * 32
@@ -0,0 +1,68 @@
+from sqlstride.file_utils.checksum import compute_checksum
+from sqlstride.file_utils.checksum_cache import ChecksumCache, variables_fingerprint
+from sqlstride.file_utils.parser import Step
+from sqlstride.file_utils.templating import template_variables
+
+
+def _step(sql, step_id="step1", filename="tables/users.sql.j2"):
+    return Step(author="author1", step_id=step_id, sql=sql, filename=filename)
+
+
+def test_template_variables():
+    """Test that only the variables a template reads are listed, and none for plain SQL."""
+    sql = "{% set local = 1 %}SELECT {{ schema_prefix }}{{ local }}{% if environment == 'dev' %}1{% endif %}"
+    assert template_variables(sql, "users.sql.j2") == ["environment", "schema_prefix"]
+    assert template_variables("SELECT {{ x }}", "users.sql") == []
+
+
+def test_variables_fingerprint_ignores_unread_variables():
+    """Test that the fingerprint changes with the variables a step reads, and with nothing else."""
+    fingerprint = variables_fingerprint(["schema_prefix"], {"schema_prefix": "dev_", "other": 1})
+    assert fingerprint == variables_fingerprint(["schema_prefix"], {"schema_prefix": "dev_", "other": 2})
+    assert fingerprint != variables_fingerprint(["schema_prefix"], {"schema_prefix": "prod_"})
+    assert fingerprint != variables_fingerprint(["schema_prefix"], {})
+
+
+def test_checksum_cache_lookup(temp_dir):
+    """Test that a stored checksum is found again until the step or its variables change."""
+    path = temp_dir / "checksums.json"
+    step = _step("CREATE TABLE {{ schema_prefix }}users (id int);")
+    checksum = compute_checksum("CREATE TABLE dev_users (id int);")
+    cache = ChecksumCache(path)
+    assert cache.lookup(step, "filehash", {"schema_prefix": "dev_"}, "sha256") is None
+    cache.store(step, "filehash", ["schema_prefix"], {"schema_prefix": "dev_"}, {"sha256": checksum})
+    cache.save()
+
+    reloaded = ChecksumCache(path)
+    assert reloaded.lookup(step, "filehash", {"schema_prefix": "dev_", "unrelated": 1}, "sha256") == checksum
+    assert reloaded.lookup(step, "filehash", {"schema_prefix": "dev_"}, "blake2b") is None
+    assert reloaded.lookup(step, "filehash", {"schema_prefix": "prod_"}, "sha256") is None
+    assert reloaded.lookup(_step("DROP TABLE users;"), "edited", {"schema_prefix": "dev_"}, "sha256") is None
+
+
+def test_checksum_cache_edited_file(temp_dir):
+    """Test that the untouched steps of an edited file are still served from the cache."""
+    step = _step("SELECT 1;", filename="tables/users.sql")
+    cache = ChecksumCache(temp_dir / "checksums.json")
+    cache.store(step, "before", [], {}, {"sha256": compute_checksum("SELECT 1;")})
+
+    assert cache.lookup(step, "after", {}, "sha256") == compute_checksum("SELECT 1;")
+    assert cache.lookup(_step("SELECT 2;", filename="tables/users.sql"), "edited again", {}, "sha256") is None
+    assert cache.lookup(step, None, {}, "sha256") == compute_checksum("SELECT 1;")
+
+
+def test_checksum_cache_prunes_unverified_steps(temp_dir):
+    """Test that steps not verified during a run are dropped, unless pruning is off."""
+    path = temp_dir / "checksums.json"
+    kept, dropped = _step("SELECT 1;", "kept"), _step("SELECT 2;", "dropped")
+    cache = ChecksumCache(path)
+    cache.store(kept, None, [], {}, {"sha256": compute_checksum("SELECT 1;")})
+    cache.store(dropped, None, [], {}, {"sha256": compute_checksum("SELECT 2;")})
+    cache.save()
+
+    reloaded = ChecksumCache(path)
+    reloaded.lookup(kept, None, {}, "sha256")
+    reloaded.save(prune=False)
+    assert len(ChecksumCache(path)._entries) == 2
+    reloaded.save()
+    assert list(ChecksumCache(path)._entries) == ["tables/users.sql.j2 author1:kept"]
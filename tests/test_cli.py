@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 from pathlib import Path
 import json
-from sqlstride.cli import cli, sync, create_repo
+from sqlstride.cli import cli, sync, create_repo, deps, fleet, history
 
 
 @patch("sqlstride.cli.load_config")
@@ -28,7 +28,9 @@ def test_sync_command(mock_sync_database, mock_load_config, mock_config):
     assert args[0] == Path(".")  # project_path
     
     # Check that sync_database was called with the correct arguments
-    mock_sync_database.assert_called_once_with(mock_config, dry_run=False, same_checksums=False)
+    mock_sync_database.assert_called_once_with(mock_config, dry_run=False, same_checksums=False,
+                                               transaction_mode="per-step", jobs=1, parallel=1,
+                                               schedule="tiers")
 
 
 @patch("sqlstride.cli.load_config")
@@ -54,7 +56,11 @@ def test_sync_command_with_options(mock_sync_database, mock_load_config, mock_co
         "--default-schema", "public",
         "--dry-run",
         "--same-checksums",
-        "--jinja-vars", '{"environment": "production"}'
+        "--jinja-vars", '{"environment": "production"}',
+        "--transaction-mode", "per-file",
+        "--jobs", "4",
+        "--parallel", "3",
+        "--schedule", "graph"
     ])
     
     # Check that the command succeeded
@@ -76,7 +82,9 @@ def test_sync_command_with_options(mock_sync_database, mock_load_config, mock_co
     assert args[12] == {"environment": "production"}
     
     # Check that sync_database was called with the correct arguments
-    mock_sync_database.assert_called_once_with(mock_config, dry_run=True, same_checksums=True)
+    mock_sync_database.assert_called_once_with(mock_config, dry_run=True, same_checksums=True,
+                                               transaction_mode="per-file", jobs=4, parallel=3,
+                                               schedule="graph")
 
 
 @patch("sqlstride.cli.load_config")
@@ -103,6 +111,84 @@ def test_sync_command_invalid_jinja_vars(mock_sync_database, mock_load_config):
     mock_sync_database.assert_not_called()
 
 
+@patch("sqlstride.cli.load_config")
+@patch("sqlstride.cli.load_targets")
+@patch("sqlstride.cli.sync_fleet")
+def test_fleet_command(mock_sync_fleet, mock_load_targets, mock_load_config, mock_config):
+    """Test the fleet command reports per-target results."""
+    from click.testing import CliRunner
+    from sqlstride.commands.fleet import TargetResult
+
+    mock_load_config.return_value = mock_config
+    mock_load_targets.return_value = [("db1", mock_config), ("db2", mock_config)]
+    mock_sync_fleet.return_value = [TargetResult("db1", "applied"), TargetResult("db2", "failed", "SQL error")]
+    runner = CliRunner()
+
+    result = runner.invoke(fleet, ["--project", ".", "--concurrency", "8", "--canary", "1", "--parallel", "2",
+                                   "--schedule", "graph", "--checksum-algorithm", "blake2b"])
+
+    assert result.exit_code != 0
+    assert "applied  db1" in result.output
+    assert "failed  db2 – SQL error" in result.output
+    assert "1 of 2 targets did not sync" in result.output
+    mock_sync_fleet.assert_called_once_with(mock_config, mock_load_targets.return_value, concurrency=8, canary=1,
+                                            jobs=1, dry_run=False, same_checksums=False,
+                                            transaction_mode="per-step", parallel=2, schedule="graph")
+    assert mock_load_config.call_args.kwargs["checksum_algorithm"] == "blake2b"
+
+
+@patch("sqlstride.cli.load_config")
+@patch("sqlstride.cli.load_history")
+def test_history_command(mock_load_history, mock_load_config, mock_config):
+    """Test the history command lists the slowest steps and the pending estimate."""
+    from click.testing import CliRunner
+    from sqlstride.commands.history import HistoryReport, PendingEstimate, StepTiming
+
+    mock_load_config.return_value = mock_config
+    mock_load_history.return_value = HistoryReport(
+        slowest=[StepTiming("author1", "load", "seed_data/load.sql", None, 95_000, 20000, "run1")],
+        pending=PendingEstimate(3, 4500, {"file": 2, "none": 1}),
+        timed_steps=12,
+    )
+    runner = CliRunner()
+
+    result = runner.invoke(history, ["--project", ".", "--limit", "1"])
+
+    assert result.exit_code == 0
+    assert "Slowest of 12 timed steps:" in result.output
+    assert "1 min 35 s" in result.output
+    assert "20000 rows" in result.output
+    assert "seed_data/load.sql author1:load" in result.output
+    assert "3 pending steps, estimated 4.5 s (2 by file)" in result.output
+    assert "1 steps have no timings" in result.output
+    mock_load_history.assert_called_once_with(mock_config, limit=1)
+
+
+@patch("sqlstride.cli.load_config")
+@patch("sqlstride.cli.check_dependencies")
+def test_deps_command_reports_later_tiers(mock_check_dependencies, mock_load_config, mock_config):
+    """Test the deps command lists steps using objects from a later tier and fails."""
+    from click.testing import CliRunner
+    from sqlstride.commands.deps import DependencyReport
+    from sqlstride.file_utils.dependencies import Misordered
+    from sqlstride.file_utils.parser import Step
+    from sqlstride.file_utils.pipeline import RenderedStep
+
+    step = RenderedStep(Step("author1", "orders", sql="", filename="tables/orders.sql"), "", "00")
+    function = RenderedStep(Step("author1", "total", sql="", filename="functions/total.sql"), "", "00")
+    mock_load_config.return_value = mock_config
+    mock_check_dependencies.return_value = DependencyReport(2, 1, [Misordered(step, function, "total")], False)
+    runner = CliRunner()
+
+    result = runner.invoke(deps, ["--project", "."])
+
+    assert result.exit_code != 0
+    assert "tables/orders.sql author1:orders uses total, created later by functions/total.sql author1:total" \
+        in result.output
+    assert "1 steps depend on objects created in a later tier" in result.output
+    mock_check_dependencies.assert_called_once_with(mock_config, jobs=1)
+
+
 @patch("sqlstride.cli.create_repository_structure")
 def test_create_repo_command(mock_create_repository_structure):
     """Test the create_repo command."""
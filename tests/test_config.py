@@ -112,6 +112,22 @@ def test_load_config_missing_host(temp_dir):
         )
 
 
+def test_load_config_checksum_algorithm(temp_dir):
+    """Test that the checksum algorithm comes from sqlstride.yaml, defaults to sha256 and is validated."""
+    config_path = temp_dir / "sqlstride.yaml"
+    config_path.write_text(yaml.dump({"sql_dialect": "sqlite", "checksum_algorithm": "blake2b"}))
+
+    config = load_config(temp_dir, None, None, None, None, None, None, False, None, None)
+    assert config.checksum_algorithm == "blake2b"
+    overridden = load_config(temp_dir, None, None, None, None, None, None, False, None, None,
+                             checksum_algorithm="sha256")
+    assert overridden.checksum_algorithm == "sha256"
+
+    config_path.write_text(yaml.dump({"sql_dialect": "sqlite", "checksum_algorithm": "md5"}))
+    with pytest.raises(ValueError, match="Unsupported checksum algorithm md5"):
+        load_config(temp_dir, None, None, None, None, None, None, False, None, None)
+
+
 def test_config_dataclass():
     """Test the Config dataclass."""
     config = Config(
@@ -139,4 +155,51 @@ def test_config_dataclass():
     assert config.sql_dialect == "postgres"
     assert config.log_table == "sqlstride_log"
     assert config.lock_table == "sqlstride_lock"
-    assert config.jinja_vars == {"environment": "development"}
\ No newline at end of file
+    assert config.jinja_vars == {"environment": "development"}
+
+def test_load_targets_from_config_file(temp_dir):
+    """Test loading fleet targets from the targets section of sqlstride.yaml."""
+    from sqlstride.config import load_targets
+
+    (temp_dir / "sqlstride.yaml").write_text(yaml.dump({
+        "sql_dialect": "postgres",
+        "username": "deployer",
+        "targets": [
+            {"name": "eu-1", "host": "eu1.example.com", "database": "app"},
+            {"host": "us1.example.com", "database": "app", "port": 6432},
+        ],
+    }))
+    config = load_config(temp_dir, None, None, None, None, None, None, False, None, None, None, None, None,
+                         require_host=False)
+
+    targets = load_targets(config)
+
+    assert [name for name, _ in targets] == ["eu-1", "us1.example.com/app"]
+    assert targets[0][1].host == "eu1.example.com"
+    assert targets[0][1].username == "deployer"
+    assert targets[1][1].port == 6432
+
+
+def test_load_targets_from_targets_file(sample_config_file, temp_dir, mock_config):
+    """Test loading fleet targets from a separate YAML list."""
+    from sqlstride.config import load_targets
+
+    targets_file = temp_dir / "targets.yaml"
+    targets_file.write_text(yaml.dump([{"host": "a"}, {"host": "b", "database": "other"}]))
+
+    targets = load_targets(mock_config, targets_file)
+
+    assert [config.host for _, config in targets] == ["a", "b"]
+    assert targets[1][1].database == "other"
+    assert targets[0][1].database == mock_config.database
+
+
+def test_load_targets_rejects_shared_keys(temp_dir, mock_config):
+    """Test that a target cannot override settings shared by the whole fleet."""
+    from sqlstride.config import load_targets
+
+    targets_file = temp_dir / "targets.yaml"
+    targets_file.write_text(yaml.dump([{"host": "a", "jinja_vars": {"x": 1}}]))
+
+    with pytest.raises(ValueError, match="cannot vary per target: jinja_vars"):
+        load_targets(mock_config, targets_file)
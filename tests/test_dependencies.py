@@ -0,0 +1,208 @@
+from hashlib import sha256
+
+from sqlstride.file_utils.dependencies import DependencyCache, DependencyGraph, analyze_sql, tier_rank
+from sqlstride.file_utils.parser import Step
+from sqlstride.file_utils.pipeline import RenderedStep
+
+
+def _rendered(filename, sql, step_id=None):
+    step = Step(author="author1", step_id=step_id or filename.rsplit("/", 1)[-1].split(".")[0], sql=sql,
+                filename=filename)
+    return RenderedStep(step, sql, sha256(sql.encode()).hexdigest())
+
+
+def test_analyze_sql_finds_created_and_referenced_objects():
+    """Test that created objects and the names in reference positions are found, comments and literals skipped."""
+    objects = analyze_sql("""
+        -- FROM commented_out
+        CREATE TABLE IF NOT EXISTS sales."Orders" (
+            id integer DEFAULT nextval('sales.order_seq'),
+            customer_id integer REFERENCES [dbo].[customers] (id),
+            note text DEFAULT 'FROM literal'
+        );
+        CREATE UNIQUE INDEX ix_orders ON ONLY sales.orders (id);
+    """)
+
+    assert objects.creates == {"orders", "ix_orders"}
+    assert {"customers", "order_seq"} <= objects.references
+    assert "orders" not in objects.references
+    assert not {"commented_out", "literal"} & objects.references
+
+
+def test_analyze_sql_view_and_trigger_references():
+    """Test that views, triggers and calls reference the objects they use."""
+    view = analyze_sql("CREATE OR REPLACE VIEW v AS SELECT total(o.id) FROM orders o JOIN lines l ON l.id = o.id;")
+    trigger = analyze_sql("CREATE TRIGGER trg BEFORE INSERT ON orders FOR EACH ROW EXECUTE FUNCTION audit();")
+
+    assert view.creates == {"v"} and {"orders", "lines", "total"} <= view.references
+    assert trigger.creates == {"trg"} and {"orders", "audit"} <= trigger.references
+
+
+def test_tier_rank_follows_the_directory_order():
+    """Test that tiers sort like the parser runs them, unknown directories last."""
+    assert tier_rank("tables/a.sql") < tier_rank("indexes/a.sql") < tier_rank("views/a.sql") < tier_rank("zzz/a.sql")
+
+
+def test_dependency_graph_links_steps_and_flags_later_tiers():
+    """Test that a step depends on the step creating what it uses, and later tiers are reported."""
+    steps = [
+        _rendered("tables/orders.sql", "CREATE TABLE orders (id int, total numeric DEFAULT order_total(0));"),
+        _rendered("tables/lines.sql", "CREATE TABLE lines (order_id int REFERENCES orders (id));"),
+        _rendered("functions/order_total.sql", "CREATE FUNCTION order_total(x int) RETURNS numeric AS $$ "
+                                               "SELECT 1 $$ LANGUAGE sql;"),
+        _rendered("views/v.sql", "CREATE VIEW v AS SELECT * FROM orders JOIN lines ON true;"),
+    ]
+
+    graph = DependencyGraph(steps)
+
+    assert graph.dependencies == [{2: "order_total"}, {0: "orders"}, {}, {1: "lines", 0: "orders"}]
+    assert [(found.step.step.filename, found.name) for found in graph.misordered()] == [
+        ("tables/orders.sql", "order_total")]
+    assert graph.file_dependencies()["views/v.sql"] == {"tables/orders.sql", "tables/lines.sql"}
+    assert not graph.has_cycle()
+
+
+def test_dependency_graph_uses_the_latest_earlier_creator():
+    """Test that a step re-creating an object is the one later steps depend on."""
+    steps = [
+        _rendered("views/v.sql", "CREATE VIEW v AS SELECT 1 AS x;", "v1"),
+        _rendered("views/v2.sql", "CREATE OR REPLACE VIEW v AS SELECT 2 AS x;", "v2"),
+        _rendered("views/w.sql", "CREATE VIEW w AS SELECT x FROM v;"),
+    ]
+
+    assert DependencyGraph(steps).dependencies[2] == {1: "v"}
+
+
+def test_analyze_sql_finds_altered_and_dropped_objects():
+    """Test that ALTER and DROP targets are recorded as modified."""
+    objects = analyze_sql("ALTER TABLE ONLY sales.orders ADD COLUMN total numeric; DROP VIEW IF EXISTS old_totals;")
+
+    assert objects.modifies == {"orders", "old_totals"}
+    assert not objects.creates
+
+
+def test_dependency_graph_waits_for_steps_modifying_existing_objects():
+    """Test that a step using an existing object waits for the earlier steps altering it."""
+    steps = [
+        _rendered("tables/orders.sql", "ALTER TABLE orders ADD COLUMN total numeric;", "add_total"),
+        _rendered("tables/orders.sql", "ALTER TABLE orders ADD COLUMN paid boolean;", "add_paid"),
+        _rendered("tables/customers.sql", "ALTER TABLE customers ADD COLUMN vip boolean;"),
+        _rendered("views/order_totals.sql", "CREATE VIEW order_totals AS SELECT total, paid FROM orders;"),
+    ]
+
+    graph = DependencyGraph(steps)
+
+    assert graph.dependencies[1] == {0: "orders"}
+    assert graph.dependencies[3] == {0: "orders", 1: "orders"}
+    assert graph.file_dependencies()["views/order_totals.sql"] == {"tables/orders.sql"}
+    assert not graph.misordered()
+
+
+def test_dependency_graph_modifications_since_the_latest_creator():
+    """Test that a step waits for the latest creator and the steps altering the object after it, not before."""
+    steps = [
+        _rendered("tables/a.sql", "ALTER TABLE orders ADD COLUMN old int;", "old"),
+        _rendered("tables/b.sql", "DROP TABLE orders;", "drop"),
+        _rendered("tables/c.sql", "CREATE TABLE orders (id int);", "create"),
+        _rendered("tables/d.sql", "ALTER TABLE orders ADD COLUMN total int;", "alter"),
+        _rendered("views/v.sql", "CREATE VIEW v AS SELECT total FROM orders;"),
+    ]
+
+    dependencies = DependencyGraph(steps).dependencies
+
+    assert dependencies[2] == {0: "orders", 1: "orders"}  # re-created only after the drop
+    assert dependencies[4] == {2: "orders", 3: "orders"}
+
+
+def test_analyze_sql_finds_schemas_types_and_roles():
+    """Test that schema qualifiers, column types and grantees are references, and schemas, extensions, roles created."""
+    table = analyze_sql("CREATE TABLE app.t (id int, m app.mood NOT NULL, u uuid DEFAULT uuid_generate_v4());")
+    grant = analyze_sql("GRANT SELECT ON app.t TO reader, writer;")
+
+    assert table.creates == {"t"} and {"app", "mood", "uuid_generate_v4"} <= table.references
+    assert {"app", "t", "reader", "writer"} <= grant.references
+    assert analyze_sql("CREATE SCHEMA IF NOT EXISTS app AUTHORIZATION owner;").creates == {"app"}
+    assert analyze_sql('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";').creates == {"uuid-ossp"}
+    assert analyze_sql("CREATE ROLE reader;").creates == {"reader"}
+
+
+def test_dependency_graph_keeps_foundation_tiers_as_barriers():
+    """Test that a schema-qualified table using a user-defined type waits for the schema, type, extension and role."""
+    steps = [
+        _rendered("extensions/x.sql", 'CREATE EXTENSION IF NOT EXISTS "uuid-ossp";'),
+        _rendered("roles/r.sql", "CREATE ROLE reader;"),
+        _rendered("schemas/app.sql", "CREATE SCHEMA app;"),
+        _rendered("types/mood.sql", "CREATE TYPE app.mood AS ENUM ('ok', 'sad');"),
+        _rendered("tables/t.sql", "CREATE TABLE app.t (id int, m app.mood, u uuid DEFAULT uuid_generate_v4());"),
+        _rendered("seed_data/t.sql", "INSERT INTO app.t (id) VALUES (1);"),
+        _rendered("functions/f.sql", "CREATE FUNCTION app.f() RETURNS int AS $$ SELECT 1 $$ LANGUAGE sql;"),
+        _rendered("grants/g.sql", "GRANT SELECT ON app.t TO reader;"),
+    ]
+
+    waits = DependencyGraph(steps).file_dependencies()
+
+    foundation = {"extensions/x.sql", "roles/r.sql", "schemas/app.sql", "types/mood.sql"}
+    assert waits["types/mood.sql"] == {"extensions/x.sql", "roles/r.sql", "schemas/app.sql"}
+    assert waits["tables/t.sql"] == foundation
+    assert waits["seed_data/t.sql"] == foundation | {"tables/t.sql"}
+    # the seed data creates nothing the scan recognizes, so later tiers wait for it as they would for tiers
+    assert waits["functions/f.sql"] == foundation | {"seed_data/t.sql"}
+    assert waits["grants/g.sql"] == foundation | {"tables/t.sql", "seed_data/t.sql"}
+    assert not DependencyGraph(steps).has_cycle()
+
+
+def test_dependency_graph_drop_waits_for_earlier_readers():
+    """Test that dropping an object waits for the steps that still use it."""
+    steps = [
+        _rendered("tables/orders.sql", "CREATE TABLE orders (id int);"),
+        _rendered("views/v.sql", "CREATE VIEW v AS SELECT id FROM orders;"),
+        _rendered("retire/orders.sql", "DROP TABLE orders;"),
+    ]
+
+    assert DependencyGraph(steps).dependencies[2] == {0: "orders", 1: "orders"}
+
+
+def test_dependency_graph_detects_cycles():
+    """Test that files using each other's objects are reported as a cycle."""
+    steps = [
+        _rendered("views/a.sql", "CREATE VIEW a AS SELECT * FROM b;"),
+        _rendered("views/b.sql", "CREATE VIEW b AS SELECT * FROM a;"),
+    ]
+
+    assert DependencyGraph(steps).has_cycle()
+
+
+def test_dependency_cache_round_trip(temp_dir):
+    """Test that analyses are reused by checksum and pruned after a full pass."""
+    path = temp_dir / "dependencies.json"
+    first, second = (_rendered("tables/a.sql", "CREATE TABLE a (id int); DROP TABLE b;"),
+                     _rendered("tables/b.sql", "SELECT 1;"))
+    cache = DependencyCache(path)
+    cache.analyze(first)
+    cache.analyze(second)
+    cache.save()
+
+    reloaded = DependencyCache(path)
+    objects = reloaded.analyze(first._replace(sql="not analyzed again"))
+    assert objects.creates == {"a"} and objects.modifies == {"b"}
+    reloaded.save(prune=True)
+
+    assert set(DependencyCache(path)._entries) == {first.checksum}
+
+
+def test_check_dependencies_on_a_project(sample_project_structure, mock_config):
+    """Test that the whole project is analyzed and a table using a later function is reported."""
+    from sqlstride.commands.deps import check_dependencies
+
+    (sample_project_structure / "tables" / "user_stats.sql").write_text(
+        "-- step author1:create_user_stats\n"
+        "CREATE TABLE user_stats AS SELECT * FROM get_user(1);\n"
+    )
+    mock_config.project_path = sample_project_structure
+
+    report = check_dependencies(mock_config)
+
+    assert report.steps == 4
+    assert [(found.step.step.step_id, found.name) for found in report.misordered] == [("create_user_stats", "get_user")]
+    assert not report.cycle
+    assert (sample_project_structure / ".sqlstride" / "cache" / "dependencies.json").exists()
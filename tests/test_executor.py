@@ -1,16 +1,18 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 from pathlib import Path
-from sqlstride.commands.sync import sync_database
+from sqlstride.commands.sync import _tiers, sync_database
 from sqlstride.commands.create_repo import create_repository_structure
+from sqlstride.file_utils.checksum import compute_checksum
 from sqlstride.file_utils.parser import Step
+from sqlstride.file_utils.pipeline import RenderedStep
 
 
 @pytest.fixture
 def mock_adapter():
     """Create a mock adapter."""
     adapter = MagicMock()
-    adapter.is_locked.return_value = False
+    adapter.acquire_run_lock.return_value = True
     adapter.applied_steps.return_value = {}
     return adapter
 
@@ -24,9 +26,9 @@ def mock_steps():
     ]
 
 
-@patch("sqlstride.commands.get_adapter")
-@patch("sqlstride.commands.parse_directory")
-@patch("sqlstride.commands.render_sql")
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+@patch("sqlstride.file_utils.pipeline.render_sql")
 def test_sync_database_no_pending_steps(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_config, capsys):
     """Test syncing the database with no pending steps."""
     mock_get_adapter.return_value = mock_adapter
@@ -38,7 +40,7 @@ def test_sync_database_no_pending_steps(mock_render_sql, mock_parse_directory, m
     mock_get_adapter.assert_called_once_with(mock_config)
     
     # Check that the directory was parsed
-    mock_parse_directory.assert_called_once_with(Path(mock_config.project_path))
+    mock_parse_directory.assert_called_once_with(Path(mock_config.project_path), ANY, jobs=1)
     
     # Check that applied steps were checked
     mock_adapter.applied_steps.assert_called_once()
@@ -48,9 +50,9 @@ def test_sync_database_no_pending_steps(mock_render_sql, mock_parse_directory, m
     assert "Database is already up to date" in captured.out
 
 
-@patch("sqlstride.commands.get_adapter")
-@patch("sqlstride.commands.parse_directory")
-@patch("sqlstride.commands.render_sql")
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+@patch("sqlstride.file_utils.pipeline.render_sql")
 def test_sync_database_with_pending_steps(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_steps, mock_config, capsys):
     """Test syncing the database with pending steps."""
     mock_get_adapter.return_value = mock_adapter
@@ -63,17 +65,22 @@ def test_sync_database_with_pending_steps(mock_render_sql, mock_parse_directory,
     mock_get_adapter.assert_called_once_with(mock_config)
     
     # Check that the directory was parsed
-    mock_parse_directory.assert_called_once_with(Path(mock_config.project_path))
+    mock_parse_directory.assert_called_once_with(Path(mock_config.project_path), ANY, jobs=1)
     
     # Check that applied steps were checked
     mock_adapter.applied_steps.assert_called_once()
     
-    # Check that each step was executed
-    assert mock_adapter.lock.call_count == 2
+    # Check that the run lock was taken once and each step was executed
+    mock_adapter.acquire_run_lock.assert_called_once_with(mock_config.lock_timeout)
     assert mock_adapter.execute.call_count == 2
-    assert mock_adapter.record_step.call_count == 2
-    assert mock_adapter.unlock.call_count == 2
+    assert mock_adapter.queue_step.call_count == 2
     assert mock_adapter.commit.call_count == 2
+    mock_adapter.release_run_lock.assert_called_once()
+
+    # Each log row carries the step's duration and the rows the driver reported
+    step, checksum, duration_ms, rows_affected = mock_adapter.queue_step.call_args_list[0].args
+    assert step == mock_steps[0] and isinstance(duration_ms, int) and duration_ms >= 0
+    assert rows_affected is mock_adapter.execute.return_value
     
     # Check that the success messages were printed
     captured = capsys.readouterr()
@@ -81,9 +88,9 @@ def test_sync_database_with_pending_steps(mock_render_sql, mock_parse_directory,
     assert "Applied file2.sql author2:step2" in captured.out
 
 
-@patch("sqlstride.commands.get_adapter")
-@patch("sqlstride.commands.parse_directory")
-@patch("sqlstride.commands.render_sql")
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+@patch("sqlstride.file_utils.pipeline.render_sql")
 def test_sync_database_dry_run(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_steps, mock_config, capsys):
     """Test syncing the database in dry run mode."""
     mock_get_adapter.return_value = mock_adapter
@@ -96,7 +103,7 @@ def test_sync_database_dry_run(mock_render_sql, mock_parse_directory, mock_get_a
     mock_get_adapter.assert_called_once_with(mock_config)
     
     # Check that the directory was parsed
-    mock_parse_directory.assert_called_once_with(Path(mock_config.project_path))
+    mock_parse_directory.assert_called_once_with(Path(mock_config.project_path), ANY, jobs=1)
     
     # Check that applied steps were checked
     mock_adapter.applied_steps.assert_called_once()
@@ -104,7 +111,7 @@ def test_sync_database_dry_run(mock_render_sql, mock_parse_directory, mock_get_a
     # Check that no steps were executed
     mock_adapter.lock.assert_not_called()
     mock_adapter.execute.assert_not_called()
-    mock_adapter.record_step.assert_not_called()
+    mock_adapter.queue_step.assert_not_called()
     mock_adapter.unlock.assert_not_called()
     mock_adapter.commit.assert_not_called()
     
@@ -114,11 +121,14 @@ def test_sync_database_dry_run(mock_render_sql, mock_parse_directory, mock_get_a
     assert "WOULD APPLY author2:step2" in captured.out
 
 
-@patch("sqlstride.commands.get_adapter")
-@patch("sqlstride.commands.parse_directory")
-@patch("sqlstride.commands.render_sql")
-def test_sync_database_same_checksums(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_config):
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+@patch("sqlstride.file_utils.pipeline.render_sql")
+def test_sync_database_same_checksums(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_config,
+                                      temp_dir):
     """Test syncing the database with same_checksums=True."""
+    from dataclasses import replace
+
     mock_get_adapter.return_value = mock_adapter
     
     # Create steps that have already been applied
@@ -128,28 +138,40 @@ def test_sync_database_same_checksums(mock_render_sql, mock_parse_directory, moc
     ]
     mock_parse_directory.return_value = steps
     
-    # Mock applied steps with matching checksums
+    # Applied steps with matching checksums
     mock_adapter.applied_steps.return_value = {
-        ("author1", "step1", "file1.sql"): "checksum1",
-        ("author2", "step2", "file2.sql"): "checksum2"
+        ("author1", "step1", "file1.sql"): compute_checksum("SELECT 1"),
+        ("author2", "step2", "file2.sql"): compute_checksum("SELECT 2")
     }
     
-    # Mock render_sql to return checksums that match the applied steps
+    # Mock render_sql to return the SQL unchanged
     mock_render_sql.side_effect = lambda sql, vars_, filename: sql
     
-    # Mock sha256 to return the expected checksums
-    with patch("sqlstride.commands.sha256") as mock_sha256:
-        mock_sha256().hexdigest.side_effect = ["checksum1", "checksum2"]
-        
-        # Should not raise an exception
-        sync_database(mock_config, same_checksums=True)
+    # Should not raise an exception
+    config = replace(mock_config, project_path=temp_dir)
+    sync_database(config, same_checksums=True)
+    assert mock_render_sql.call_count == 2
+
+    # the second run takes the checksums from the cache and renders nothing
+    mock_render_sql.reset_mock()
+    sync_database(config, same_checksums=True)
+    mock_render_sql.assert_not_called()
 
+    # a step whose SQL changed is rendered again, and only that one
+    steps[1] = Step(author="author2", step_id="step2", sql="SELECT 22", filename="file2.sql")
+    with pytest.raises(Exception, match="different:\nfile2.sql author2:step2$"):
+        sync_database(config, same_checksums=True)
+    assert mock_render_sql.call_count == 1
 
-@patch("sqlstride.commands.get_adapter")
-@patch("sqlstride.commands.parse_directory")
-@patch("sqlstride.commands.render_sql")
-def test_sync_database_different_checksums(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_config):
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+@patch("sqlstride.file_utils.pipeline.render_sql")
+def test_sync_database_different_checksums(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_config,
+                                           temp_dir):
     """Test syncing the database with same_checksums=True and different checksums."""
+    from dataclasses import replace
+
     mock_get_adapter.return_value = mock_adapter
     
     # Create steps that have already been applied
@@ -159,37 +181,57 @@ def test_sync_database_different_checksums(mock_render_sql, mock_parse_directory
     ]
     mock_parse_directory.return_value = steps
     
-    # Mock applied steps with different checksums
+    # Applied steps with different checksums
     mock_adapter.applied_steps.return_value = {
-        ("author1", "step1", "file1.sql"): "old_checksum1",
-        ("author2", "step2", "file2.sql"): "old_checksum2"
+        ("author1", "step1", "file1.sql"): "ab" * 32,
+        ("author2", "step2", "file2.sql"): "cd" * 32
     }
     
     # Mock render_sql to return the SQL unchanged
     mock_render_sql.side_effect = lambda sql, vars_, filename: sql
     
-    # Mock sha256 to return different checksums
-    with patch("sqlstride.commands.sha256") as mock_sha256:
-        mock_sha256().hexdigest.side_effect = ["new_checksum1", "new_checksum2"]
-        
-        # Should raise an exception
-        with pytest.raises(Exception, match="Checksums for the following steps are different"):
-            sync_database(mock_config, same_checksums=True)
+    # Should raise an exception
+    with pytest.raises(Exception, match="Checksums for the following steps are different"):
+        sync_database(replace(mock_config, project_path=temp_dir), same_checksums=True)
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_verifies_checksums_of_another_algorithm(mock_iter_steps, mock_get_adapter, mock_adapter,
+                                                              mock_config, temp_dir):
+    """Test that steps recorded with sha256 still verify after switching to another algorithm."""
+    from dataclasses import replace
 
+    mock_get_adapter.return_value = mock_adapter
+    mock_iter_steps.return_value = [
+        Step(author="author1", step_id="step1", sql="SELECT 1", filename="file1.sql"),
+        Step(author="author2", step_id="step2", sql="SELECT 2", filename="file2.sql"),
+    ]
+    mock_adapter.applied_steps.return_value = {
+        ("author1", "step1", "file1.sql"): compute_checksum("SELECT 1"),
+        ("author2", "step2", "file2.sql"): compute_checksum("SELECT 2 -- edited", "blake2b"),
+    }
+
+    with pytest.raises(Exception, match="different:\nfile2.sql author2:step2$"):
+        sync_database(replace(mock_config, project_path=temp_dir, checksum_algorithm="blake2b"), same_checksums=True)
 
-@patch("sqlstride.commands.get_adapter")
+
+@patch("sqlstride.commands.sync.get_adapter")
 def test_sync_database_already_locked(mock_get_adapter, mock_adapter, mock_config):
     """Test syncing the database when it's already locked."""
-    mock_adapter.is_locked.return_value = True
+    mock_adapter.acquire_run_lock.return_value = False
     mock_get_adapter.return_value = mock_adapter
     
     with pytest.raises(Exception, match="sqlstride is already running"):
         sync_database(mock_config)
 
+    mock_adapter.applied_steps.assert_not_called()
+    mock_adapter.release_run_lock.assert_not_called()
+
 
-@patch("sqlstride.commands.get_adapter")
-@patch("sqlstride.commands.parse_directory")
-@patch("sqlstride.commands.render_sql")
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+@patch("sqlstride.file_utils.pipeline.render_sql")
 def test_sync_database_execution_error(mock_render_sql, mock_parse_directory, mock_get_adapter, mock_adapter, mock_steps, mock_config):
     """Test syncing the database with an execution error."""
     mock_get_adapter.return_value = mock_adapter
@@ -202,12 +244,372 @@ def test_sync_database_execution_error(mock_render_sql, mock_parse_directory, mo
     with pytest.raises(RuntimeError, match="Failed on file1.sql author1:step1"):
         sync_database(mock_config)
     
-    # Check that rollback was called
+    # Check that rollback was called and the run lock was still released
+    mock_adapter.rollback.assert_called_once()
+    mock_adapter.release_run_lock.assert_called_once()
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_per_file_transactions(mock_parse_directory, mock_get_adapter, mock_adapter, mock_config, capsys):
+    """Test that per-file mode commits once for every file."""
+    mock_get_adapter.return_value = mock_adapter
+    mock_parse_directory.return_value = [
+        Step(author="author1", step_id="step1", sql="SELECT 1", filename="file1.sql"),
+        Step(author="author1", step_id="step2", sql="SELECT 2", filename="file1.sql"),
+        Step(author="author2", step_id="step3", sql="SELECT 3", filename="file2.sql"),
+    ]
+
+    sync_database(mock_config, transaction_mode="per-file")
+
+    assert mock_adapter.execute.call_count == 3
+    assert mock_adapter.queue_step.call_count == 3
+    assert mock_adapter.commit.call_count == 2
+    captured = capsys.readouterr()
+    assert "Applied file1.sql author1:step2" in captured.out
+    assert "Applied file2.sql author2:step3" in captured.out
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_all_in_one_transaction(mock_parse_directory, mock_get_adapter, mock_adapter, mock_steps, mock_config):
+    """Test that all-in-one mode commits once for the whole run."""
+    mock_get_adapter.return_value = mock_adapter
+    mock_parse_directory.return_value = mock_steps
+
+    sync_database(mock_config, transaction_mode="all-in-one")
+
+    assert mock_adapter.execute.call_count == 2
+    mock_adapter.commit.assert_called_once()
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_batch_failure_rolls_back_to_savepoint(mock_parse_directory, mock_get_adapter, mock_adapter,
+                                                            mock_steps, mock_config, capsys):
+    """Test that a failing step in a batch only discards that step on transactional-DDL dialects."""
+    mock_adapter.transactional_ddl = True
+    mock_adapter.execute.side_effect = [None, Exception("SQL error")]
+    mock_get_adapter.return_value = mock_adapter
+    mock_parse_directory.return_value = mock_steps
+
+    with pytest.raises(RuntimeError, match="Failed on file2.sql author2:step2"):
+        sync_database(mock_config, transaction_mode="all-in-one")
+
+    mock_adapter.rollback_to_savepoint.assert_called_once_with("sqlstride_step_1")
+    mock_adapter.rollback.assert_not_called()
+    mock_adapter.queue_step.assert_called_once()
+    mock_adapter.commit.assert_called_once()
+    assert "Applied file1.sql author1:step1" in capsys.readouterr().out
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_batch_failure_without_transactional_ddl(mock_parse_directory, mock_get_adapter, mock_adapter,
+                                                               mock_steps, mock_config):
+    """Test that without transactional DDL each log row is written right after its step, not queued."""
+    mock_adapter.transactional_ddl = False
+    mock_adapter.execute.side_effect = [None, Exception("SQL error")]
+    mock_get_adapter.return_value = mock_adapter
+    mock_parse_directory.return_value = mock_steps
+
+    with pytest.raises(RuntimeError, match="Failed on file2.sql author2:step2"):
+        sync_database(mock_config, transaction_mode="all-in-one")
+
+    mock_adapter.savepoint.assert_not_called()
+    mock_adapter.record_step.assert_called_once_with(mock_steps[0], compute_checksum("SELECT 1"), ANY, None)
+    mock_adapter.queue_step.assert_not_called()
     mock_adapter.rollback.assert_called_once()
+    mock_adapter.commit.assert_not_called()
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_mariadb_failure_keeps_earlier_log_rows(mock_iter_steps, mock_get_adapter, mock_config):
+    """Test that on MariaDB the log rows of the steps before a failure are sent before the failing statement."""
+    from dataclasses import replace
+    from sqlstride.database.adapters import get_adapter
+
+    connector, connection, cursor = MagicMock(), MagicMock(), MagicMock()
+    connector.to_user_mysql.return_value = connection
+    connection.cursor.return_value = cursor
+    with patch("sqlstride.database.adapters.mariadb.build_connector", return_value=connector):
+        adapter = get_adapter(replace(mock_config, sql_dialect="mariadb", port=3306))
+    adapter.applied_steps = MagicMock(return_value={})
+    cursor.fetchone.return_value = (1,)
+    cursor.execute.reset_mock()
+
+    def execute(sql, *args):
+        if sql.startswith("CREATE TABLE b"):
+            raise Exception("table exists")
+
+    cursor.execute.side_effect = execute
+    mock_get_adapter.return_value = adapter
+    mock_iter_steps.return_value = [
+        Step(author="author1", step_id="a", sql="CREATE TABLE a (id int)", filename="tables/a.sql"),
+        Step(author="author1", step_id="b", sql="CREATE TABLE b (id int)", filename="tables/a.sql"),
+    ]
+
+    with pytest.raises(RuntimeError, match="author1:b"):
+        sync_database(mock_config, transaction_mode="per-file")
+
+    statements = [call.args for call in cursor.execute.call_args_list]
+    inserts = [index for index, args in enumerate(statements) if args[0].startswith("INSERT INTO")]
+    failing = next(index for index, args in enumerate(statements) if args[0].startswith("CREATE TABLE b"))
+    assert len(inserts) == 1 and inserts[0] < failing  # committed by the implicit commit of the next DDL
+    assert statements[inserts[0]][1][:3] == ["author1", "a", "tables/a.sql"]
+
+
+def _tier_steps():
+    return [
+        Step(author="author1", step_id="small", sql="CREATE TABLE a (id int)", filename="tables/a.sql"),
+        Step(author="author1", step_id="large", sql="CREATE TABLE b (id int, label varchar(100))",
+             filename="tables/b.sql"),
+        Step(author="author1", step_id="ix1", sql="CREATE INDEX ix1 ON a (id)", filename="indexes/ix1.sql"),
+        Step(author="author1", step_id="ix2", sql="CREATE INDEX ix2 ON b (id)", filename="indexes/ix2.sql"),
+    ]
+
+
+def test_tiers_group_files_by_directory_largest_first():
+    """Test that each tier holds its directory's files, the largest first."""
+    rendered = [RenderedStep(step, step.sql, "00") for step in _tier_steps()]
+
+    tiers = [[file_items[0].step.filename for file_items in files] for files in _tiers(rendered)]
+
+    assert tiers == [["tables/b.sql", "tables/a.sql"], ["indexes/ix1.sql", "indexes/ix2.sql"]]
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_parallel_tiers(mock_iter_steps, mock_get_adapter, mock_adapter, mock_config, capsys):
+    """Test that the files of a tier run concurrently and the next tier waits for all of them."""
+    import threading
 
+    executed = []
+    executed_lock = threading.Lock()
+    # both table files must be inside execute at the same time, or the barrier times out
+    tables_barrier = threading.Barrier(2, timeout=5)
 
-@patch("sqlstride.commands.click")
-@patch("sqlstride.commands.os.makedirs")
+    def execute(sql):
+        if sql.startswith("CREATE TABLE"):
+            tables_barrier.wait()
+        with executed_lock:
+            executed.append(sql.split()[1])
+        return None
+
+    workers = [MagicMock(), MagicMock()]
+    for worker in workers:
+        worker.execute.side_effect = execute
+    mock_get_adapter.side_effect = [mock_adapter] + workers
+    mock_iter_steps.return_value = _tier_steps()
+
+    sync_database(mock_config, parallel=2)
+
+    assert executed == ["TABLE", "TABLE", "INDEX", "INDEX"]
+    mock_adapter.execute.assert_not_called()
+    for worker in workers:
+        assert worker.run_id == mock_adapter.run_id
+        worker.connection.close.assert_called_once()
+    assert sum(worker.queue_step.call_count for worker in workers) == 4
+    assert "Applied indexes/ix2.sql author1:ix2" in capsys.readouterr().out
+    mock_adapter.release_run_lock.assert_called_once()
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_parallel_failure_stops_before_next_tier(mock_iter_steps, mock_get_adapter, mock_adapter,
+                                                               mock_config):
+    """Test that a failing file is reported after its tier and later tiers are not started."""
+    def execute(sql):
+        if " b " in sql:
+            raise Exception("SQL error")
+
+    worker = MagicMock()
+    worker.execute.side_effect = execute
+    mock_get_adapter.side_effect = [mock_adapter] + [worker] * 2
+    mock_iter_steps.return_value = _tier_steps()
+
+    with pytest.raises(RuntimeError, match="Failed on tables/b.sql author1:large"):
+        sync_database(mock_config, parallel=2)
+
+    assert not any("INDEX" in call.args[0] for call in worker.execute.call_args_list)
+    mock_adapter.release_run_lock.assert_called_once()
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_graph_schedule_skips_the_tier_barrier(mock_iter_steps, mock_get_adapter, mock_adapter,
+                                                             mock_config, temp_dir):
+    """Test that with the graph schedule a file starts as soon as the files it depends on are applied."""
+    import threading
+
+    mock_config.project_path = temp_dir
+    index_applied = threading.Event()
+
+    def execute(sql):
+        if "CREATE TABLE b" in sql:
+            # only finishes once the index on a ran, which the tier schedule would hold back
+            assert index_applied.wait(timeout=5)
+        if "CREATE INDEX ix1" in sql:
+            index_applied.set()
+
+    workers = [MagicMock(), MagicMock()]
+    for worker in workers:
+        worker.execute.side_effect = execute
+    mock_get_adapter.side_effect = [mock_adapter] + workers
+    mock_iter_steps.return_value = _tier_steps()
+
+    sync_database(mock_config, parallel=2, schedule="graph")
+
+    assert sum(worker.execute.call_count for worker in workers) == 4
+    assert (temp_dir / ".sqlstride" / "cache" / "dependencies.json").exists()
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_database_parallel_falls_back_to_serial(mock_iter_steps, mock_get_adapter, mock_adapter, mock_config):
+    """Test that dialects without concurrent sessions apply every step on the run's own connection."""
+    mock_adapter.concurrent_sessions = False
+    mock_get_adapter.return_value = mock_adapter
+    mock_iter_steps.return_value = _tier_steps()
+
+    sync_database(mock_config, parallel=4)
+
+    mock_get_adapter.assert_called_once()
+    assert mock_adapter.execute.call_count == 4
+
+
+def test_sync_database_parallel_all_in_one(mock_config):
+    """Test that one transaction cannot be spread over several connections."""
+    with pytest.raises(ValueError, match="all-in-one"):
+        sync_database(mock_config, transaction_mode="all-in-one", parallel=2)
+
+
+def test_sync_database_invalid_transaction_mode(mock_config):
+    """Test that an unknown transaction mode is rejected."""
+    with pytest.raises(ValueError, match="Unsupported transaction mode"):
+        sync_database(mock_config, transaction_mode="per-galaxy")
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+@patch("sqlstride.file_utils.pipeline.render_sql")
+def test_sync_fleet(mock_render_sql, mock_iter_steps, mock_get_adapter, mock_steps, mock_config, capsys):
+    """Test that a fleet sync parses and renders once and syncs every target."""
+    from dataclasses import replace
+    from sqlstride.commands.fleet import sync_fleet
+
+    adapters = {}
+
+    def adapter_for(config):
+        adapter = MagicMock()
+        adapter.acquire_run_lock.return_value = True
+        adapter.applied_steps.return_value = {}
+        if config.host == "broken":
+            adapter.execute.side_effect = Exception("SQL error")
+        adapters[config.host] = adapter
+        return adapter
+
+    mock_get_adapter.side_effect = adapter_for
+    mock_iter_steps.return_value = mock_steps
+    mock_render_sql.side_effect = lambda sql, vars_, filename: sql
+    targets = [(host, replace(mock_config, host=host)) for host in ("db1", "db2", "broken", "db3")]
+
+    results = sync_fleet(mock_config, targets, concurrency=2)
+
+    mock_iter_steps.assert_called_once()
+    assert mock_render_sql.call_count == 2
+    assert [(result.name, result.status) for result in results] == [
+        ("db1", "applied"), ("db2", "applied"), ("broken", "failed"), ("db3", "applied")]
+    assert "Failed on file1.sql author1:step1" in results[2].error
+    assert adapters["db3"].queue_step.call_count == 2
+    assert "[db2] ✓ Applied file2.sql author2:step2" in capsys.readouterr().out
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_sync_fleet_canary_failure_skips_rest(mock_iter_steps, mock_get_adapter, mock_steps, mock_config):
+    """Test that a failing canary wave stops the rollout."""
+    from dataclasses import replace
+    from sqlstride.commands.fleet import sync_fleet
+
+    adapter = MagicMock()
+    adapter.acquire_run_lock.return_value = True
+    adapter.applied_steps.return_value = {}
+    adapter.execute.side_effect = Exception("SQL error")
+    mock_get_adapter.return_value = adapter
+    mock_iter_steps.return_value = mock_steps
+    targets = [(host, replace(mock_config, host=host)) for host in ("canary", "db1", "db2")]
+
+    results = sync_fleet(mock_config, targets, canary=1)
+
+    assert [result.status for result in results] == ["failed", "skipped", "skipped"]
+    assert mock_get_adapter.call_count == 1
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_async_sync_keeps_event_loop_free(mock_iter_steps, mock_get_adapter, mock_adapter, mock_steps, mock_config):
+    """Test that async_sync applies the steps off the event loop."""
+    import asyncio
+    import threading
+    from sqlstride.commands.async_sync import async_sync
+
+    release = threading.Event()
+    mock_adapter.execute.side_effect = lambda sql: release.wait(5)
+    mock_get_adapter.return_value = mock_adapter
+    mock_iter_steps.return_value = mock_steps
+
+    async def main():
+        sync_task = asyncio.create_task(async_sync(mock_config, transaction_mode="all-in-one"))
+        await asyncio.sleep(0.05)
+        # the loop still runs other coroutines while the database call blocks
+        assert not sync_task.done()
+        release.set()
+        await sync_task
+
+    asyncio.run(main())
+
+    assert mock_adapter.queue_step.call_count == 2
+    mock_adapter.commit.assert_called_once()
+
+
+@patch("sqlstride.commands.sync.get_adapter")
+@patch("sqlstride.commands.sync.iter_steps")
+def test_async_sync_cancel_stops_after_current_batch(mock_iter_steps, mock_get_adapter, mock_adapter, mock_steps,
+                                                     mock_config):
+    """Test that cancelling async_sync finishes the batch in flight and skips the rest."""
+    import asyncio
+    import threading
+    from sqlstride.commands.async_sync import async_sync
+
+    started, release = threading.Event(), threading.Event()
+
+    def execute(sql):
+        started.set()
+        release.wait(5)
+
+    mock_adapter.execute.side_effect = execute
+    mock_get_adapter.return_value = mock_adapter
+    mock_iter_steps.return_value = mock_steps
+
+    async def main():
+        sync_task = asyncio.create_task(async_sync(mock_config))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        sync_task.cancel()
+        await asyncio.sleep(0.05)
+        release.set()
+        await sync_task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(main())
+
+    mock_adapter.execute.assert_called_once()
+    mock_adapter.commit.assert_called_once()
+
+
+@patch("sqlstride.commands.create_repo.click")
+@patch("sqlstride.commands.create_repo.os.makedirs")
 @patch("builtins.open")
 def test_create_repository_structure(mock_open, mock_makedirs, mock_click):
     """Test creating the repository structure."""
@@ -242,4 +644,33 @@ def test_create_repository_structure(mock_open, mock_makedirs, mock_click):
     assert mock_file.write.call_count > 0
     
     # Check that the success message was printed
-    mock_click.echo.assert_called()
\ No newline at end of file
+    mock_click.echo.assert_called()
+
+def test_sync_database_against_sqlite(temp_dir, capsys):
+    """Test a whole sync, with nothing mocked, against a local SQLite file."""
+    from sqlstride.config import Config
+    from sqlstride.database.adapters import get_adapter
+
+    (temp_dir / "tables").mkdir()
+    (temp_dir / "tables" / "users.sql").write_text(
+        "-- step alice:1\nCREATE TABLE users (id integer primary key, name text);\n\n"
+        "-- step alice:2\nINSERT INTO users (name) VALUES ('a');\n")
+    (temp_dir / "tables" / "broken.sql").write_text(
+        "-- step bob:1\nCREATE TABLE orders (id integer);\n\n-- step bob:2\nINSERT INTO missing VALUES (1);\n")
+    config = Config(temp_dir, None, None, None, "app.db", None, None, False, "sqlite", None)
+
+    with pytest.raises(RuntimeError, match="bob:2"):
+        sync_database(config, transaction_mode="per-file")
+
+    adapter = get_adapter(config)
+    applied = adapter.applied_steps()
+    assert set(applied) == {("bob", "1", "tables/broken.sql")}  # broken.sql sorts first; the run stops there
+    tables = {obj.name for obj in adapter.discover_objects() if obj.kind == "table"}
+    assert "orders" in tables  # the step before the failure is kept
+    assert adapter.acquire_run_lock() is True  # the failed run released its lock
+    adapter.release_run_lock()
+
+    (temp_dir / "tables" / "broken.sql").write_text(
+        "-- step bob:1\nCREATE TABLE orders (id integer);\n\n-- step bob:2\nINSERT INTO orders VALUES (1);\n")
+    sync_database(config, transaction_mode="per-file")
+    assert len(get_adapter(config).applied_steps()) == 4
@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import patch
+
+from sqlstride.commands.history import (StepTiming, estimate_pending, format_duration, load_history,
+                                        slowest_steps)
+from sqlstride.file_utils.parser import Step
+
+
+def _timing(filename, duration_ms, step_id="s", rows=None):
+    return StepTiming("author1", step_id, filename, None, duration_ms, rows, "run1")
+
+
+def test_slowest_steps_skips_untimed_rows():
+    """Test that steps applied before timings were recorded are left out of the ranking."""
+    history = [_timing("tables/a.sql", 5, "a"), _timing("tables/b.sql", None, "b"),
+               _timing("tables/c.sql", 50, "c"), _timing("views/d.sql", 20, "d")]
+
+    assert [timing.step_id for timing in slowest_steps(history, limit=2)] == ["c", "d"]
+
+
+def test_estimate_pending_prefers_the_closest_history():
+    """Test that a pending step is estimated from its file, then its directory, then the project."""
+    history = [_timing("tables/a.sql", 10), _timing("tables/a.sql", 30), _timing("tables/b.sql", 100),
+               _timing("views/v.sql", 1000)]
+    pending = [
+        Step("author1", "new", sql="SELECT 1;", filename="tables/a.sql"),      # median of 10, 30
+        Step("author1", "new", sql="SELECT 1;", filename="tables/other.sql"),  # median of 10, 30, 100
+        Step("author1", "new", sql="SELECT 1;", filename="seed_data/x.sql"),   # median of everything
+    ]
+
+    estimate = estimate_pending(pending, history)
+
+    assert estimate.steps == 3
+    assert estimate.total_ms == 20 + 30 + 65
+    assert estimate.basis == {"file": 1, "directory": 1, "project": 1}
+
+
+def test_estimate_pending_without_timings():
+    """Test that without any recorded duration the pending steps are counted but not estimated."""
+    estimate = estimate_pending([Step("author1", "s", sql="SELECT 1;", filename="tables/a.sql")],
+                                [_timing("tables/a.sql", None)])
+
+    assert estimate == (1, 0.0, {"none": 1})
+
+
+@pytest.mark.parametrize("milliseconds, text", [
+    (12.4, "12 ms"),
+    (1500, "1.5 s"),
+    (125_000, "2 min 05 s"),
+    (3_900_000, "1 h 05 min"),
+])
+def test_format_duration(milliseconds, text):
+    """Test that durations are shown in the largest unit that fits."""
+    assert format_duration(milliseconds) == text
+
+
+@patch("sqlstride.commands.history.get_adapter")
+def test_load_history(mock_get_adapter, sample_project_structure, mock_config):
+    """Test that the report compares the log table with the steps on disk."""
+    mock_config.project_path = sample_project_structure
+    mock_get_adapter.return_value.step_history.return_value = [
+        ("author1", "create_users", "tables/users.sql", None, 40, None, "run1"),
+    ]
+
+    report = load_history(mock_config, limit=5)
+
+    assert report.timed_steps == 1
+    assert [timing.step_id for timing in report.slowest] == ["create_users"]
+    assert report.pending == (2, 80, {"project": 2})
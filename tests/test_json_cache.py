@@ -0,0 +1,34 @@
+from sqlstride.file_utils.json_cache import JsonCache, load_versioned_json, write_versioned_json
+
+
+def test_versioned_json_round_trip(temp_dir):
+    """Test that a document is read back only by the version that wrote it, and no temp file is left behind."""
+    path = temp_dir / "cache" / "data.json"
+    assert write_versioned_json(path, 2, {"steps": {"a": 1}}, "test cache") is True
+
+    assert load_versioned_json(path, 2) == {"version": 2, "steps": {"a": 1}}
+    assert load_versioned_json(path, 3) is None
+    assert load_versioned_json(temp_dir / "missing.json", 2) is None
+    assert [file.name for file in path.parent.iterdir()] == ["data.json"]
+
+
+def test_versioned_json_write_failure_is_not_fatal(temp_dir):
+    """Test that a cache that cannot be written is reported, not raised."""
+    (temp_dir / "blocked").write_text("a file where the cache directory should be")
+
+    assert write_versioned_json(temp_dir / "blocked" / "data.json", 1, {}, "test cache") is False
+
+
+def test_json_cache_prunes_unseen_entries(temp_dir):
+    """Test that save() writes changes and drops the entries not seen during the run, unless told not to."""
+    path = temp_dir / "entries.json"
+    cache = JsonCache(path)
+    cache._entries = {"kept": 1, "dropped": 2}
+    cache._dirty = True
+    cache.save(prune=False)
+    assert JsonCache(path)._entries == {"kept": 1, "dropped": 2}
+
+    reloaded = JsonCache(path)
+    reloaded._seen.add("kept")
+    reloaded.save()
+    assert JsonCache(path)._entries == {"kept": 1}
@@ -106,3 +106,136 @@ def test_step_namedtuple():
     assert step.step_id == "test_step"
     assert step.sql == "SELECT 1"
     assert step.filename == "test.sql"
+
+
+def test_parse_directory_with_manifest_skips_unchanged_files(sample_project_structure):
+    """Test that files recorded in the parse manifest are not scanned again."""
+    from unittest.mock import patch
+    from sqlstride.file_utils import parser
+    from sqlstride.file_utils.parse_cache import ParseManifest
+
+    manifest_path = sample_project_structure / ".sqlstride" / "cache" / "parse-manifest.json"
+    manifest = ParseManifest(manifest_path)
+    first = parse_directory(sample_project_structure, manifest)
+    manifest.save()
+    assert manifest_path.exists()
+
+    with patch.object(parser, "_find_steps", wraps=parser._find_steps) as mock_find_steps:
+        second = parse_directory(sample_project_structure, ParseManifest(manifest_path))
+
+    mock_find_steps.assert_not_called()
+    assert second == first
+
+
+def test_parse_directory_with_manifest_reparses_changed_files(sample_project_structure):
+    """Test that an edited file is scanned again and removed files leave the manifest."""
+    from sqlstride.file_utils.parse_cache import ParseManifest
+
+    manifest_path = sample_project_structure / ".sqlstride" / "cache" / "parse-manifest.json"
+    manifest = ParseManifest(manifest_path)
+    parse_directory(sample_project_structure, manifest)
+    manifest.save()
+
+    (sample_project_structure / "tables" / "users.sql").write_text("""
+    -- step author1:create_users
+    CREATE TABLE users (id INT);
+
+    -- step author1:add_email
+    ALTER TABLE users ADD COLUMN email VARCHAR(255);
+    """)
+    (sample_project_structure / "views" / "active_users.sql").unlink()
+
+    manifest = ParseManifest(manifest_path)
+    steps = parse_directory(sample_project_structure, manifest)
+    manifest.save()
+
+    assert [step.step_id for step in steps] == ["create_users", "add_email", "create_get_user_function"]
+    assert steps[1].sql == "ALTER TABLE users ADD COLUMN email VARCHAR(255);"
+    assert "views/active_users.sql" not in ParseManifest(manifest_path)._entries
+
+
+def test_parse_directory_skips_hidden_directories(sample_project_structure):
+    """Test that hidden folders such as the cache directory are never parsed."""
+    hidden = sample_project_structure / ".sqlstride"
+    hidden.mkdir()
+    (hidden / "stray.sql").write_text("-- step author1:hidden\nSELECT 1;")
+
+    steps = parse_directory(sample_project_structure)
+
+    assert "hidden" not in [step.step_id for step in steps]
+
+
+def test_step_loads_sql_lazily(temp_dir):
+    """Test that parsed steps keep a file reference and read their SQL on demand."""
+    file_path = temp_dir / "lazy.sql"
+    file_path.write_text("-- step author1:step1\nSELECT 'ünïcode';\n\n-- step author1:step2\nSELECT 2;\n",
+                         encoding="utf-8")
+
+    steps = parse_sql_file(file_path, temp_dir)
+
+    assert not hasattr(steps[0], "__dict__")
+    assert steps[0].path == file_path
+    assert steps[0].sql == "SELECT 'ünïcode';"
+    assert steps[1].sql == "SELECT 2;"
+
+    file_path.write_text("-- step author1:step1\nSELECT 'ünïcode';\n\n-- step author1:step2\nSELECT 3;\n",
+                         encoding="utf-8")
+    assert steps[1].sql == "SELECT 3;"
+
+
+def test_iter_steps(sample_project_structure):
+    """Test that iter_steps is a generator yielding the same steps as parse_directory."""
+    from types import GeneratorType
+    from sqlstride.file_utils.parser import iter_steps
+
+    generator = iter_steps(sample_project_structure)
+
+    assert isinstance(generator, GeneratorType)
+    assert list(generator) == parse_directory(sample_project_structure)
+
+
+def test_parse_sql_file_scans_mapped_bytes(temp_dir):
+    """Test that a file is scanned through mmap without reading it into memory first."""
+    from unittest.mock import patch
+
+    file_path = temp_dir / "seed.sql"
+    rows = "\r\n".join(f"INSERT INTO t VALUES ({number}, 'é');" for number in range(1000))
+    file_path.write_bytes(f"# step seed:rows\r\n{rows}\r\n\r\n-- STEP seed:done\r\nSELECT 1;\r\n".encode("utf-8"))
+
+    with patch("pathlib.Path.read_bytes", side_effect=AssertionError), \
+            patch("pathlib.Path.read_text", side_effect=AssertionError):
+        steps = parse_sql_file(file_path, temp_dir)
+
+    assert [(step.author, step.step_id) for step in steps] == [("seed", "rows"), ("seed", "done")]
+    assert steps[0].sql == rows
+    assert steps[1].sql == "SELECT 1;"
+
+
+def test_parse_sql_file_non_ascii_markers(temp_dir):
+    """Test that markers with non-ASCII authors and ids split steps exactly like the text pattern does."""
+    from sqlstride.constants import STEP_PATTERN
+
+    content = ("-- step josé:1\nSELECT 'ü';\n\n-- step josé:2–extra\nSELECT 2;\n\n"
+               "-- step jo–sé:3\nSELECT 3;\n\n-- step møller:ø\nSELECT 4;\n")
+    file_path = temp_dir / "users.sql"
+    file_path.write_text(content, encoding="utf-8")
+
+    steps = parse_sql_file(file_path, temp_dir)
+
+    assert [(step.author, step.step_id) for step in steps] == STEP_PATTERN.findall(content)
+    assert [(step.author, step.step_id) for step in steps] == [("josé", "1"), ("josé", "2"), ("møller", "ø")]
+    assert steps[0].sql == "SELECT 'ü';"
+    assert steps[1].sql == "–extra\nSELECT 2;\n\n-- step jo–sé:3\nSELECT 3;"
+
+
+def test_parse_sql_file_strips_like_str_strip(temp_dir):
+    """Test that step bodies are trimmed of Unicode whitespace exactly as the decoded text's str.strip() would."""
+    bodies = ["SELECT 'a';\xa0", " \x85 SELECT 'ü';\x1c\n", "SELECT 'é'　 \n\n", "\xa0 \n"]
+    content = "".join(f"-- step author1:s{number}\n{body}" for number, body in enumerate(bodies))
+    file_path = temp_dir / "unicode.sql"
+    file_path.write_text(content, encoding="utf-8")
+
+    steps = parse_sql_file(file_path, temp_dir)
+
+    assert [step.sql for step in steps] == [body.strip() for body in bodies]
+    assert steps[0].sql == "SELECT 'a';"
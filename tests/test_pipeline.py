@@ -0,0 +1,50 @@
+import pytest
+from hashlib import sha256
+from sqlstride.file_utils.parser import Step, parse_directory
+from sqlstride.file_utils.pipeline import RenderedStep, render_steps
+
+
+@pytest.fixture
+def template_steps():
+    """Create steps spread over several files, some of them templates."""
+    return [
+        Step(author="author1", step_id=f"step{number}", sql=f"SELECT {{{{ value }}}} + {number};",
+             filename=f"tables/file{number // 3}.sql.j2")
+        for number in range(12)
+    ] + [Step(author="author2", step_id="plain", sql="SELECT 1;", filename="views/plain.sql")]
+
+
+def test_render_steps(template_steps):
+    """Test rendering and checksumming steps serially."""
+    rendered = list(render_steps(template_steps, {"value": 7}))
+
+    assert [item.step for item in rendered] == template_steps
+    assert rendered[0] == RenderedStep(template_steps[0], "SELECT 7 + 0;",
+                                       sha256("SELECT 7 + 0;".encode()).hexdigest())
+    assert rendered[-1].sql == "SELECT 1;"
+
+
+def test_render_steps_parallel_matches_serial(template_steps):
+    """Test that a worker pool returns the same results in the same order."""
+    serial = list(render_steps(template_steps, {"value": 7}))
+    parallel = list(render_steps(template_steps, {"value": 7}, jobs=3))
+
+    assert parallel == serial
+
+
+def test_render_steps_names_failing_step():
+    """Test that a rendering failure names the step that caused it."""
+    steps = [Step(author="author1", step_id="broken", sql="SELECT {{ missing }};", filename="tables/a.sql.j2")]
+
+    with pytest.raises(RuntimeError, match="tables/a.sql.j2 author1:broken"):
+        list(render_steps(steps, {}))
+
+
+def test_parse_directory_parallel_matches_serial(sample_project_structure):
+    """Test that parsing with worker processes keeps the deterministic order."""
+    for number in range(6):
+        (sample_project_structure / "tables" / f"extra_{number}.sql").write_text(
+            f"-- step author1:extra_{number}_a\nSELECT {number};\n-- step author1:extra_{number}_b\nSELECT 0;\n"
+        )
+
+    assert parse_directory(sample_project_structure, jobs=3) == parse_directory(sample_project_structure)
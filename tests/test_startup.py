@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# modules that must not be imported before a command actually needs them
+HEAVY_MODULES = ["sqlalchemy", "sqlparse", "jinja2", "pyodbc", "pymysql", "psycopg2",
+                 "etl.database.connector", "sqlstride.database.adapters.base"]
+
+
+def _loaded_after(code: str) -> list:
+    """Run *code* in a fresh interpreter and return the heavy modules it left in sys.modules."""
+    probe = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_cli_import_is_lightweight():
+    """Test that importing the CLI loads no driver, sqlalchemy, sqlparse or jinja2."""
+    assert _loaded_after("import sqlstride.cli") == []
+
+
+def test_help_is_lightweight():
+    """Test that `sqlstride --help` does not load the heavy modules either."""
+    code = ("from sqlstride.cli import cli\n"
+            "try:\n    cli(['--help'])\nexcept SystemExit:\n    pass")
+    assert _loaded_after(code) == []
+
+
+@pytest.mark.parametrize("dialect, module", [
+    ("postgres", "sqlstride.database.adapters.postgres"),
+    ("mssql", "sqlstride.database.adapters.mssql"),
+    ("mariadb", "sqlstride.database.adapters.mariadb"),
+])
+def test_get_adapter_imports_only_the_selected_dialect(dialect, module):
+    """Test that get_adapter imports the adapter module of the configured dialect and no other."""
+    code = (
+        "import json, sys\n"
+        "from unittest.mock import patch\n"
+        "from sqlstride.config import Config\n"
+        "from sqlstride.database.adapters import get_adapter\n"
+        f"config = Config('.', 'localhost', 1, '', 'db', 'user', 'pw', False, {dialect!r}, 'public')\n"
+        f"with patch('{module}.build_connector'):\n"
+        "    get_adapter(config)\n"
+        "print(json.dumps([m for m in sys.modules if m.startswith('sqlstride.database.adapters.')]))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    loaded = set(json.loads(result.stdout.strip().splitlines()[-1]))
+    assert loaded == {module, "sqlstride.database.adapters.base"}
@@ -98,4 +98,46 @@ def test_render_sql_with_sample_jinja_file(sample_jinja_sql_file, temp_dir):
     
     # Should not include the insert statement in production
     assert "CREATE TABLE prod_users" in result
-    assert "INSERT INTO prod_users" not in result
\ No newline at end of file
+    assert "INSERT INTO prod_users" not in result
+
+def test_render_sql_reuses_compiled_template():
+    """Test that rendering the same template twice compiles it only once."""
+    from unittest.mock import patch
+    from sqlstride.file_utils import templating
+
+    sql = "SELECT * FROM {{ table }} /* compiled once */;"
+    with patch.object(templating._env, "compile", wraps=templating._env.compile) as mock_compile:
+        assert render_sql(sql, {"table": "users"}, "query.sql.j2") == "SELECT * FROM users /* compiled once */;"
+        assert render_sql(sql, {"table": "orders"}, "query.sql.j2") == "SELECT * FROM orders /* compiled once */;"
+
+    assert mock_compile.call_count == 1
+
+
+def test_render_sql_template_cache_is_bounded():
+    """Test that the in-memory template cache evicts the least recently used template."""
+    from sqlstride.file_utils import templating
+    from sqlstride.file_utils.templating import configure_template_cache
+
+    configure_template_cache(None, max_templates=2)
+    for number in range(5):
+        render_sql(f"SELECT {number}, '{{{{ tag }}}}';", {"tag": "lru"}, "query.sql.j2")
+    assert len(templating._templates) == 2
+
+
+def test_render_sql_bytecode_cache_on_disk(temp_dir):
+    """Test that compiled templates are persisted and reused from the bytecode cache."""
+    from unittest.mock import patch
+    from sqlstride.file_utils import templating
+    from sqlstride.file_utils.templating import configure_template_cache
+
+    cache_dir = temp_dir / ".sqlstride" / "cache" / "templates"
+    sql = "SELECT '{{ value }}' AS persisted;"
+    configure_template_cache(cache_dir)
+    assert render_sql(sql, {"value": "a"}, "query.sql.j2") == "SELECT 'a' AS persisted;"
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # a fresh process starts with an empty in-memory cache
+    templating._templates.clear()
+    with patch.object(templating._env, "compile") as mock_compile:
+        assert render_sql(sql, {"value": "b"}, "query.sql.j2") == "SELECT 'b' AS persisted;"
+    mock_compile.assert_not_called()